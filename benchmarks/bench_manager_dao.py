@@ -0,0 +1,109 @@
+"""
+ManagerDao 并发基准测试
+
+在临时会话库上用多个线程同时执行 list / find / add，统计各操作延迟。
+
+用法:
+    python benchmarks/bench_manager_dao.py --rows 2000 --threads 1,2,4,8 --ops 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.entities import DatabaseSession
+from core.manager_dao import ManagerDao
+
+
+def make_session(index: int) -> DatabaseSession:
+    """生成一条测试会话"""
+    return DatabaseSession(
+        database_type=random.choice(["Mysql", "Mssql", "PostgreSql"]),
+        ip_address=f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+        port=3306,
+        username="root",
+        password="root",
+        memo=f"bench session {index}"
+    )
+
+
+def percentile(values, pct: float) -> float:
+    """计算百分位（毫秒）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k] * 1000
+
+
+results_lock = threading.Lock()
+
+
+def worker(dao: ManagerDao, ops: int, max_id: int, barrier: threading.Barrier, results: dict):
+    """单个线程的混合负载"""
+    timings = {"list": [], "find": [], "add": []}
+    barrier.wait()
+    for i in range(ops):
+        op = "list" if i % 20 == 0 else ("add" if i % 5 == 0 else "find")
+        start = time.perf_counter()
+        if op == "list":
+            dao.list_databases()
+        elif op == "add":
+            dao.add_database(make_session(max_id + i))
+        else:
+            dao.find_data_by_id(random.randint(1, max_id))
+        timings[op].append(time.perf_counter() - start)
+    with results_lock:
+        for op, values in timings.items():
+            results.setdefault(op, []).extend(values)
+
+
+def run(rows: int, thread_counts, ops: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        dao = ManagerDao(db_path)
+        with dao.transaction():
+            for i in range(rows):
+                dao.add_database(make_session(i))
+
+        print(f"rows={rows} ops/thread={ops}")
+        print(f"{'threads':>7} {'op':>5} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for threads in thread_counts:
+            results = {}
+            barrier = threading.Barrier(threads)
+            workers = [
+                threading.Thread(target=worker, args=(dao, ops, rows, barrier, results))
+                for _ in range(threads)
+            ]
+            start = time.perf_counter()
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - start
+            for op in ("list", "find", "add"):
+                values = results.get(op, [])
+                print(f"{threads:>7} {op:>5} {len(values):>6} "
+                      f"{percentile(values, 50):>9.3f} {percentile(values, 95):>9.3f} "
+                      f"{(max(values) * 1000 if values else 0):>9.3f}")
+            print(f"{threads:>7} total {threads * ops:>6} ops in {elapsed:.3f}s "
+                  f"({threads * ops / elapsed:.0f} ops/s)")
+        dao.close_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ManagerDao 并发基准测试")
+    parser.add_argument("--rows", type=int, default=2000, help="预置会话数量")
+    parser.add_argument("--threads", default="1,2,4,8", help="并发线程数列表，逗号分隔")
+    parser.add_argument("--ops", type=int, default=200, help="每个线程执行的操作数")
+    args = parser.parse_args()
+    run(args.rows, [int(x) for x in args.threads.split(",")], args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+MySQL 批量导入基准测试
+
+生成指定行数的 CSV，分别用 LOAD DATA LOCAL、多行 INSERT（不同工作线程数）
+以及逐行 execute_sql 导入同一个临时表，比较耗时与每秒行数。
+逐行导入很慢，只取前 --single-rows 行测试，按每秒行数比较。
+测试表名为 dbvigil_bench_load，测试前后都会删除，--database 指定的库须已存在。
+
+用法:
+    python benchmarks/bench_mysql_bulk_load.py --host 127.0.0.1 --user root --password root \\
+        --database test --rows 200000 --workers 1 4
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.entities import DatabaseSession
+from database.mysql_bulk_loader import MysqlBulkLoader
+from database.mysql_dao import MysqlDao
+
+
+TABLE = "dbvigil_bench_load"
+
+CREATE_TABLE = f"""
+CREATE TABLE {TABLE} (
+    id BIGINT PRIMARY KEY,
+    name VARCHAR(64) NOT NULL,
+    amount DECIMAL(12, 2),
+    created DATETIME,
+    note TEXT
+)
+"""
+
+
+def write_csv(path: str, rows: int):
+    """生成测试数据，约十分之一的 note 为 NULL（空字段）"""
+    rng = random.Random(42)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "amount", "created", "note"])
+        for i in range(rows):
+            writer.writerow([
+                i,
+                f"user_{rng.randrange(1_000_000)}",
+                f"{rng.uniform(0, 10000):.2f}",
+                f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} 12:00:00",
+                "" if i % 10 == 0 else "x" * rng.randrange(10, 200),
+            ])
+
+
+def reset_table(dao: MysqlDao):
+    for sql in (f"DROP TABLE IF EXISTS {TABLE}", CREATE_TABLE):
+        success, message, _ = dao.execute_sql(sql)
+        if not success:
+            raise RuntimeError(message)
+
+
+def run_loader(dao: MysqlDao, path: str, method: str, workers: int) -> dict:
+    reset_table(dao)
+    result = MysqlBulkLoader(dao, TABLE, method=method, workers=workers).load(path)
+    return {
+        "method": result.method,
+        "workers": workers,
+        "rows": result.rows,
+        "seconds": result.seconds,
+        "rows_per_second": result.rows_per_second,
+        "statements": result.statements,
+    }
+
+
+def run_single(dao: MysqlDao, path: str, rows: int) -> dict:
+    """逐行 execute_sql，对应没有批量导入时的做法"""
+    reset_table(dao)
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        sql = f"INSERT INTO {TABLE} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        start = time.perf_counter()
+        for count, row in enumerate(reader):
+            if count >= rows:
+                break
+            success, message, _ = dao.execute_sql(sql, [value or None for value in row])
+            if not success:
+                raise RuntimeError(message)
+        elapsed = time.perf_counter() - start
+    return {"method": "single", "workers": 1, "rows": rows, "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed > 0 else 0.0, "statements": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySQL 批量导入基准测试")
+    parser.add_argument("--host", default="127.0.0.1", help="服务器地址")
+    parser.add_argument("--port", type=int, default=3306, help="端口")
+    parser.add_argument("--user", default="root", help="用户名")
+    parser.add_argument("--password", default="", help="密码")
+    parser.add_argument("--database", default="test", help="测试表所在的库")
+    parser.add_argument("--rows", type=int, default=100_000, help="批量导入的行数")
+    parser.add_argument("--single-rows", type=int, default=2000, help="逐行导入测试的行数，0 表示跳过")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="INSERT 方式的工作线程数")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    args = parser.parse_args()
+
+    session = DatabaseSession(
+        database_type="Mysql",
+        ip_address=args.host,
+        port=args.port,
+        username=args.user,
+        password=args.password,
+        database=args.database,
+    )
+    dao = MysqlDao(session)
+    dao.set_log_callback(print)
+
+    fd, path = tempfile.mkstemp(prefix="dbvigil-bench-", suffix=".csv")
+    os.close(fd)
+    results = []
+    try:
+        write_csv(path, args.rows)
+        print(f"测试数据 {args.rows} 行，{os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        if args.single_rows:
+            results.append(run_single(dao, path, min(args.single_rows, args.rows)))
+        for workers in args.workers:
+            results.append(run_loader(dao, path, "insert", workers))
+        result = run_loader(dao, path, "auto", max(args.workers))
+        if result["method"] == "load_data":
+            results.append(result)
+        else:
+            print("LOAD DATA LOCAL 不可用（服务端 local_infile=OFF），跳过")
+    finally:
+        os.remove(path)
+        dao.execute_sql(f"DROP TABLE IF EXISTS {TABLE}")
+        dao.close_connection()
+
+    print(f"{'method':>10} {'workers':>8} {'rows':>9} {'seconds':>9} {'rows/s':>10} {'stmts':>7}")
+    for result in results:
+        print(f"{result['method']:>10} {result['workers']:>8} {result['rows']:>9} {result['seconds']:>9.3f} "
+              f"{result['rows_per_second']:>10.0f} {result['statements']:>7}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rows": args.rows, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+MySQL 压缩协议基准测试
+
+对同一查询分别在普通协议与压缩协议下执行若干次，比较耗时与实际传输字节数。
+--bandwidth 给出链路带宽（Mbit/s）时，额外按传输字节数估算该链路上的传输耗时，
+用于在本机或局域网测试时评估低带宽链路上的收益。
+
+用法:
+    python benchmarks/bench_mysql_compression.py --host 127.0.0.1 --user root --password root \\
+        --sql "SELECT * FROM information_schema.COLUMNS" --repeat 5 --bandwidth 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.entities import DatabaseSession
+from database.mysql_dao import MysqlDao
+
+
+def run_mode(session: DatabaseSession, sql: str, repeat: int, compress: bool) -> dict:
+    """在一个新连接上重复执行查询，返回平均耗时与单次传输量"""
+    session.compress = compress
+    conn = MysqlDao(session).connect()
+    try:
+        cursor = conn.cursor()
+        # 预热一次，排除服务端缓存与首次解析的影响
+        cursor.execute(sql)
+        rows = len(cursor.fetchall())
+        before = conn.stats.to_dict()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cursor.execute(sql)
+            cursor.fetchall()
+        elapsed = (time.perf_counter() - start) / repeat
+        after = conn.stats.to_dict()
+        cursor.close()
+        per_query = {name: (after[name] - before[name]) / repeat for name in after}
+        return {
+            "compressed": conn.compressed,
+            "rows": rows,
+            "seconds": elapsed,
+            "bytes_received": per_query["bytes_received"],
+            "payload_received": per_query["payload_received"],
+            "bytes_sent": per_query["bytes_sent"],
+            "connect_time": conn.stats.connect_time,
+        }
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySQL 压缩协议基准测试")
+    parser.add_argument("--host", default="127.0.0.1", help="服务器地址")
+    parser.add_argument("--port", type=int, default=3306, help="端口")
+    parser.add_argument("--user", default="root", help="用户名")
+    parser.add_argument("--password", default="", help="密码")
+    parser.add_argument("--database", default="", help="默认数据库")
+    parser.add_argument("--sql", default="SELECT * FROM information_schema.COLUMNS", help="测试查询")
+    parser.add_argument("--repeat", type=int, default=5, help="每种模式的执行次数")
+    parser.add_argument("--bandwidth", type=float, help="估算用的链路带宽，Mbit/s")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    args = parser.parse_args()
+
+    session = DatabaseSession(
+        database_type="Mysql",
+        ip_address=args.host,
+        port=args.port,
+        username=args.user,
+        password=args.password,
+        database=args.database,
+    )
+
+    results = {}
+    for name, compress in (("plain", False), ("compress", True)):
+        result = run_mode(session, args.sql, args.repeat, compress)
+        if args.bandwidth:
+            # 链路传输耗时 + 本机实测耗时（含压缩/解压）
+            result["estimated_seconds"] = (
+                result["bytes_received"] * 8 / (args.bandwidth * 1_000_000) + result["seconds"]
+            )
+        results[name] = result
+
+    plain, compressed = results["plain"], results["compress"]
+    if not compressed["compressed"]:
+        print("服务端不支持压缩协议，压缩模式实际使用普通协议")
+    print(f"查询返回 {plain['rows']} 行，每种模式执行 {args.repeat} 次")
+    print(f"{'mode':>9} {'recv KB':>10} {'sent KB':>9} {'query ms':>10} {'est. ms':>10}")
+    for name, result in results.items():
+        estimated = result.get("estimated_seconds")
+        print(f"{name:>9} {result['bytes_received'] / 1024:>10.1f} {result['bytes_sent'] / 1024:>9.1f} "
+              f"{result['seconds'] * 1000:>10.2f} "
+              f"{(f'{estimated * 1000:.2f}' if estimated is not None else '-'):>10}")
+    ratio = plain["bytes_received"] / max(compressed["bytes_received"], 1)
+    print(f"接收字节压缩比 {ratio:.2f}")
+
+    if args.output:
+        report = {"sql": args.sql, "repeat": args.repeat, "bandwidth": args.bandwidth,
+                  "ratio": ratio, "results": results}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+会话库基准测试套件
+
+在 10k / 100k / 1M 行的合成会话库上测量 ManagerDao 各操作与主窗口表格模型的耗时，
+结果写入 JSON 文件，可与上一次（或上一个版本）的结果对比以发现性能回退。
+
+用法:
+    python benchmarks/bench_session_store.py
+    python benchmarks/bench_session_store.py --sizes 10000,100000 --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.entities import DatabaseSession
+from core.manager_dao import ManagerDao
+
+# 对比时超过该比例的变慢视为回退
+REGRESSION_THRESHOLD = 0.2
+
+DATABASE_TYPES = ["Mysql", "Mssql", "PostgreSql"]
+
+
+def generate_store(db_path: str, rows: int, seed: int) -> float:
+    """生成合成会话库，返回批量导入耗时"""
+    rng = random.Random(seed)
+    jsonl_path = db_path + ".jsonl"
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                "database_type": rng.choice(DATABASE_TYPES),
+                "ip_address": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                "port": rng.choice([3306, 1433, 5432]),
+                "username": "root",
+                "password": "bench",
+                "database": f"db_{rng.randint(0, 500)}",
+                "memo": f"客户 {i} 测试环境 {rng.randint(0, 100000)}",
+                "add_time": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00",
+            }, ensure_ascii=False) + "\n")
+
+    dao = ManagerDao(db_path)
+    start = time.perf_counter()
+    dao.import_databases(jsonl_path, chunk_size=5000)
+    elapsed = time.perf_counter() - start
+    dao.close_connection()
+    os.remove(jsonl_path)
+    return elapsed
+
+
+def timed(func, repeat: int = 1) -> float:
+    """执行 repeat 次，返回单次耗时中位数（秒），比平均值更不易受抖动影响"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def bench_dao(dao: ManagerDao, rows: int, repeat: int, rng: random.Random) -> dict:
+    """ManagerDao 各操作耗时"""
+    results = {}
+
+    results["list_databases"] = timed(dao.list_databases)
+
+    # 内存单独测量，tracemalloc 本身会拖慢计时
+    tracemalloc.start()
+    sessions = dao.list_databases()
+    results["list_databases_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    del sessions
+
+    ids = [rng.randint(1, rows) for _ in range(repeat)]
+    it = iter(ids)
+    results["find_data_by_id"] = timed(lambda: dao.find_data_by_id(next(it)), repeat)
+
+    results["query_first_page"] = timed(lambda: dao.query_databases(limit=200), repeat)
+    deep = dao.query_databases(offset=rows - 201, limit=1)[0]
+    results["query_keyset_last_page"] = timed(lambda: dao.query_databases(limit=200, after=deep), repeat)
+    results["query_offset_last_page"] = timed(lambda: dao.query_databases(offset=rows - 200, limit=200), 3)
+    results["count_by_type"] = timed(lambda: dao.count_databases(database_type="Mysql"), 3)
+    results["search_keyword"] = timed(lambda: dao.search_databases("测试环境 99"), repeat)
+
+    added = []
+    results["add_database"] = timed(
+        lambda: added.append(dao.add_database(DatabaseSession(ip_address="192.168.0.1", port=3306))),
+        repeat
+    )
+    targets = iter(list(added))
+
+    def update():
+        session = dao.find_data_by_id(next(targets))
+        session.memo = "updated"
+        dao.update_database(session)
+
+    results["update_database"] = timed(update, repeat)
+    targets = iter(list(added))
+    results["delete_database"] = timed(lambda: dao.delete_database(next(targets)), repeat)
+    return results
+
+
+def bench_model(dao: ManagerDao) -> dict:
+    """主窗口会话模型（离屏 Qt 平台）的加载耗时"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6.QtWidgets import QApplication
+        from gui.session_table_model import SessionTableModel
+    except ImportError:
+        return {}
+
+    app = QApplication.instance() or QApplication([])
+    model = SessionTableModel(dao)
+    results = {}
+
+    def first_paint():
+        model.reload()
+        model.fetchMore()
+        for row in range(min(50, model.rowCount())):
+            for column in range(model.columnCount()):
+                model.data(model.index(row, column))
+
+    results["model_first_paint"] = timed(first_paint, 3)
+
+    def scroll_pages(pages: int = 50):
+        for _ in range(pages):
+            if not model.canFetchMore():
+                break
+            model.fetchMore()
+
+    model.reload()
+    results["model_fetch_50_pages"] = timed(scroll_pages)
+
+    dao.remove_change_listener(model.session_changed.emit)
+    app.processEvents()
+    return results
+
+
+def git_revision() -> str:
+    """当前代码版本"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, baseline_path: str):
+    """与基线结果对比，打印变化并返回是否存在回退"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressed = False
+    print(f"\n对比基线 {baseline_path} ({baseline['meta'].get('revision', '')})")
+    for size, metrics in current["results"].items():
+        old_metrics = baseline["results"].get(size, {})
+        for name, value in metrics.items():
+            old = old_metrics.get(name)
+            if not old:
+                continue
+            change = (value - old) / old
+            mark = ""
+            if change > REGRESSION_THRESHOLD:
+                mark = "  <-- 回退"
+                regressed = True
+            print(f"{size:>8} {name:<28} {old:>12.6f} -> {value:>12.6f} ({change:+.1%}){mark}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话库基准测试套件")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="会话库行数列表，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=200, help="单行操作重复次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子，保证数据可复现")
+    parser.add_argument("--output", default="bench_session_store.json", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="基线结果 JSON 文件，存在回退时退出码为 1")
+    parser.add_argument("--no-gui", action="store_true", help="跳过表格模型测试")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+
+    for rows in (int(x) for x in args.sizes.split(",")):
+        rng = random.Random(args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            metrics = {"import_databases": generate_store(db_path, rows, args.seed)}
+
+            start = time.perf_counter()
+            dao = ManagerDao(db_path)
+            metrics["open_store"] = time.perf_counter() - start
+
+            metrics.update(bench_dao(dao, rows, args.repeat, rng))
+            if not args.no_gui:
+                metrics.update(bench_model(dao))
+            dao.close_connection()
+
+        report["results"][str(rows)] = metrics
+        print(f"\n[{rows} 行]")
+        for name, value in metrics.items():
+            unit = "MB" if name.endswith("_mb") else "ms"
+            shown = value if unit == "MB" else value * 1000
+            print(f"  {name:<28} {shown:>12.3f} {unit}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.compare and compare(report, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,158 @@
 """
 数据库会话实体类
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
-@dataclass
+def to_int(value, default: int = 0) -> int:
+    """将存储值转换为整数，空值或无法解析时返回默认值"""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def to_bool(value) -> bool:
+    """将存储值转换为布尔值，兼容旧版本的 "true"/"false" 字符串"""
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "false", "0")
+    return bool(value)
+
+
+@dataclass(slots=True)
 class DatabaseSession:
     """数据库会话实体类"""
     id: Optional[int] = None
     database_type: str = "Mysql"  # Mysql, Mssql, PostgreSql
     ip_address: str = ""
-    port: str = ""
+    port: int = 0
     username: str = ""
     password: str = ""
     database: str = ""
-    timeout: str = "60"
+    timeout: int = 60
     memo: str = ""
-    is_http: str = "false"  # 是否使用HTTP通道
+    is_http: bool = False  # 是否使用HTTP通道
     url: str = ""
     encryption_key: str = ""
-    is_proxy: str = "false"  # 是否使用代理
+    is_proxy: bool = False  # 是否使用代理
     proxy_type: str = ""
     proxy_address: str = ""
-    proxy_port: str = ""
+    proxy_port: int = 0
     proxy_username: str = ""
     proxy_password: str = ""
     http_headers: str = ""
     connect_type: str = "直连"  # 直连或HTTP
     add_time: str = ""
+    compress: bool = False  # 是否启用 MySQL 压缩协议
     
     def __post_init__(self):
         if not self.add_time:
             self.add_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # 根据是否使用HTTP设置连接类型
-        if self.is_http != "false":
+        if self.is_http:
             self.connect_type = "HTTP"
         else:
             self.connect_type = "直连"
     
     def to_dict(self):
         """转换为字典"""
-        return {
-            'id': self.id,
-            'database_type': self.database_type,
-            'ip_address': self.ip_address,
-            'port': self.port,
-            'username': self.username,
-            'password': self.password,
-            'database': self.database,
-            'timeout': self.timeout,
-            'memo': self.memo,
-            'is_http': self.is_http,
-            'url': self.url,
-            'encryption_key': self.encryption_key,
-            'is_proxy': self.is_proxy,
-            'proxy_type': self.proxy_type,
-            'proxy_address': self.proxy_address,
-            'proxy_port': self.proxy_port,
-            'proxy_username': self.proxy_username,
-            'proxy_password': self.proxy_password,
-            'http_headers': self.http_headers,
-            'connect_type': self.connect_type,
-            'add_time': self.add_time
-        }
+        return {name: getattr(self, name) for name in SESSION_FIELDS}
     
     @classmethod
     def from_dict(cls, data: dict):
-        """从字典创建实例"""
+        """从字典创建实例，字符串形式的数字和布尔值会被转换"""
+        data = dict(data)
+        for name in _INT_FIELDS:
+            if name in data:
+                data[name] = to_int(data[name], _INT_DEFAULTS[name])
+        for name in _BOOL_FIELDS:
+            if name in data:
+                data[name] = to_bool(data[name])
         return cls(**data)
+    
+    @classmethod
+    def from_row(cls, row) -> "DatabaseSession":
+        """从按 SESSION_FIELDS 顺序排列的数据行创建实例"""
+        (session_id, database_type, ip_address, port, username, password, database,
+         timeout, memo, is_http, url, encryption_key, is_proxy, proxy_type,
+         proxy_address, proxy_port, proxy_username, proxy_password, http_headers,
+         connect_type, add_time, compress) = row
+        return cls(
+            session_id, database_type, ip_address, to_int(port), username or "",
+            password or "", database or "", to_int(timeout, 60), memo or "",
+            to_bool(is_http), url or "", encryption_key or "", to_bool(is_proxy),
+            proxy_type or "", proxy_address or "", to_int(proxy_port),
+            proxy_username or "", proxy_password or "", http_headers or "",
+            connect_type, add_time, to_bool(compress)
+        )
+
+
+# 实体字段顺序，与会话表列顺序一致
+SESSION_FIELDS = tuple(DatabaseSession.__dataclass_fields__)
+
+_INT_DEFAULTS = {'port': 0, 'timeout': 60, 'proxy_port': 0}
+_INT_FIELDS = tuple(_INT_DEFAULTS)
+_BOOL_FIELDS = ('is_http', 'is_proxy', 'compress')
+
+
+def session_row_factory(cursor, row) -> DatabaseSession:
+    """sqlite3 行工厂，直接由查询结果构建会话实体"""
+    return DatabaseSession.from_row(row)
+
+
+@dataclass(slots=True)
+class TableMeta:
+    """表结构缓存：表"""
+    schema: str
+    name: str
+    table_type: str = ""
+    engine: str = ""
+    table_rows: int = 0
+    comment: str = ""
+
+
+@dataclass(slots=True)
+class ColumnMeta:
+    """表结构缓存：列"""
+    name: str
+    column_type: str = ""
+    nullable: bool = True
+    column_key: str = ""  # PRI / UNI / MUL
+    default: Optional[str] = None
+    extra: str = ""
+    comment: str = ""
+
+
+@dataclass(slots=True)
+class IndexMeta:
+    """表结构缓存：索引"""
+    name: str
+    columns: List[str] = field(default_factory=list)
+    unique: bool = False
+
+
+@dataclass(slots=True)
+class QueryHistoryEntry:
+    """查询历史：同一会话中指纹相同的语句合并为一条"""
+    id: int
+    session_id: int
+    fingerprint: str
+    normalized: str
+    sql: str  # 最近一次执行的原文
+    exec_count: int = 0
+    error_count: int = 0
+    first_run: float = 0.0
+    last_run: float = 0.0
+    last_duration: float = 0.0  # 秒
+    total_duration: float = 0.0
+    last_rows: int = 0
+    last_error: str = ""
+    
+    @property
+    def mean_duration(self) -> float:
+        return self.total_duration / self.exec_count if self.exec_count else 0.0
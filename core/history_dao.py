@@ -0,0 +1,297 @@
+"""
+查询历史DAO与后台记录器
+
+语句先规范化（去注释、字面量替换为 ?、IN 列表与多行 VALUES 合并、关键字小写、空白归一）
+再计算指纹，同一会话中指纹相同的语句合并为一条，记录执行次数、最近耗时与行数。
+记录由后台线程批量写入，执行查询的线程只需把记录放入队列。
+"""
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+from core.entities import QueryHistoryEntry
+from core.manager_dao import ManagerDao
+
+
+# 默认保留的历史条数（全部会话合计），超出时淘汰最久未执行的
+DEFAULT_MAX_ENTRIES = 10000
+
+# 单条语句保存的最大长度，超出部分截断（指纹按完整语句计算）
+MAX_SQL_LENGTH = 64 * 1024
+
+# 每写入多少条记录执行一次淘汰
+_PRUNE_EVERY = 500
+
+_TOKEN_PATTERN = re.compile(r"""
+      (?P<comment>--(?=\s|$)[^\n]*|\#[^\n]*|/\*(?!!).*?(?:\*/|$))
+    | (?P<string>'(?:[^'\\]|\\.|'')*(?:'|$)|"(?:[^"\\]|\\.|"")*(?:"|$))
+    | (?P<identifier>`(?:[^`]|``)*(?:`|$))
+    | (?P<number>\b0x[0-9a-f]+\b|\b\d+(?:\.\d*)?(?:e[-+]?\d+)?\b|\.\d+(?:e[-+]?\d+)?\b)
+    | (?P<space>\s+)
+    | (?P<word>[^\W\d][\w$]*|.)
+""", re.S | re.I | re.X)
+
+# 占位符列表：(?, ?, ?) -> (?+)，多行 VALUES (?+), (?+) -> (?+)
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_PUNCTUATION_SPACE = re.compile(r"\s*([(),=<>!;])\s*")
+
+_UPSERT_SQL = '''
+    INSERT INTO query_history (
+        session_id, fingerprint, normalized, sql, exec_count, error_count,
+        first_run, last_run, last_duration, total_duration, last_rows, last_error
+    ) VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (session_id, fingerprint) DO UPDATE SET
+        sql = excluded.sql,
+        exec_count = exec_count + 1,
+        error_count = error_count + excluded.error_count,
+        last_run = excluded.last_run,
+        last_duration = excluded.last_duration,
+        total_duration = total_duration + excluded.total_duration,
+        last_rows = excluded.last_rows,
+        last_error = excluded.last_error
+'''
+
+_SELECT_COLUMNS = '''
+    id, session_id, fingerprint, normalized, sql, exec_count, error_count,
+    first_run, last_run, last_duration, total_duration, last_rows, last_error
+'''
+
+# 允许的排序字段
+SORTABLE_COLUMNS = ('last_run', 'exec_count', 'last_duration', 'total_duration', 'error_count')
+
+
+def normalize_sql(sql: str) -> str:
+    """规范化语句，字面量不同但结构相同的语句得到相同结果"""
+    parts = []
+    for match in _TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'comment' or kind == 'space':
+            parts.append(' ')
+        elif kind == 'string' or kind == 'number':
+            parts.append('?')
+        elif kind == 'identifier':
+            parts.append(match.group())
+        else:
+            parts.append(match.group().lower())
+    text = ' '.join(''.join(parts).split())
+    text = _PLACEHOLDER_LIST.sub('(?+)', text)
+    text = _REPEATED_LIST.sub('(?+)', text)
+    text = _PUNCTUATION_SPACE.sub(r'\1', text).replace(',', ', ')
+    return text.rstrip(';').strip()
+
+
+def canonical_sql(sql: str) -> str:
+    """去掉注释并归一空白，保留字面量与大小写；文本相同的语句结果相同，可用作缓存键"""
+    parts = []
+    for match in _TOKEN_PATTERN.finditer(sql):
+        if match.lastgroup == 'comment' or match.lastgroup == 'space':
+            # 只归一字面量之外的空白
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        else:
+            parts.append(match.group())
+    return ''.join(parts).strip().rstrip(';').rstrip()
+
+
+def fingerprint(normalized: str) -> str:
+    """规范化语句的指纹"""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class QueryHistoryDao:
+    """查询历史，数据存放在会话库中，与 ManagerDao 共用各线程的 SQLite 连接"""
+    
+    def __init__(self, manager_dao: ManagerDao):
+        self.manager_dao = manager_dao
+        # 是否可用 FTS5 全文索引，由 _init_search_index 探测
+        self.fts_enabled = False
+        self._init_search_index()
+    
+    def _init_search_index(self):
+        """初始化语句原文的 FTS5 全文索引（trigram 分词）"""
+        conn = self.manager_dao.get_connection()
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'query_history_fts'"
+        ).fetchall()
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS query_history_fts USING fts5(
+                        sql, content='query_history', content_rowid='id', tokenize='trigram'
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS query_history_fts_insert AFTER INSERT ON query_history BEGIN
+                        INSERT INTO query_history_fts (rowid, sql) VALUES (new.id, new.sql);
+                    END
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS query_history_fts_delete AFTER DELETE ON query_history BEGIN
+                        INSERT INTO query_history_fts (query_history_fts, rowid, sql) VALUES ('delete', old.id, old.sql);
+                    END
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS query_history_fts_update AFTER UPDATE OF sql ON query_history BEGIN
+                        INSERT INTO query_history_fts (query_history_fts, rowid, sql) VALUES ('delete', old.id, old.sql);
+                        INSERT INTO query_history_fts (rowid, sql) VALUES (new.id, new.sql);
+                    END
+                ''')
+                if not exists:
+                    conn.execute("INSERT INTO query_history_fts (query_history_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或版本过低，退化为 LIKE 搜索
+            self.fts_enabled = False
+    
+    def record_many(self, records: List[tuple]):
+        """写入一批执行记录
+        
+        每条为 (会话ID, 指纹, 规范化语句, 原文, 执行时间, 耗时, 行数, 错误信息或 None)。
+        """
+        rows = [
+            (session_id, digest, normalized[:MAX_SQL_LENGTH], sql[:MAX_SQL_LENGTH], int(error is not None),
+             run_at, run_at, duration, duration, rows, error or '')
+            for session_id, digest, normalized, sql, run_at, duration, rows, error in records
+        ]
+        with self.manager_dao.transaction() as conn:
+            conn.executemany(_UPSERT_SQL, rows)
+    
+    def search(self, session_id: Optional[int] = None, keyword: Optional[str] = None, limit: int = 200,
+               order_by: str = 'last_run') -> List[QueryHistoryEntry]:
+        """按关键字搜索历史，结果按 order_by 降序"""
+        if order_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        clauses = []
+        params = []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if keyword:
+            if self.fts_enabled and len(keyword) >= 3:
+                clauses.append("id IN (SELECT rowid FROM query_history_fts WHERE query_history_fts MATCH ?)")
+                params.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                # trigram 至少需要 3 个字符，较短的关键字直接扫描
+                pattern = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("sql LIKE ? ESCAPE '\\'")
+                params.append(pattern)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.manager_dao.get_connection().execute(
+            f"SELECT {_SELECT_COLUMNS} FROM query_history {where} ORDER BY {order_by} DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return [QueryHistoryEntry(*row) for row in rows]
+    
+    def count(self, session_id: Optional[int] = None) -> int:
+        """历史条数"""
+        if session_id is None:
+            row = self.manager_dao.get_connection().execute("SELECT COUNT(*) FROM query_history").fetchone()
+        else:
+            row = self.manager_dao.get_connection().execute(
+                "SELECT COUNT(*) FROM query_history WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0]
+    
+    def delete(self, entry_id: int):
+        """删除一条历史"""
+        with self.manager_dao.transaction() as conn:
+            conn.execute("DELETE FROM query_history WHERE id = ?", (entry_id,))
+    
+    def clear(self, session_id: int):
+        """清空会话的历史"""
+        with self.manager_dao.transaction() as conn:
+            conn.execute("DELETE FROM query_history WHERE session_id = ?", (session_id,))
+    
+    def prune(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> int:
+        """只保留最近执行的 max_entries 条，返回删除数量"""
+        with self.manager_dao.transaction() as conn:
+            cursor = conn.execute('''
+                DELETE FROM query_history WHERE last_run < (
+                    SELECT last_run FROM query_history ORDER BY last_run DESC LIMIT 1 OFFSET ?
+                )
+            ''', (max_entries - 1,))
+            return cursor.rowcount
+
+
+class QueryHistoryRecorder:
+    """后台写入查询历史
+    
+    record() 只把记录放入队列，规范化、计算指纹与写库都在后台线程中完成，
+    队列中积压的记录合并为一个事务写入。on_recorded 在每批写入后于后台线程中调用。
+    """
+    
+    def __init__(self, history_dao: QueryHistoryDao, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 batch_size: int = 200, on_recorded: Optional[Callable[[], None]] = None):
+        self.history_dao = history_dao
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.on_recorded = on_recorded
+        # 最近一次写入失败的原因
+        self.last_error: Optional[str] = None
+        self._queue = queue.SimpleQueue()
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, name="query-history", daemon=True)
+        self._thread.start()
+    
+    def record(self, session_id: int, sql: str, duration: float, rows: int = 0, error: Optional[str] = None):
+        """记录一次执行（线程安全，不阻塞）"""
+        self._queue.put((session_id, sql, time.time(), duration, rows, error))
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前的记录全部写入"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = 5):
+        """写完剩余记录后停止后台线程"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            markers = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+    
+    def _write(self, batch: list):
+        records = []
+        for session_id, sql, run_at, duration, rows, error in batch:
+            normalized = normalize_sql(sql)
+            records.append((session_id, fingerprint(normalized), normalized, sql, run_at, duration, rows, error))
+        try:
+            self.history_dao.record_many(records)
+            self._written += len(records)
+            if self._written >= _PRUNE_EVERY:
+                self._written = 0
+                self.history_dao.prune(self.max_entries)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+            return
+        if self.on_recorded is not None:
+            self.on_recorded()
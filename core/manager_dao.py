@@ -1,198 +1,531 @@
 """
 数据库会话管理DAO，使用SQLite存储会话配置
 """
-import sqlite3
+import csv
+import json
 import os
-from typing import List, Optional
-from core.entities import DatabaseSession
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+from core.entities import DatabaseSession, SESSION_FIELDS, session_row_factory
+from core.migrations import migrate, ip_sort_key
+
+
+# 每个连接缓存的预编译语句数量，SQL 文本保持不变即可复用
+STATEMENT_CACHE_SIZE = 64
+
+# 默认忙等待超时（毫秒）
+DEFAULT_BUSY_TIMEOUT = 5000
+
+_INSERT_SQL = '''
+    INSERT INTO data (
+        database_type, ip_address, port, username, password, database,
+        timeout, memo, is_http, url, encryption_key, is_proxy,
+        proxy_type, proxy_address, proxy_port, proxy_username,
+        proxy_password, http_headers, connect_type, compress, add_time, ip_sort
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_UPDATE_SQL = '''
+    UPDATE data SET
+        database_type = ?, ip_address = ?, port = ?, username = ?,
+        password = ?, database = ?, timeout = ?, memo = ?,
+        is_http = ?, url = ?, encryption_key = ?, is_proxy = ?,
+        proxy_type = ?, proxy_address = ?, proxy_port = ?,
+        proxy_username = ?, proxy_password = ?, http_headers = ?,
+        connect_type = ?, compress = ?, ip_sort = ?
+    WHERE id = ?
+'''
+
+_DELETE_SQL = "DELETE FROM data WHERE id = ?"
+
+# 会话查询列，顺序与 DatabaseSession 字段一致，供 session_row_factory 直接构建实体
+_SESSION_COLUMNS = ", ".join(SESSION_FIELDS)
+
+_SELECT_ALL_SQL = f"SELECT {_SESSION_COLUMNS} FROM data"
+
+_SELECT_BY_ID_SQL = f"SELECT {_SESSION_COLUMNS} FROM data WHERE id = ?"
+
+_FTS_INSERT_TRIGGER_SQL = '''
+    CREATE TRIGGER IF NOT EXISTS data_fts_insert AFTER INSERT ON data BEGIN
+        INSERT INTO data_fts (rowid, memo, ip_address, database)
+        VALUES (new.id, new.memo, new.ip_address, new.database);
+    END
+'''
+
+# 变更事件类型
+CHANGE_INSERTED = "inserted"
+CHANGE_UPDATED = "updated"
+CHANGE_DELETED = "deleted"
+# 批量变更（如导入），会话ID为 0，监听方应整体重新加载
+CHANGE_RESET = "reset"
+
+# 导入导出的字段，不含自增ID
+TRANSFER_FIELDS = (
+    'database_type', 'ip_address', 'port', 'username', 'password', 'database',
+    'timeout', 'memo', 'is_http', 'url', 'encryption_key', 'is_proxy',
+    'proxy_type', 'proxy_address', 'proxy_port', 'proxy_username',
+    'proxy_password', 'http_headers', 'connect_type', 'add_time', 'compress'
+)
+
+# 允许服务端排序的字段
+SORTABLE_COLUMNS = ('id', 'database_type', 'ip_address', 'connect_type', 'memo', 'add_time')
+
+# 使用排序键列的字段：字段 -> (排序列, 由字段值计算排序键的函数)
+_SORT_KEYS = {'ip_address': ('ip_sort', ip_sort_key)}
 
 
 class ManagerDao:
-    """会话管理数据访问对象"""
+    """会话管理数据访问对象
     
-    def __init__(self, db_path: str = "data.db"):
+    每个线程持有独立的 SQLite 连接（WAL 模式），读操作互不阻塞，
+    GUI 线程与工作线程可以同时访问会话库。
+    """
+    
+    def __init__(self, db_path: str = "data.db", busy_timeout: int = DEFAULT_BUSY_TIMEOUT):
         """初始化数据库连接"""
         self.db_path = db_path
-        self.connection = None
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 线程 ident -> (线程弱引用, 连接)，用于统一关闭和回收已退出线程的连接
+        self._connections = {}
+        # 连接代数，close_connection 后递增，使各线程的旧连接失效
+        self._generation = 0
+        # 变更监听器，回调参数为 (变更类型, 会话ID)
+        self._change_listeners: List[Callable[[str, int], None]] = []
+        # 是否可用 FTS5 全文索引，由 _init_search_index 探测
+        self.fts_enabled = False
         self._init_database()
     
     def _init_database(self):
-        """初始化数据库和表结构"""
-        if not os.path.exists(self.db_path):
-            # 创建数据库文件和表
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
-            cursor = self.connection.cursor()
-            
-            # 创建数据表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    database_type TEXT NOT NULL,
-                    ip_address TEXT NOT NULL,
-                    port TEXT NOT NULL,
-                    username TEXT,
-                    password TEXT,
-                    database TEXT,
-                    timeout TEXT DEFAULT '60',
-                    memo TEXT,
-                    is_http TEXT DEFAULT 'false',
-                    url TEXT,
-                    encryption_key TEXT,
-                    is_proxy TEXT DEFAULT 'false',
-                    proxy_type TEXT,
-                    proxy_address TEXT,
-                    proxy_port TEXT,
-                    proxy_username TEXT,
-                    proxy_password TEXT,
-                    http_headers TEXT,
-                    connect_type TEXT,
-                    add_time TEXT
-                )
-            ''')
-            self.connection.commit()
-        else:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
+        """初始化数据库和表结构，按版本执行迁移"""
+        conn = self.get_connection()
+        migrate(conn)
+        self._init_search_index(conn)
+    
+    def _init_search_index(self, conn: sqlite3.Connection):
+        """初始化 FTS5 全文索引（trigram 分词，支持任意片段匹配）"""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_fts'"
+        ).fetchall()
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS data_fts USING fts5(
+                        memo, ip_address, database,
+                        content='data', content_rowid='id', tokenize='trigram'
+                    )
+                ''')
+                conn.execute(_FTS_INSERT_TRIGGER_SQL)
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS data_fts_delete AFTER DELETE ON data BEGIN
+                        INSERT INTO data_fts (data_fts, rowid, memo, ip_address, database)
+                        VALUES ('delete', old.id, old.memo, old.ip_address, old.database);
+                    END
+                ''')
+                conn.execute('''
+                    CREATE TRIGGER IF NOT EXISTS data_fts_update AFTER UPDATE ON data BEGIN
+                        INSERT INTO data_fts (data_fts, rowid, memo, ip_address, database)
+                        VALUES ('delete', old.id, old.memo, old.ip_address, old.database);
+                        INSERT INTO data_fts (rowid, memo, ip_address, database)
+                        VALUES (new.id, new.memo, new.ip_address, new.database);
+                    END
+                ''')
+                if not exists:
+                    # 已有会话库首次建立索引
+                    conn.execute("INSERT INTO data_fts (data_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或版本过低（trigram 需要 3.34+），退化为 LIKE 搜索
+            self.fts_enabled = False
     
-    def get_connection(self):
-        """获取数据库连接"""
-        if self.connection is None:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
-        return self.connection
+    def _create_connection(self) -> sqlite3.Connection:
+        """创建新的SQLite连接并设置 WAL 与忙等待"""
+        connection = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        # WAL 模式下 NORMAL 同步级别足够安全，且每次提交无需 fsync 主库文件
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def _prune_connections(self):
+        """关闭已退出线程遗留的连接（调用方需持有锁）"""
+        for ident, (thread_ref, connection) in list(self._connections.items()):
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                del self._connections[ident]
+                connection.close()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.generation == self._generation:
+            return connection
+        
+        connection = self._create_connection()
+        thread = threading.current_thread()
+        with self._lock:
+            self._prune_connections()
+            self._connections[thread.ident] = (weakref.ref(thread), connection)
+            self._local.generation = self._generation
+        self._local.connection = connection
+        return connection
     
     def close_connection(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
+        """关闭所有线程的数据库连接"""
+        with self._lock:
+            self._generation += 1
+            for _, connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+        self._local.connection = None
+    
+    def add_change_listener(self, callback: Callable[[str, int], None]):
+        """注册变更监听器，回调在执行写入的线程中调用"""
+        self._change_listeners.append(callback)
+    
+    def remove_change_listener(self, callback: Callable[[str, int], None]):
+        """移除变更监听器"""
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+    
+    def _notify(self, change: str, session_id: int):
+        """记录变更事件，事务提交后统一派发"""
+        if not self._change_listeners:
+            return
+        if getattr(self._local, 'depth', 0):
+            self._local.pending.append((change, session_id))
+        else:
+            self._dispatch([(change, session_id)])
+    
+    def _dispatch(self, events):
+        """派发变更事件"""
+        for change, session_id in events:
+            for callback in list(self._change_listeners):
+                callback(change, session_id)
+    
+    @contextmanager
+    def transaction(self):
+        """在当前线程连接上开启写事务，多次写入只提交一次（可嵌套）
+        
+        事务开始即获取写锁（BEGIN IMMEDIATE），并发写入时按忙等待超时排队，
+        而不会在延迟升级写锁时直接报 database is locked。
+        事务内产生的变更事件在最外层提交后才派发，回滚则丢弃。
+        """
+        conn = self.get_connection()
+        depth = getattr(self._local, 'depth', 0)
+        if not depth:
+            self._local.pending = []
+        self._local.depth = depth + 1
+        try:
+            if depth:
+                yield conn
+            else:
+                with conn:
+                    # 显式开启事务，使 DDL 与查询也处于同一事务中
+                    if not conn.in_transaction:
+                        conn.execute("BEGIN IMMEDIATE")
+                    yield conn
+        finally:
+            self._local.depth = depth
+        
+        if not depth:
+            events, self._local.pending = self._local.pending, []
+            self._dispatch(events)
+    
+    def _session_cursor(self) -> sqlite3.Cursor:
+        """获取直接产出 DatabaseSession 的游标"""
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = session_row_factory
+        return cursor
     
     def list_databases(self) -> List[DatabaseSession]:
         """获取所有数据库会话"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM data")
-        rows = cursor.fetchall()
+        cursor = self._session_cursor()
+        cursor.execute(_SELECT_ALL_SQL)
+        return cursor.fetchall()
+    
+    def _build_filters(self, database_type: Optional[str] = None, ip_address: Optional[str] = None,
+                       add_time_from: Optional[str] = None, add_time_to: Optional[str] = None,
+                       keyword: Optional[str] = None, session_id: Optional[int] = None):
+        """构建过滤条件，返回 (条件列表, 参数列表)"""
+        clauses = []
+        params = []
+        if session_id is not None:
+            clauses.append("id = ?")
+            params.append(session_id)
+        if keyword:
+            if self.fts_enabled and len(keyword) >= 3:
+                clauses.append("id IN (SELECT rowid FROM data_fts WHERE data_fts MATCH ?)")
+                params.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                # trigram 至少需要 3 个字符，较短的关键字直接扫描
+                pattern = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(memo LIKE ? ESCAPE '\\' OR ip_address LIKE ? ESCAPE '\\' "
+                               "OR database LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern, pattern])
+        if database_type:
+            clauses.append("database_type = ?")
+            params.append(database_type)
+        if ip_address:
+            # 前缀匹配改写为范围条件，才能命中 ip_address 索引
+            clauses.append("ip_address >= ? AND ip_address < ?")
+            params.extend([ip_address, ip_address[:-1] + chr(ord(ip_address[-1]) + 1)])
+        if add_time_from:
+            clauses.append("add_time >= ?")
+            params.append(add_time_from)
+        if add_time_to:
+            clauses.append("add_time <= ?")
+            params.append(add_time_to)
+        return clauses, params
+    
+    def query_databases(self, offset: int = 0, limit: Optional[int] = 100, order_by: str = "id",
+                        descending: bool = False, database_type: Optional[str] = None,
+                        ip_address: Optional[str] = None, add_time_from: Optional[str] = None,
+                        add_time_to: Optional[str] = None, keyword: Optional[str] = None,
+                        after: Optional[DatabaseSession] = None) -> List[DatabaseSession]:
+        """分页查询数据库会话
         
-        sessions = []
-        for row in rows:
-            session = DatabaseSession(
-                id=row['id'],
-                database_type=row['database_type'],
-                ip_address=row['ip_address'],
-                port=row['port'],
-                username=row['username'],
-                password=row['password'],
-                database=row['database'],
-                timeout=row['timeout'],
-                memo=row['memo'],
-                is_http=row['is_http'],
-                url=row['url'],
-                encryption_key=row['encryption_key'],
-                is_proxy=row['is_proxy'],
-                proxy_type=row['proxy_type'],
-                proxy_address=row['proxy_address'],
-                proxy_port=row['proxy_port'],
-                proxy_username=row['proxy_username'],
-                proxy_password=row['proxy_password'],
-                http_headers=row['http_headers'],
-                connect_type=row['connect_type'],
-                add_time=row['add_time']
-            )
-            sessions.append(session)
+        ip_address 为前缀匹配，add_time_from/add_time_to 为闭区间，
+        keyword 在备忘、IP、数据库名中做全文片段匹配，limit 为 None 时不限制条数。
+        传入 after（上一页最后一条会话）时使用键集分页，忽略 offset，
+        翻页代价与页码无关。
+        """
+        if order_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
         
-        return sessions
+        clauses, params = self._build_filters(database_type, ip_address, add_time_from, add_time_to, keyword)
+        direction = "DESC" if descending else "ASC"
+        sort_column = _SORT_KEYS[order_by][0] if order_by in _SORT_KEYS else order_by
+        if after is not None:
+            operator = "<" if descending else ">"
+            if order_by == "id":
+                clauses.append(f"id {operator} ?")
+                params.append(after.id)
+            else:
+                after_value = getattr(after, order_by)
+                if order_by in _SORT_KEYS:
+                    after_value = _SORT_KEYS[order_by][1](after_value)
+                clauses.append(f"({sort_column}, id) {operator} (?, ?)")
+                params.extend([after_value, after.id])
+            offset = 0
+        
+        sql = f"SELECT {_SESSION_COLUMNS} FROM data"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by == "id":
+            sql += f" ORDER BY id {direction}"
+        else:
+            sql += f" ORDER BY {sort_column} {direction}, id {direction}"
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+        
+        cursor = self._session_cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    
+    def count_databases(self, database_type: Optional[str] = None, ip_address: Optional[str] = None,
+                        add_time_from: Optional[str] = None, add_time_to: Optional[str] = None,
+                        keyword: Optional[str] = None, session_id: Optional[int] = None) -> int:
+        """统计满足条件的会话数量，指定 session_id 时可用于判断单个会话是否命中过滤条件"""
+        clauses, params = self._build_filters(database_type, ip_address, add_time_from, add_time_to,
+                                              keyword, session_id)
+        sql = "SELECT COUNT(*) FROM data"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self.get_connection().execute(sql, params).fetchall()[0][0]
+    
+    def search_databases(self, keyword: str, limit: Optional[int] = 100) -> List[DatabaseSession]:
+        """按备忘、IP、数据库名的片段搜索会话"""
+        return self.query_databases(limit=limit, keyword=keyword)
     
     def find_data_by_id(self, session_id: int) -> Optional[DatabaseSession]:
         """根据ID查找数据库会话"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM data WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        
-        if row:
-            return DatabaseSession(
-                id=row['id'],
-                database_type=row['database_type'],
-                ip_address=row['ip_address'],
-                port=row['port'],
-                username=row['username'],
-                password=row['password'],
-                database=row['database'],
-                timeout=row['timeout'],
-                memo=row['memo'],
-                is_http=row['is_http'],
-                url=row['url'],
-                encryption_key=row['encryption_key'],
-                is_proxy=row['is_proxy'],
-                proxy_type=row['proxy_type'],
-                proxy_address=row['proxy_address'],
-                proxy_port=row['proxy_port'],
-                proxy_username=row['proxy_username'],
-                proxy_password=row['proxy_password'],
-                http_headers=row['http_headers'],
-                connect_type=row['connect_type'],
-                add_time=row['add_time']
-            )
-        return None
+        cursor = self._session_cursor()
+        cursor.execute(_SELECT_BY_ID_SQL, (session_id,))
+        # 读尽结果使语句复位，未复位的查询会一直持有读快照，导致之后的写入无法等待锁
+        rows = cursor.fetchall()
+        return rows[0] if rows else None
     
-    def add_database(self, session: DatabaseSession) -> int:
-        """添加数据库会话"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO data (
-                database_type, ip_address, port, username, password, database,
-                timeout, memo, is_http, url, encryption_key, is_proxy,
-                proxy_type, proxy_address, proxy_port, proxy_username,
-                proxy_password, http_headers, connect_type, add_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    def find_data_by_ids(self, session_ids: List[int]) -> List[DatabaseSession]:
+        """根据ID批量查找数据库会话，按ID升序返回"""
+        cursor = self._session_cursor()
+        sessions = []
+        # 分批绑定参数，避免超出 SQLite 变量数量上限
+        for start in range(0, len(session_ids), 500):
+            chunk = session_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT {_SESSION_COLUMNS} FROM data WHERE id IN ({placeholders}) ORDER BY id", chunk)
+            sessions.extend(cursor.fetchall())
+        return sessions
+    
+    def _session_params(self, session: DatabaseSession) -> tuple:
+        """INSERT/UPDATE 共用的字段参数，布尔值以 0/1 存储"""
+        return (
             session.database_type, session.ip_address, session.port,
             session.username, session.password, session.database,
-            session.timeout, session.memo, session.is_http, session.url,
-            session.encryption_key, session.is_proxy, session.proxy_type,
+            session.timeout, session.memo, int(session.is_http), session.url,
+            session.encryption_key, int(session.is_proxy), session.proxy_type,
             session.proxy_address, session.proxy_port, session.proxy_username,
             session.proxy_password, session.http_headers, session.connect_type,
-            session.add_time
-        ))
-        
-        conn.commit()
+            int(session.compress)
+        )
+    
+    def _insert_params(self, session: DatabaseSession) -> tuple:
+        """INSERT 语句的参数"""
+        return self._session_params(session) + (session.add_time, ip_sort_key(session.ip_address))
+    
+    def add_database(self, session: DatabaseSession) -> int:
+        """添加数据库会话"""
+        with self.transaction() as conn:
+            cursor = conn.execute(_INSERT_SQL, self._insert_params(session))
+            self._notify(CHANGE_INSERTED, cursor.lastrowid)
         return cursor.lastrowid
     
     def update_database(self, session: DatabaseSession) -> int:
         """更新数据库会话"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE data SET
-                database_type = ?, ip_address = ?, port = ?, username = ?,
-                password = ?, database = ?, timeout = ?, memo = ?,
-                is_http = ?, url = ?, encryption_key = ?, is_proxy = ?,
-                proxy_type = ?, proxy_address = ?, proxy_port = ?,
-                proxy_username = ?, proxy_password = ?, http_headers = ?,
-                connect_type = ?
-            WHERE id = ?
-        ''', (
-            session.database_type, session.ip_address, session.port,
-            session.username, session.password, session.database,
-            session.timeout, session.memo, session.is_http, session.url,
-            session.encryption_key, session.is_proxy, session.proxy_type,
-            session.proxy_address, session.proxy_port, session.proxy_username,
-            session.proxy_password, session.http_headers, session.connect_type,
-            session.id
-        ))
-        
-        conn.commit()
+        with self.transaction() as conn:
+            # 更新时保留原添加时间
+            cursor = conn.execute(_UPDATE_SQL, self._session_params(session) + (
+                ip_sort_key(session.ip_address), session.id
+            ))
+            if cursor.rowcount:
+                self._notify(CHANGE_UPDATED, session.id)
         return cursor.rowcount
     
     def delete_database(self, session_id: int) -> int:
         """删除数据库会话"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM data WHERE id = ?", (session_id,))
-        conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(_DELETE_SQL, (session_id,))
+            if cursor.rowcount:
+                self._notify(CHANGE_DELETED, session_id)
         return cursor.rowcount
+    
+    def get_server_info(self, session_id: int) -> Optional[Tuple[dict, float]]:
+        """读取缓存的服务端信息，返回 (信息, 探测时间戳)，无缓存时返回 None"""
+        rows = self.get_connection().execute(
+            "SELECT info, probed_at FROM server_info WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        try:
+            return json.loads(rows[0][0]), rows[0][1]
+        except ValueError:
+            return None
+    
+    def save_server_info(self, session_id: int, info: dict, probed_at: Optional[float] = None):
+        """保存服务端信息缓存"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO server_info (session_id, info, probed_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(info, ensure_ascii=False), time.time() if probed_at is None else probed_at)
+            )
+    
+    @staticmethod
+    def _detect_format(path: str, fmt: Optional[str]) -> str:
+        """根据参数或扩展名确定文件格式"""
+        fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+        if fmt in ('jsonl', 'ndjson', 'json'):
+            return 'jsonl'
+        if fmt == 'csv':
+            return 'csv'
+        raise ValueError(f"不支持的文件格式: {fmt}")
+    
+    def _read_records(self, path: str, fmt: str) -> Iterator[dict]:
+        """逐条读取导入文件"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            if fmt == 'csv':
+                yield from csv.DictReader(f)
+            else:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+    
+    def import_databases(self, path: str, fmt: Optional[str] = None, chunk_size: int = 1000,
+                         progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """从 JSON Lines 或 CSV 文件批量导入会话
+        
+        所有行在同一个事务中按块 executemany 写入，任一行出错则整体回滚。
+        progress_callback 在每块写入后以已导入条数调用。返回导入条数。
+        """
+        fmt = self._detect_format(path, fmt)
+        default_add_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        count = 0
+        chunk = []
+        with self.transaction() as conn:
+            last_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM data").fetchall()[0][0]
+            if self.fts_enabled:
+                # 逐行触发器维护全文索引很慢，导入期间暂停，结束后一次性补录（同一事务内）
+                conn.execute("DROP TRIGGER IF EXISTS data_fts_insert")
+            
+            for line_no, record in enumerate(self._read_records(path, fmt), 1):
+                values = {k: v for k, v in record.items() if k in TRANSFER_FIELDS and v is not None}
+                # 端口 0 是合法的已保存值（空端口迁移后为 0），只把缺失或空字符串视为缺少
+                if not values.get('database_type') or not values.get('ip_address') or values.get('port') in (None, ''):
+                    raise ValueError(f"第 {line_no} 条记录缺少数据库类型、地址或端口")
+                if not values.get('add_time'):
+                    values['add_time'] = default_add_time
+                chunk.append(self._insert_params(DatabaseSession.from_dict(values)))
+                if len(chunk) >= chunk_size:
+                    conn.executemany(_INSERT_SQL, chunk)
+                    count += len(chunk)
+                    chunk = []
+                    if progress_callback:
+                        progress_callback(count)
+            if chunk:
+                conn.executemany(_INSERT_SQL, chunk)
+                count += len(chunk)
+                if progress_callback:
+                    progress_callback(count)
+            
+            if self.fts_enabled:
+                conn.execute('''
+                    INSERT INTO data_fts (rowid, memo, ip_address, database)
+                    SELECT id, memo, ip_address, database FROM data WHERE id > ?
+                ''', (last_id,))
+                conn.execute(_FTS_INSERT_TRIGGER_SQL)
+            if count:
+                self._notify(CHANGE_RESET, 0)
+        return count
+    
+    def export_databases(self, path: str, fmt: Optional[str] = None, chunk_size: int = 1000,
+                         progress_callback: Optional[Callable[[int], None]] = None) -> int:
+        """将会话流式导出为 JSON Lines 或 CSV 文件
+        
+        按块读取游标并立即写出，不会一次性加载整张表。返回导出条数。
+        """
+        fmt = self._detect_format(path, fmt)
+        columns = ", ".join(TRANSFER_FIELDS)
+        cursor = self.get_connection().execute(f"SELECT {columns} FROM data ORDER BY id")
+        count = 0
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = None
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(TRANSFER_FIELDS)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if writer:
+                    writer.writerows(tuple('' if v is None else v for v in row) for row in rows)
+                else:
+                    f.writelines(json.dumps(dict(zip(TRANSFER_FIELDS, row)), ensure_ascii=False) + '\n'
+                                 for row in rows)
+                count += len(rows)
+                if progress_callback:
+                    progress_callback(count)
+        cursor.close()
+        return count
@@ -0,0 +1,118 @@
+"""
+库表结构缓存DAO，数据存放在会话库中，与 ManagerDao 共用各线程的 SQLite 连接
+"""
+import time
+from itertools import groupby
+from typing import Dict, Iterable, List
+from core.entities import TableMeta, ColumnMeta, IndexMeta
+from core.manager_dao import ManagerDao
+
+
+_META_TABLES = ("meta_table", "meta_column", "meta_index", "meta_schema")
+
+_INSERT_TABLE_SQL = '''
+    INSERT INTO meta_table (session_id, schema_name, table_name, table_type, engine, table_rows, comment)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_INSERT_COLUMN_SQL = '''
+    INSERT INTO meta_column (
+        session_id, schema_name, table_name, ordinal, column_name, column_type,
+        nullable, column_key, column_default, extra, comment
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_INSERT_INDEX_SQL = '''
+    INSERT INTO meta_index (session_id, schema_name, table_name, index_name, seq, column_name, non_unique)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class MetadataDao:
+    """单个会话的库表结构缓存"""
+    
+    def __init__(self, manager_dao: ManagerDao, session_id: int):
+        self.manager_dao = manager_dao
+        self.session_id = session_id
+    
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        return self.manager_dao.get_connection().execute(sql, (self.session_id,) + params).fetchall()
+    
+    def schema_signatures(self) -> Dict[str, str]:
+        """已缓存的库及其签名"""
+        return dict(self._query("SELECT schema_name, signature FROM meta_schema WHERE session_id = ?"))
+    
+    def list_schemas(self) -> List[str]:
+        """已缓存的库名"""
+        rows = self._query("SELECT schema_name FROM meta_schema WHERE session_id = ? ORDER BY schema_name")
+        return [row[0] for row in rows]
+    
+    def list_tables(self, schema: str) -> List[TableMeta]:
+        """库中的表"""
+        rows = self._query('''
+            SELECT schema_name, table_name, table_type, engine, table_rows, comment
+            FROM meta_table WHERE session_id = ? AND schema_name = ? ORDER BY table_name
+        ''', (schema,))
+        return [TableMeta(*row) for row in rows]
+    
+    def list_columns(self, schema: str, table: str) -> List[ColumnMeta]:
+        """表的列，按定义顺序"""
+        rows = self._query('''
+            SELECT column_name, column_type, nullable, column_key, column_default, extra, comment
+            FROM meta_column WHERE session_id = ? AND schema_name = ? AND table_name = ? ORDER BY ordinal
+        ''', (schema, table))
+        return [ColumnMeta(name, column_type, bool(nullable), key, default, extra, comment)
+                for name, column_type, nullable, key, default, extra, comment in rows]
+    
+    def list_indexes(self, schema: str, table: str) -> List[IndexMeta]:
+        """表的索引，主键在前"""
+        rows = self._query('''
+            SELECT index_name, column_name, non_unique
+            FROM meta_index WHERE session_id = ? AND schema_name = ? AND table_name = ?
+            ORDER BY index_name != 'PRIMARY', index_name, seq
+        ''', (schema, table))
+        indexes = []
+        for name, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            indexes.append(IndexMeta(name, [row[1] for row in group], not group[0][2]))
+        return indexes
+    
+    def replace_schemas(self, signatures: Dict[str, str], tables: Iterable[tuple],
+                        columns: Iterable[tuple], indexes: Iterable[tuple]):
+        """整体替换若干库的缓存
+        
+        tables/columns/indexes 的行以 (库名, 表名, ...) 开头，列顺序与对应的 meta_* 表一致（不含 session_id）。
+        """
+        session = (self.session_id,)
+        with self.manager_dao.transaction() as conn:
+            self._delete(conn, list(signatures))
+            conn.executemany(_INSERT_TABLE_SQL, (session + tuple(row) for row in tables))
+            conn.executemany(_INSERT_COLUMN_SQL, (session + tuple(row) for row in columns))
+            conn.executemany(_INSERT_INDEX_SQL, (session + tuple(row) for row in indexes))
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO meta_schema (session_id, schema_name, signature, loaded_at) VALUES (?, ?, ?, ?)",
+                ((self.session_id, name, signature, now) for name, signature in signatures.items())
+            )
+    
+    def remove_schemas(self, schemas: List[str]):
+        """删除已不存在的库的缓存"""
+        with self.manager_dao.transaction() as conn:
+            self._delete(conn, schemas)
+    
+    def _delete(self, conn, schemas: List[str]):
+        # 分批绑定参数，避免超出 SQLite 变量数量上限
+        for start in range(0, len(schemas), 500):
+            chunk = schemas[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            for table in _META_TABLES:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE session_id = ? AND schema_name IN ({placeholders})",
+                    [self.session_id] + chunk
+                )
+    
+    def clear(self):
+        """清空该会话的全部缓存"""
+        with self.manager_dao.transaction() as conn:
+            for table in _META_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (self.session_id,))
@@ -0,0 +1,208 @@
+"""
+操作指标统计
+
+按 (会话, 操作) 记录 connect / query / fetch / close 等操作的次数、错误数、行数、字节数与耗时分布。
+耗时使用对数分桶直方图（HDR 风格：每个 2 的幂区间再均分为若干子桶），内存占用固定，
+百分位的相对误差不超过 1/SUB_BUCKETS。未启用时 timer() 返回共享的空计时器，几乎没有开销。
+"""
+import json
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+# 每个 2 的幂区间的子桶数，决定百分位精度（约 3%）
+SUB_BUCKETS = 32
+
+# 耗时以微秒为单位分桶，小于 1 微秒的计入第一个桶
+_UNIT = 1_000_000
+
+
+class Histogram:
+    """对数分桶的耗时直方图（秒）"""
+    
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+    
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+    
+    @staticmethod
+    def bucket(value: float) -> int:
+        """耗时所在的桶序号"""
+        mantissa, exponent = math.frexp(max(value * _UNIT, 1.0))
+        return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+    
+    @staticmethod
+    def bucket_value(index: int) -> float:
+        """桶的上界（秒）"""
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent) / _UNIT
+    
+    def record(self, value: float):
+        index = self.bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    def percentile(self, pct: float) -> float:
+        """百分位耗时（秒），取所在桶的上界，不超过实际最大值"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class OperationMetrics:
+    """单个 (会话, 操作) 的统计"""
+    
+    __slots__ = ('count', 'errors', 'rows', 'bytes', 'latency')
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.latency = Histogram()
+    
+    def to_dict(self, elapsed: float) -> dict:
+        latency = self.latency
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'ops_per_sec': self.count / elapsed if elapsed > 0 else 0.0,
+            'mean': latency.mean,
+            'min': latency.min if latency.count else 0.0,
+            'p50': latency.percentile(50),
+            'p95': latency.percentile(95),
+            'p99': latency.percentile(99),
+            'max': latency.max,
+        }
+
+
+class _NullTimer:
+    """未启用统计时使用的空计时器"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+    
+    def add(self, rows: int = 0, nbytes: int = 0):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """记录一次操作的耗时，退出时写入统计；块内抛出异常计为错误"""
+    
+    __slots__ = ('registry', 'key', 'rows', 'bytes', 'start')
+    
+    def __init__(self, registry: "MetricsRegistry", key: Tuple[str, str]):
+        self.registry = registry
+        self.key = key
+        self.rows = 0
+        self.bytes = 0
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.registry.record(self.key[0], self.key[1], time.perf_counter() - self.start,
+                             self.rows, self.bytes, exc_type is not None)
+        return False
+    
+    def add(self, rows: int = 0, nbytes: int = 0):
+        """累计本次操作处理的行数与字节数"""
+        self.rows += rows
+        self.bytes += nbytes
+
+
+class MetricsRegistry:
+    """指标注册表，各 DAO 共用模块级实例 metrics"""
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.time()
+        self._operations: Dict[Tuple[str, str], OperationMetrics] = {}
+        self._lock = threading.Lock()
+    
+    def timer(self, session: str, operation: str):
+        """with 块计时：with metrics.timer(key, 'query') as t: ... t.add(rows=n)"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (session, operation))
+    
+    def record(self, session: str, operation: str, duration: float, rows: int = 0, nbytes: int = 0,
+               error: bool = False):
+        """记录一次操作"""
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._operations.get((session, operation))
+            if entry is None:
+                entry = self._operations[(session, operation)] = OperationMetrics()
+            entry.count += 1
+            entry.rows += rows
+            entry.bytes += nbytes
+            if error:
+                entry.errors += 1
+            entry.latency.record(duration)
+    
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """当前统计：{会话: {操作: 指标}}，耗时单位为秒"""
+        elapsed = time.time() - self.started
+        result: Dict[str, Dict[str, dict]] = {}
+        with self._lock:
+            for (session, operation), entry in sorted(self._operations.items()):
+                result.setdefault(session, {})[operation] = entry.to_dict(elapsed)
+        return result
+    
+    def reset(self):
+        """清空统计并重新开始计时"""
+        with self._lock:
+            self._operations.clear()
+            self.started = time.time()
+    
+    def export_json(self, path: str, snapshot: Optional[dict] = None):
+        """导出为 JSON 文件"""
+        report = {
+            'started': self.started,
+            'exported': time.time(),
+            'sessions': snapshot if snapshot is not None else self.snapshot(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+metrics = MetricsRegistry()
+
+
+def session_key(session) -> str:
+    """会话在统计中的名称"""
+    return f"{session.database_type} {session.username}@{session.ip_address}:{session.port}"
@@ -0,0 +1,278 @@
+"""
+会话库结构迁移，使用 PRAGMA user_version 记录当前版本
+"""
+import re
+import sqlite3
+from typing import Callable, List, Tuple
+
+
+_IPV4_PATTERN = re.compile(r"(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})")
+_IPV4_SORT_FORMAT = "{:0>3}.{:0>3}.{:0>3}.{:0>3}".format
+
+
+def ip_sort_key(ip_address) -> str:
+    """IP 排序键：IPv4 按数值补零（10.0.0.2 -> 010.000.000.002），其他地址转小写"""
+    if not ip_address:
+        return ""
+    match = _IPV4_PATTERN.fullmatch(ip_address)
+    if match:
+        return _IPV4_SORT_FORMAT(*match.groups())
+    return ip_address.lower()
+
+
+def _create_base_schema(conn: sqlite3.Connection):
+    """版本 1：原始会话表（早期版本创建的会话库即为此结构）"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            database_type TEXT NOT NULL,
+            ip_address TEXT NOT NULL,
+            port TEXT NOT NULL,
+            username TEXT,
+            password TEXT,
+            database TEXT,
+            timeout TEXT DEFAULT '60',
+            memo TEXT,
+            is_http TEXT DEFAULT 'false',
+            url TEXT,
+            encryption_key TEXT,
+            is_proxy TEXT DEFAULT 'false',
+            proxy_type TEXT,
+            proxy_address TEXT,
+            proxy_port TEXT,
+            proxy_username TEXT,
+            proxy_password TEXT,
+            http_headers TEXT,
+            connect_type TEXT,
+            add_time TEXT
+        )
+    ''')
+
+
+def _convert_typed_columns(conn: sqlite3.Connection):
+    """版本 2：类型化列、IP 排序键与查询索引
+    
+    端口、超时改为 INTEGER，是否HTTP/代理改为 0/1，新增 ip_sort 排序键列。
+    SQLite 不支持修改列类型，用一条 INSERT ... SELECT 重建整表并同时计算排序键，
+    整表只改写一次；索引在数据写入后再建。ID 保持不变，全文索引无需重建
+    （其触发器随旧表删除，由 ManagerDao 重新创建）。
+    """
+    conn.execute('''
+        CREATE TABLE data_typed (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            database_type TEXT NOT NULL,
+            ip_address TEXT NOT NULL,
+            port INTEGER NOT NULL DEFAULT 0,
+            username TEXT NOT NULL DEFAULT '',
+            password TEXT NOT NULL DEFAULT '',
+            database TEXT NOT NULL DEFAULT '',
+            timeout INTEGER NOT NULL DEFAULT 60,
+            memo TEXT NOT NULL DEFAULT '',
+            is_http INTEGER NOT NULL DEFAULT 0,
+            url TEXT NOT NULL DEFAULT '',
+            encryption_key TEXT NOT NULL DEFAULT '',
+            is_proxy INTEGER NOT NULL DEFAULT 0,
+            proxy_type TEXT NOT NULL DEFAULT '',
+            proxy_address TEXT NOT NULL DEFAULT '',
+            proxy_port INTEGER NOT NULL DEFAULT 0,
+            proxy_username TEXT NOT NULL DEFAULT '',
+            proxy_password TEXT NOT NULL DEFAULT '',
+            http_headers TEXT NOT NULL DEFAULT '',
+            connect_type TEXT NOT NULL DEFAULT '直连',
+            add_time TEXT NOT NULL DEFAULT '',
+            ip_sort TEXT NOT NULL DEFAULT ''
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO data_typed
+        SELECT
+            id, database_type, ip_address,
+            CAST(port AS INTEGER),
+            IFNULL(username, ''), IFNULL(password, ''), IFNULL(database, ''),
+            CASE WHEN CAST(timeout AS INTEGER) > 0 THEN CAST(timeout AS INTEGER) ELSE 60 END,
+            IFNULL(memo, ''),
+            CASE WHEN LOWER(TRIM(IFNULL(is_http, ''))) IN ('', 'false', '0') THEN 0 ELSE 1 END,
+            IFNULL(url, ''), IFNULL(encryption_key, ''),
+            CASE WHEN LOWER(TRIM(IFNULL(is_proxy, ''))) IN ('', 'false', '0') THEN 0 ELSE 1 END,
+            IFNULL(proxy_type, ''), IFNULL(proxy_address, ''),
+            CAST(proxy_port AS INTEGER),
+            IFNULL(proxy_username, ''), IFNULL(proxy_password, ''), IFNULL(http_headers, ''),
+            IFNULL(connect_type, '直连'), IFNULL(add_time, ''),
+            ip_sort_key(ip_address)
+        FROM data
+    ''')
+    conn.execute("DROP TABLE data")
+    conn.execute("ALTER TABLE data_typed RENAME TO data")
+    
+    # 过滤与排序使用的索引，末尾带 id 以支持键集分页
+    conn.execute("CREATE INDEX idx_data_type ON data (database_type, id)")
+    conn.execute("CREATE INDEX idx_data_ip ON data (ip_address, id)")
+    conn.execute("CREATE INDEX idx_data_ip_sort ON data (ip_sort, id)")
+    conn.execute("CREATE INDEX idx_data_add_time ON data (add_time, id)")
+
+
+def _create_server_info(conn: sqlite3.Connection):
+    """版本 3：服务端信息缓存表
+    
+    每个会话一行，info 为 JSON。会话删除或连接地址、账号变更时由触发器清除缓存。
+    """
+    conn.execute('''
+        CREATE TABLE server_info (
+            session_id INTEGER PRIMARY KEY,
+            info TEXT NOT NULL,
+            probed_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER server_info_delete AFTER DELETE ON data BEGIN
+            DELETE FROM server_info WHERE session_id = old.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER server_info_update AFTER UPDATE OF ip_address, port, username ON data BEGIN
+            DELETE FROM server_info WHERE session_id = old.id;
+        END
+    ''')
+
+
+def _create_metadata_cache(conn: sqlite3.Connection):
+    """版本 4：库表结构缓存
+    
+    按会话与库（schema）存储表、列、索引，meta_schema 记录每个库的签名，
+    签名未变化的库刷新时不再重新加载。会话删除或连接地址、账号变更时由触发器清除。
+    """
+    conn.execute('''
+        CREATE TABLE meta_schema (
+            session_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            loaded_at REAL NOT NULL,
+            PRIMARY KEY (session_id, schema_name)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE meta_table (
+            session_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            table_type TEXT NOT NULL DEFAULT '',
+            engine TEXT NOT NULL DEFAULT '',
+            table_rows INTEGER NOT NULL DEFAULT 0,
+            comment TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (session_id, schema_name, table_name)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE meta_column (
+            session_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            column_type TEXT NOT NULL DEFAULT '',
+            nullable INTEGER NOT NULL DEFAULT 1,
+            column_key TEXT NOT NULL DEFAULT '',
+            column_default TEXT,
+            extra TEXT NOT NULL DEFAULT '',
+            comment TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (session_id, schema_name, table_name, ordinal)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE meta_index (
+            session_id INTEGER NOT NULL,
+            schema_name TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            index_name TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            column_name TEXT NOT NULL DEFAULT '',
+            non_unique INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (session_id, schema_name, table_name, index_name, seq)
+        ) WITHOUT ROWID
+    ''')
+    cleanup = "; ".join(
+        f"DELETE FROM {table} WHERE session_id = old.id"
+        for table in ("meta_schema", "meta_table", "meta_column", "meta_index")
+    )
+    conn.execute(f"CREATE TRIGGER meta_delete AFTER DELETE ON data BEGIN {cleanup}; END")
+    conn.execute(
+        f"CREATE TRIGGER meta_update AFTER UPDATE OF ip_address, port, username ON data BEGIN {cleanup}; END"
+    )
+
+
+def _add_compress_column(conn: sqlite3.Connection):
+    """版本 5：会话的压缩协议选项"""
+    conn.execute("ALTER TABLE data ADD COLUMN compress INTEGER NOT NULL DEFAULT 0")
+
+
+def _create_query_history(conn: sqlite3.Connection):
+    """版本 6：查询历史
+    
+    同一会话中规范化后相同（指纹相同）的语句合并为一行，记录执行次数、最近耗时与行数。
+    全文索引由 QueryHistoryDao 创建（SQLite 可能不支持 FTS5）。会话删除时由触发器清除。
+    """
+    conn.execute('''
+        CREATE TABLE query_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            normalized TEXT NOT NULL,
+            sql TEXT NOT NULL,
+            exec_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            first_run REAL NOT NULL,
+            last_run REAL NOT NULL,
+            last_duration REAL NOT NULL DEFAULT 0,
+            total_duration REAL NOT NULL DEFAULT 0,
+            last_rows INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NOT NULL DEFAULT ''
+        )
+    ''')
+    conn.execute("CREATE UNIQUE INDEX idx_history_fingerprint ON query_history (session_id, fingerprint)")
+    conn.execute("CREATE INDEX idx_history_session_run ON query_history (session_id, last_run)")
+    # 保留策略按最近执行时间淘汰
+    conn.execute("CREATE INDEX idx_history_run ON query_history (last_run)")
+    conn.execute('''
+        CREATE TRIGGER query_history_delete AFTER DELETE ON data BEGIN
+            DELETE FROM query_history WHERE session_id = old.id;
+        END
+    ''')
+
+
+# (版本号, 说明, 迁移函数)，版本号必须连续递增，已发布的迁移不可修改
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "创建会话表", _create_base_schema),
+    (2, "类型化列、IP 排序键与查询索引", _convert_typed_columns),
+    (3, "服务端信息缓存表", _create_server_info),
+    (4, "库表结构缓存", _create_metadata_cache),
+    (5, "压缩协议选项", _add_compress_column),
+    (6, "查询历史", _create_query_history),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """读取会话库当前结构版本"""
+    return conn.execute("PRAGMA user_version").fetchall()[0][0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """将会话库升级到最新版本，返回执行的迁移数量
+    
+    每个迁移在独立事务中执行并同时写入 user_version，中途失败不会留下半完成的结构。
+    """
+    conn.create_function("ip_sort_key", 1, ip_sort_key, deterministic=True)
+    applied = 0
+    for version, _, migration in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # 加锁后再次确认，避免多个进程同时迁移
+            if version <= get_schema_version(conn):
+                continue
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied += 1
+    return applied
@@ -0,0 +1,218 @@
+"""
+MySQL 异步访问接口
+
+pymysql 是阻塞驱动，这里的协程把阻塞调用交给有上限的线程池执行（线程数与连接池上限一致），
+排队中的查询只占用协程，不额外占用线程。超时或取消时通过另一条连接发送 KILL QUERY，
+服务端立即中断查询，原连接随后归还。交互执行的语句使用 MysqlDao 的控制台连接，会话状态在各次执行之间保持。
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from database.mysql_dao import MysqlDao, ResultStream, DEFAULT_FETCH_SIZE
+
+
+# KILL QUERY 之后等待原调用退出的最长时间（秒）
+KILL_WAIT_TIMEOUT = 10
+
+
+class QueryCancelledError(Exception):
+    """查询在开始执行前已被取消"""
+
+
+class _RunningQuery:
+    """正在执行的查询，记录所用连接的线程ID以便 KILL QUERY"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread_id: Optional[int] = None
+        self.cancelled = False
+        # KILL QUERY 已成功发送
+        self.killed = False
+    
+    def attach(self, connection):
+        """查询开始前登记连接，已取消时不再执行"""
+        with self.lock:
+            if self.cancelled:
+                raise QueryCancelledError("查询已取消")
+            self.thread_id = connection.thread_id()
+    
+    def detach(self):
+        with self.lock:
+            self.thread_id = None
+    
+    def cancel(self) -> Optional[int]:
+        """标记取消，返回需要终止的连接线程ID（尚未开始执行时为 None）"""
+        with self.lock:
+            self.cancelled = True
+            return self.thread_id
+
+
+class AsyncResultStream:
+    """ResultStream 的异步封装，每块数据在线程池中读取"""
+    
+    def __init__(self, dao: "AsyncMysqlDao", stream: ResultStream, query: _RunningQuery, timeout: Optional[float]):
+        self.dao = dao
+        self.stream = stream
+        self.query = query
+        self.timeout = timeout
+        self.columns: List[str] = stream.columns
+    
+    @property
+    def rowcount(self) -> int:
+        return self.stream.rowcount
+    
+    async def chunks(self):
+        """按块异步迭代结果"""
+        chunks = self.stream.chunks()
+        while True:
+            rows = await self.dao._await(self.query, lambda: next(chunks, None), self.timeout)
+            if rows is None:
+                return
+            yield rows
+    
+    async def close(self):
+        """结束查询，未读完且未被 KILL QUERY 中断时丢弃连接
+        
+        被中断的查询要读完剩余的数据，在线程池中进行，不阻塞事件循环。
+        """
+        self.query.detach()
+        self.dao._running.discard(self.query)
+        self.stream.killed = self.query.killed
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.dao.executor, self.stream.close)
+        except RuntimeError:
+            # aclose() 已关闭线程池
+            self.stream.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncMysqlDao:
+    """MySQL 异步访问对象，与同步的 MysqlDao 共用连接池"""
+    
+    def __init__(self, mysql_dao: MysqlDao, max_workers: Optional[int] = None):
+        self.mysql_dao = mysql_dao
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or mysql_dao.pool.max_size, thread_name_prefix="mysql-async"
+        )
+        # KILL QUERY 使用单独的线程，不受查询线程池占满的影响
+        self.kill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mysql-kill")
+        self._running = set()
+    
+    def _kill_query(self, thread_id: int):
+        """通过另一条连接终止指定连接上正在执行的语句"""
+        conn = self.mysql_dao.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"KILL QUERY {int(thread_id)}")
+            self.mysql_dao.log(f"已终止查询 (连接 {thread_id})")
+        finally:
+            conn.close()
+    
+    async def _await(self, query: _RunningQuery, func: Callable[[], Any], timeout: Optional[float]):
+        """在线程池中执行阻塞调用，超时或被取消时终止服务端查询"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            thread_id = query.cancel()
+            if thread_id is not None:
+                try:
+                    await loop.run_in_executor(self.kill_executor, self._kill_query, thread_id)
+                    query.killed = True
+                except Exception as e:
+                    self.mysql_dao.log(f"终止查询失败: {str(e)}")
+                # 等待被中断的调用退出，连接归还后再向调用方报告
+                done, _ = await asyncio.wait({future}, timeout=KILL_WAIT_TIMEOUT)
+                if done and not future.cancelled():
+                    # 被中断的调用必然以异常结束，取出以免事件循环报告未处理的异常
+                    future.exception()
+            raise
+    
+    async def run(self, func: Callable[[Any], Any], timeout: Optional[float] = None, console: bool = False):
+        """从连接池（console 为真时为控制台连接）借出连接执行 func(conn)，
+        timeout 秒内未完成则终止查询并抛出 asyncio.TimeoutError"""
+        query = _RunningQuery()
+        connection = self.mysql_dao.console_connection if console else self.mysql_dao.pool.connection
+        
+        def work():
+            with connection() as conn:
+                query.attach(conn)
+                try:
+                    return func(conn)
+                finally:
+                    query.detach()
+        
+        self._running.add(query)
+        try:
+            return await self._await(query, work, timeout)
+        finally:
+            self._running.discard(query)
+    
+    async def execute_sql(self, sql: str, timeout: Optional[float] = None, params: Optional[Sequence] = None,
+                          prepared: bool = False) -> tuple:
+        """在控制台连接上执行SQL语句，参数与返回值同 MysqlDao.execute_sql；超时与取消以异常形式抛出"""
+        def execute(conn):
+            result = self.mysql_dao.execute_on(conn, sql, params, prepared)
+            self.mysql_dao.track_console(conn, sql)
+            return result
+        
+        try:
+            return await self.run(execute, timeout, console=True)
+        except (asyncio.TimeoutError, asyncio.CancelledError, QueryCancelledError):
+            raise
+        except Exception as e:
+            return (False, str(e), [])
+    
+    async def open_stream(self, sql: str, fetch_size: int = DEFAULT_FETCH_SIZE,
+                          timeout: Optional[float] = None, console: bool = False) -> AsyncResultStream:
+        """流式执行SQL语句，timeout 同时作用于执行与每一块数据的读取；console 为真时使用控制台连接"""
+        query = _RunningQuery()
+        if console:
+            acquire, release = self.mysql_dao.acquire_console, self.mysql_dao.release_console
+        else:
+            acquire, release = self.mysql_dao.pool.acquire, self.mysql_dao.pool.release
+        
+        def open_():
+            conn = acquire()
+            try:
+                query.attach(conn)
+                stream = ResultStream(conn, sql, fetch_size, release, self.mysql_dao.metrics_key,
+                                      self.mysql_dao.log)
+            except BaseException:
+                query.detach()
+                release(conn)
+                raise
+            if console:
+                self.mysql_dao.track_console(conn, sql)
+            return stream
+        
+        self._running.add(query)
+        try:
+            stream = await self._await(query, open_, timeout)
+        except BaseException:
+            self._running.discard(query)
+            raise
+        return AsyncResultStream(self, stream, query, timeout)
+    
+    async def aclose(self):
+        """终止所有执行中的查询并关闭线程池"""
+        loop = asyncio.get_running_loop()
+        for query in list(self._running):
+            thread_id = query.cancel()
+            if thread_id is not None:
+                try:
+                    await loop.run_in_executor(self.kill_executor, self._kill_query, thread_id)
+                    query.killed = True
+                except Exception as e:
+                    self.mysql_dao.log(f"终止查询失败: {str(e)}")
+        self._running.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.kill_executor.shutdown(wait=False)
@@ -0,0 +1,192 @@
+"""
+数据库连接池，每个会话一个，供同一窗口内的并发操作使用
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class _PooledConnection:
+    """池中连接及其时间信息"""
+    __slots__ = ('connection', 'created', 'last_used')
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class ConnectionPool:
+    """有上限的连接池
+    
+    - 借出（acquire）时优先复用最近归还的连接；连接空闲超过 ping_interval 秒时先 ping 确认存活
+    - 连接存活超过 max_lifetime 秒后不再复用，归还时直接关闭
+    - 空闲超过 idle_timeout 秒的连接由后台线程关闭
+    - 借出过程中出现异常且连接已断开时，该连接被丢弃而不是放回池中
+    """
+    
+    def __init__(self, connect: Callable, max_size: int = 4, max_lifetime: float = 1800,
+                 idle_timeout: float = 300, ping_interval: float = 5, checkout_timeout: float = 30):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._in_use = {}  # id(connection) -> _PooledConnection
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+    
+    @property
+    def size(self) -> int:
+        """当前打开的连接数（含借出的）"""
+        return self._size
+    
+    @property
+    def idle_count(self) -> int:
+        """空闲连接数"""
+        return len(self._idle)
+    
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        return now - pooled.created > self.max_lifetime
+    
+    def _close(self, pooled: _PooledConnection):
+        """关闭连接，调用方需已从计数中扣除"""
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+    
+    def _alive(self, pooled: _PooledConnection, now: float) -> bool:
+        """借出前检查连接：超过存活时间视为失效，空闲较久时 ping 一次"""
+        if self._expired(pooled, now) or not pooled.connection.open:
+            return False
+        if now - pooled.last_used > self.ping_interval:
+            try:
+                pooled.connection.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+    
+    def acquire(self, timeout: Optional[float] = None):
+        """借出一个连接，连接数已达上限时等待归还，超时抛出 PoolTimeoutError"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            pooled = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("连接池已关闭")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"等待数据库连接超时（{self.max_size} 个连接均在使用中）")
+                    self._cond.wait(remaining)
+            
+            if pooled is None:
+                # 新建连接在锁外进行，避免阻塞其他线程归还
+                try:
+                    pooled = _PooledConnection(self.connect())
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._alive(pooled, time.monotonic()):
+                self._discard(pooled)
+                continue
+            
+            with self._cond:
+                self._in_use[id(pooled.connection)] = pooled
+            self._start_reaper()
+            return pooled.connection
+    
+    def release(self, connection, discard: bool = False):
+        """归还连接，discard 为 True 或连接已断开、已过期时关闭"""
+        with self._cond:
+            pooled = self._in_use.pop(id(connection), None)
+        if pooled is None:
+            return
+        now = time.monotonic()
+        if discard or self._closed or not connection.open or self._expired(pooled, now):
+            self._discard(pooled)
+            return
+        pooled.last_used = now
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+    
+    def _discard(self, pooled: _PooledConnection):
+        self._close(pooled)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+    
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """借出连接的上下文管理器，退出时自动归还"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            # SQL 错误不影响连接继续使用；断线等错误会使 open 变为 False，归还时被丢弃
+            self.release(conn)
+    
+    def evict_idle(self) -> int:
+        """关闭空闲超时或超过存活时间的连接，返回关闭数量"""
+        now = time.monotonic()
+        evicted = []
+        with self._cond:
+            for pooled in list(self._idle):
+                if now - pooled.last_used > self.idle_timeout or self._expired(pooled, now):
+                    self._idle.remove(pooled)
+                    self._size -= 1
+                    evicted.append(pooled)
+            if evicted:
+                self._cond.notify_all()
+        for pooled in evicted:
+            self._close(pooled)
+        return len(evicted)
+    
+    def _start_reaper(self):
+        """首次借出时启动空闲回收线程"""
+        if self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="connection-pool-reaper", daemon=True)
+            self._reaper.start()
+    
+    def _reap(self):
+        interval = max(1.0, min(self.idle_timeout, self.max_lifetime) / 2)
+        while not self._stop_reaper.wait(interval):
+            self.evict_idle()
+    
+    def close(self):
+        """关闭所有空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._stop_reaper.set()
+        for pooled in idle:
+            self._close(pooled)
@@ -0,0 +1,377 @@
+"""
+CSV / JSON Lines 批量导入 MySQL
+
+读取端按块读取文件，经有界队列交给多个工作线程，每个线程使用各自的连接写入：
+- 默认使用多行 INSERT，每条语句按 max_allowed_packet 自动决定包含的行数
+- 显式启用且服务端允许时使用 LOAD DATA LOCAL INFILE，每块数据先写成临时文件再整体装载
+
+CSV 首行为列名，空字段按 NULL 导入（与 result_export 导出的格式一致）；
+JSON Lines 以第一行对象的键为列名，嵌套的对象与数组按 JSON 文本导入。
+"""
+import contextlib
+import csv
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import pymysql
+
+from core.metrics import metrics
+from database.mysql_connection import LocalInfileConnection
+from database.mysql_dao import MysqlDao
+from database.result_export import detect_format, to_text
+from database.table_browser import quote_identifier
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+METHODS = ('auto', 'load_data', 'insert')
+DUPLICATE_MODES = ('ignore', 'replace')
+
+# 读取端每块的行数
+DEFAULT_CHUNK_ROWS = 5000
+
+# 默认工作线程数，INSERT 方式不超过连接池上限
+DEFAULT_WORKERS = 4
+
+# 单条 INSERT 语句的字节上限；再大对吞吐几乎没有帮助，只增加内存占用
+MAX_STATEMENT_BYTES = 4 << 20
+
+# 为语句中 VALUES 以外部分及协议开销保留的字节数
+_PACKET_MARGIN = 1024
+
+# 客户端或服务端不允许 LOAD DATA LOCAL 时的错误码
+_LOCAL_INFILE_ERRORS = (1148, 2068, 3948)
+
+# 读取端结束标记
+_END = object()
+
+# LOAD DATA 默认格式（制表符分隔、反斜杠转义、\N 表示 NULL）需要转义的字符
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+class BulkLoadResult(NamedTuple):
+    """导入结果"""
+    rows: int  # 读取并发送的行数
+    affected: int  # 服务端报告的影响行数，REPLACE 替换的行计为 2，IGNORE 跳过的行不计
+    seconds: float
+    method: str  # load_data / insert
+    statements: int
+    
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+    
+    def summary(self) -> str:
+        method = "LOAD DATA" if self.method == 'load_data' else "INSERT"
+        return (f"导入 {self.rows} 行（影响 {self.affected} 行），{method} 共 {self.statements} 条语句，"
+                f"耗时 {self.seconds:.3f} 秒，{self.rows_per_second:.0f} 行/秒")
+
+
+def detect_input_format(path: str) -> tuple:
+    """根据文件扩展名判断 (格式, 压缩方式)"""
+    fmt, compression = detect_format(path)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"不支持导入 {fmt} 文件")
+    return fmt, compression
+
+
+def open_input(path: str, compression: Optional[str] = None):
+    """打开二进制输入流，按需解压 gzip / zstd"""
+    if compression is None:
+        return open(path, 'rb')
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 解压需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    raise ValueError(f"不支持的压缩方式: {compression}")
+
+
+def _json_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def read_chunks(stream, fmt: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[List[str], Iterator[list]]:
+    """从二进制流读取 (列名, 数据块迭代器)，每块最多 chunk_rows 行"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.reader(text)
+        columns = next(reader, None)
+        if not columns:
+            raise ValueError("CSV 文件为空或缺少列名行")
+        
+        def chunks():
+            chunk = []
+            for row in reader:
+                # 空字段按 NULL 处理
+                chunk.append(tuple(value or None for value in row))
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        
+        return columns, chunks()
+    
+    if fmt != 'jsonl':
+        raise ValueError(f"不支持的导入格式: {fmt}")
+    lines = (line for line in text if line.strip())
+    first = next(lines, None)
+    if first is None:
+        raise ValueError("JSON Lines 文件为空")
+    first = json.loads(first)
+    if not isinstance(first, dict) or not first:
+        raise ValueError("JSON Lines 每行应为非空对象")
+    columns = list(first)
+    
+    def json_chunks():
+        chunk = [tuple(_json_value(first.get(column)) for column in columns)]
+        for line in lines:
+            record = json.loads(line)
+            chunk.append(tuple(_json_value(record.get(column)) for column in columns))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    return columns, json_chunks()
+
+
+def _tsv_value(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, (bytes, bytearray)):
+        value = to_text(value)
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def write_tsv(path: str, rows: list):
+    """按 LOAD DATA 默认格式写临时文件"""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(''.join('\t'.join(map(_tsv_value, row)) + '\n' for row in rows))
+
+
+class MysqlBulkLoader:
+    """向一个表批量导入数据
+    
+    各工作线程的语句独立提交，导入失败或停止时已提交的部分保留在表中。
+    默认使用多行 INSERT；LOAD DATA LOCAL 需显式指定 method='load_data' 或 'auto'（可用时使用），
+    其连接只会发送本次导入的临时文件，服务端请求其他文件时报错。
+    LOAD DATA LOCAL 遇到重复键时服务端总是按 IGNORE 处理，需要报错时应使用 method='insert'。
+    """
+    
+    def __init__(self, mysql_dao: MysqlDao, table: str, schema: Optional[str] = None, method: str = 'insert',
+                 workers: int = DEFAULT_WORKERS, duplicate: Optional[str] = None,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS, max_statement_bytes: int = MAX_STATEMENT_BYTES,
+                 progress_callback: Optional[Callable[[int, float], None]] = None,
+                 cancel_event: Optional[threading.Event] = None):
+        if method not in METHODS:
+            raise ValueError(f"不支持的导入方式: {method}")
+        if duplicate is not None and duplicate not in DUPLICATE_MODES:
+            raise ValueError(f"不支持的重复键处理方式: {duplicate}")
+        self.mysql_dao = mysql_dao
+        self.table_name = quote_identifier(table) if schema is None else f"{quote_identifier(schema)}.{quote_identifier(table)}"
+        self.method = method
+        self.workers = max(1, workers)
+        self.duplicate = duplicate
+        self.chunk_rows = chunk_rows
+        self.max_statement_bytes = max_statement_bytes
+        # progress_callback(已导入行数, 行/秒) 在工作线程中调用
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._affected = 0
+        self._statements = 0
+        self._start = 0.0
+    
+    def _load_data_sql(self, conn, path: str, columns: Sequence[str]) -> str:
+        modifier = f" {self.duplicate.upper()}" if self.duplicate else ""
+        column_list = ", ".join(map(quote_identifier, columns))
+        return (f"LOAD DATA LOCAL INFILE {conn.escape(path)}{modifier} INTO TABLE {self.table_name} "
+                f"CHARACTER SET utf8mb4 ({column_list})")
+    
+    def _insert_prefix(self, columns: Sequence[str]) -> str:
+        if self.duplicate == 'replace':
+            verb = "REPLACE"
+        elif self.duplicate == 'ignore':
+            verb = "INSERT IGNORE"
+        else:
+            verb = "INSERT"
+        return f"{verb} INTO {self.table_name} ({', '.join(map(quote_identifier, columns))}) VALUES "
+    
+    def _connect_local_infile(self, path: str):
+        """只允许发送 path 的 LOAD DATA LOCAL 连接"""
+        return self.mysql_dao.connect(LocalInfileConnection, local_infile_path=path)
+    
+    def probe_load_data(self, columns: Sequence[str]) -> bool:
+        """用空文件试执行一次 LOAD DATA LOCAL，判断客户端与服务端是否都允许"""
+        fd, path = tempfile.mkstemp(prefix='dbvigil-load-', suffix='.tsv')
+        os.close(fd)
+        try:
+            with contextlib.closing(self._connect_local_infile(path)) as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._load_data_sql(conn, path, columns))
+                cursor.close()
+            return True
+        except pymysql.err.MySQLError as e:
+            if e.args and e.args[0] in _LOCAL_INFILE_ERRORS:
+                self.mysql_dao.log(f"服务端不允许 LOAD DATA LOCAL，改用多行 INSERT: {e.args[-1]}")
+                return False
+            raise
+        finally:
+            os.remove(path)
+    
+    def statement_budget(self) -> int:
+        """单条 INSERT 语句的字节上限：服务端 max_allowed_packet 减去余量，且不超过 max_statement_bytes"""
+        with self.mysql_dao.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT @@max_allowed_packet")
+            max_packet = int(cursor.fetchone()[0])
+            cursor.close()
+        return max(min(max_packet - _PACKET_MARGIN, self.max_statement_bytes), _PACKET_MARGIN)
+    
+    def _report(self, rows: int, affected: int, statements: int = 1):
+        with self._lock:
+            self._rows += rows
+            self._affected += affected
+            self._statements += statements
+            total = self._rows
+        if self.progress_callback:
+            elapsed = time.perf_counter() - self._start
+            self.progress_callback(total, total / elapsed if elapsed > 0 else 0.0)
+    
+    def _execute(self, conn, sql: str, rows: int) -> int:
+        with metrics.timer(self.mysql_dao.metrics_key, 'bulk_load') as timer:
+            cursor = conn.cursor()
+            affected = cursor.execute(sql)
+            cursor.close()
+            timer.add(rows, len(sql))
+        return affected
+    
+    def _load_data_worker(self, chunks: Iterator[list], columns: Sequence[str]):
+        fd, path = tempfile.mkstemp(prefix='dbvigil-load-', suffix='.tsv')
+        os.close(fd)
+        try:
+            with contextlib.closing(self._connect_local_infile(path)) as conn:
+                sql = self._load_data_sql(conn, path, columns)
+                for rows in chunks:
+                    if self.cancel_event.is_set():
+                        continue
+                    write_tsv(path, rows)
+                    self._report(len(rows), self._execute(conn, sql, len(rows)))
+        finally:
+            os.remove(path)
+    
+    def _insert_worker(self, chunks: Iterator[list], columns: Sequence[str], budget: int):
+        prefix = self._insert_prefix(columns)
+        with self.mysql_dao.pool.connection() as conn:
+            escape = conn.escape
+            values: List[str] = []
+            size = len(prefix)
+            
+            def flush():
+                nonlocal values, size
+                if values:
+                    self._report(len(values), self._execute(conn, prefix + ",".join(values), len(values)))
+                values = []
+                size = len(prefix)
+            
+            for rows in chunks:
+                if self.cancel_event.is_set():
+                    continue
+                for row in rows:
+                    # 元组转义为 (v1,v2,...)
+                    value = escape(row)
+                    length = len(value) + 1 if value.isascii() else len(value.encode('utf-8')) + 1
+                    if values and size + length > budget:
+                        flush()
+                        if self.cancel_event.is_set():
+                            break
+                    values.append(value)
+                    size += length
+            if not self.cancel_event.is_set():
+                flush()
+    
+    def load(self, path: str, fmt: Optional[str] = None, compression: Optional[str] = None) -> BulkLoadResult:
+        """导入文件，fmt 与 compression 为空时按扩展名判断；失败时抛出异常"""
+        if fmt is None:
+            fmt, detected = detect_input_format(path)
+            compression = compression or detected
+        with open_input(path, compression) as stream:
+            columns, chunks = read_chunks(stream, fmt, self.chunk_rows)
+            return self.load_chunks(columns, chunks)
+    
+    def load_chunks(self, columns: Sequence[str], chunks) -> BulkLoadResult:
+        """导入数据块迭代器，每块为行元组的列表，列顺序与 columns 一致"""
+        self._rows = self._affected = self._statements = 0
+        self._start = time.perf_counter()
+        method = self.method
+        if method == 'auto':
+            method = 'load_data' if self.probe_load_data(columns) else 'insert'
+        if method == 'load_data':
+            workers = self.workers
+            target, args = self._load_data_worker, (columns,)
+        else:
+            # 工作线程各占一个池连接，多于连接池上限只会互相等待
+            workers = min(self.workers, self.mysql_dao.pool.max_size)
+            target, args = self._insert_worker, (columns, self.statement_budget())
+        
+        pending = queue.Queue(maxsize=workers * 2)
+        errors: List[BaseException] = []
+        
+        def run():
+            finished = False
+            
+            def take():
+                nonlocal finished
+                yield from iter(pending.get, _END)
+                finished = True
+            
+            try:
+                target(take(), *args)
+            except BaseException as e:
+                errors.append(e)
+                self.cancel_event.set()
+                # 取走数据直到本线程的结束标记，避免读取端阻塞
+                if not finished:
+                    for _ in iter(pending.get, _END):
+                        pass
+        
+        threads = [
+            threading.Thread(target=run, name=f"bulk-load-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for rows in chunks:
+                if self.cancel_event.is_set():
+                    break
+                pending.put(rows)
+        finally:
+            for _ in threads:
+                pending.put(_END)
+            for thread in threads:
+                thread.join()
+            load_sql = (f"LOAD DATA LOCAL INFILE '' INTO TABLE {self.table_name}" if method == 'load_data'
+                        else self._insert_prefix(columns) + "()")
+            self.mysql_dao.invalidate_cache(load_sql, console=False)
+        if errors:
+            raise errors[0]
+        return BulkLoadResult(self._rows, self._affected, time.perf_counter() - self._start, method,
+                              self._statements)
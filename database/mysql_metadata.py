@@ -0,0 +1,96 @@
+"""
+MySQL 库表结构加载
+
+从 information_schema 批量读取表、列、索引：先用一条查询取得每个库的签名
+（表数量、最大 CREATE_TIME/UPDATE_TIME、表名校验和），只重新加载签名变化的库，
+每批库只需 TABLES/COLUMNS/STATISTICS 三条查询，不再逐表 SHOW COLUMNS。
+"""
+import time
+from typing import Dict, List
+from core.metadata_dao import MetadataDao
+from database.mysql_dao import MysqlDao
+
+
+# 每批加载的库数量
+SCHEMA_BATCH_SIZE = 200
+
+# 每个库的签名；不缓存 information_schema 与 performance_schema：结构固定，且其 CREATE_TIME 每次查询都会变化
+_SIGNATURE_SQL = """
+    SELECT s.SCHEMA_NAME, COUNT(t.TABLE_NAME), MAX(t.CREATE_TIME), MAX(t.UPDATE_TIME), SUM(CRC32(t.TABLE_NAME))
+    FROM information_schema.SCHEMATA s
+    LEFT JOIN information_schema.TABLES t ON t.TABLE_SCHEMA = s.SCHEMA_NAME
+    WHERE s.SCHEMA_NAME NOT IN ('information_schema', 'performance_schema')
+    GROUP BY s.SCHEMA_NAME
+"""
+
+_TABLES_SQL = """
+    SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, IFNULL(ENGINE, ''), IFNULL(TABLE_ROWS, 0),
+           IFNULL(TABLE_COMMENT, '')
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA IN ({})
+"""
+
+_COLUMNS_SQL = """
+    SELECT TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE = 'YES',
+           COLUMN_KEY, COLUMN_DEFAULT, EXTRA, IFNULL(COLUMN_COMMENT, '')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA IN ({})
+"""
+
+_STATISTICS_SQL = """
+    SELECT TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, IFNULL(COLUMN_NAME, ''), NON_UNIQUE
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA IN ({})
+"""
+
+
+def _text(value):
+    """information_schema 中部分列在某些版本下以二进制返回"""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', 'replace')
+    return value
+
+
+class MysqlMetadataLoader:
+    """将服务端的库表结构同步到本地缓存"""
+    
+    def __init__(self, mysql_dao: MysqlDao, metadata_dao: MetadataDao):
+        self.mysql_dao = mysql_dao
+        self.metadata_dao = metadata_dao
+    
+    @staticmethod
+    def _fetch(cursor, sql: str, schemas: List[str]) -> List[tuple]:
+        cursor.execute(sql.format(", ".join(["%s"] * len(schemas))), schemas)
+        return [tuple(_text(value) for value in row) for row in cursor.fetchall()]
+    
+    def refresh(self, force: bool = False) -> List[str]:
+        """刷新缓存，返回重新加载的库名；force 为真时忽略签名全部重新加载"""
+        start = time.perf_counter()
+        with self.mysql_dao.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(_SIGNATURE_SQL)
+            remote: Dict[str, str] = {
+                _text(row[0]): "|".join(str(_text(value)) for value in row[1:]) for row in cursor.fetchall()
+            }
+            local = self.metadata_dao.schema_signatures()
+            changed = [name for name, signature in remote.items() if force or local.get(name) != signature]
+            removed = [name for name in local if name not in remote]
+            
+            for offset in range(0, len(changed), SCHEMA_BATCH_SIZE):
+                schemas = changed[offset:offset + SCHEMA_BATCH_SIZE]
+                # 先读完再写入本地，避免在等待网络时长时间持有会话库写锁
+                tables = self._fetch(cursor, _TABLES_SQL, schemas)
+                columns = self._fetch(cursor, _COLUMNS_SQL, schemas)
+                indexes = self._fetch(cursor, _STATISTICS_SQL, schemas)
+                self.metadata_dao.replace_schemas(
+                    {name: remote[name] for name in schemas}, tables, columns, indexes
+                )
+            cursor.close()
+        
+        if removed:
+            self.metadata_dao.remove_schemas(removed)
+        self.mysql_dao.log(
+            f"表结构缓存已刷新: {len(changed)}/{len(remote)} 个库重新加载，"
+            f"{len(removed)} 个库已删除，耗时 {time.perf_counter() - start:.2f} 秒"
+        )
+        return changed
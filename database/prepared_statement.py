@@ -0,0 +1,368 @@
+"""
+MySQL 服务端预处理语句（COM_STMT_PREPARE / COM_STMT_EXECUTE）
+
+pymysql 只实现了文本协议，这里基于其数据包读写实现预处理语句与二进制协议结果解码：
+语句在服务端只解析一次，之后每次执行只发送语句句柄与二进制参数，
+结果按列类型直接解码，不经过文本转换。
+
+句柄属于创建它的连接，StatementCache 按 LRU 缓存单个连接上的句柄，
+淘汰时发送 COM_STMT_CLOSE 释放服务端资源；连接关闭时服务端自动释放全部句柄。
+"""
+import datetime
+import struct
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+import pymysql
+from pymysql.constants import COMMAND, ER, FIELD_TYPE, FLAG, SERVER_STATUS
+from pymysql.protocol import FieldDescriptorPacket, OKPacketWrapper
+
+
+# 每个连接缓存的预处理语句数量（服务端全局上限由 max_prepared_stmt_count 控制）
+DEFAULT_STATEMENT_CACHE_SIZE = 64
+
+# 按字符集（charsetnr=63 为二进制）决定解码方式的类型
+_TEXT_TYPES = {
+    FIELD_TYPE.BIT, FIELD_TYPE.BLOB, FIELD_TYPE.LONG_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.STRING,
+    FIELD_TYPE.TINY_BLOB, FIELD_TYPE.VAR_STRING, FIELD_TYPE.VARCHAR, FIELD_TYPE.GEOMETRY,
+}
+
+_BINARY_CHARSET = 63
+
+_EXECUTE_HEADER = struct.Struct('<IBI')
+_PREPARE_OK = struct.Struct('<IHH')
+_UINT16 = struct.Struct('<H')
+_UINT32 = struct.Struct('<I')
+_UINT64 = struct.Struct('<Q')
+_INT64 = struct.Struct('<q')
+_DOUBLE = struct.Struct('<d')
+_FLOAT = struct.Struct('<f')
+_DATE = struct.Struct('<HBB')
+_TIME = struct.Struct('<BIBBB')
+
+# 定长整数列：类型 -> (有符号格式, 无符号格式)
+_INT_TYPES = {
+    FIELD_TYPE.TINY: (struct.Struct('<b'), struct.Struct('<B')),
+    FIELD_TYPE.SHORT: (struct.Struct('<h'), struct.Struct('<H')),
+    FIELD_TYPE.YEAR: (struct.Struct('<h'), struct.Struct('<H')),
+    FIELD_TYPE.INT24: (struct.Struct('<i'), struct.Struct('<I')),
+    FIELD_TYPE.LONG: (struct.Struct('<i'), struct.Struct('<I')),
+    FIELD_TYPE.LONGLONG: (_INT64, _UINT64),
+}
+
+
+class PreparedStatement(NamedTuple):
+    """服务端预处理语句句柄"""
+    sql: str
+    statement_id: int
+    param_count: int
+    column_count: int
+
+
+class PreparedResult(NamedTuple):
+    """预处理语句的执行结果"""
+    columns: List[str]
+    rows: List[tuple]
+    affected_rows: int
+    insert_id: int
+
+
+def _lenenc_int(value: int) -> bytes:
+    if value < 251:
+        return bytes((value,))
+    if value < 1 << 16:
+        return b'\xfc' + _UINT16.pack(value)
+    if value < 1 << 24:
+        return b'\xfd' + value.to_bytes(3, 'little')
+    return b'\xfe' + _UINT64.pack(value)
+
+
+def _lenenc_bytes(value: bytes) -> bytes:
+    return _lenenc_int(len(value)) + value
+
+
+def _encode_param(value: Any, encoding: str) -> tuple:
+    """编码单个参数，返回 (类型, 是否无符号, 数据)"""
+    if isinstance(value, bool):
+        return FIELD_TYPE.TINY, False, bytes((int(value),))
+    if isinstance(value, int):
+        if value >= 1 << 63:
+            return FIELD_TYPE.LONGLONG, True, _UINT64.pack(value)
+        return FIELD_TYPE.LONGLONG, False, _INT64.pack(value)
+    if isinstance(value, float):
+        return FIELD_TYPE.DOUBLE, False, _DOUBLE.pack(value)
+    if isinstance(value, Decimal):
+        return FIELD_TYPE.NEWDECIMAL, False, _lenenc_bytes(str(value).encode('ascii'))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return FIELD_TYPE.BLOB, False, _lenenc_bytes(bytes(value))
+    if isinstance(value, datetime.datetime):
+        return FIELD_TYPE.DATETIME, False, b'\x0b' + _DATE.pack(value.year, value.month, value.day) + bytes(
+            (value.hour, value.minute, value.second)
+        ) + _UINT32.pack(value.microsecond)
+    if isinstance(value, datetime.date):
+        return FIELD_TYPE.DATE, False, b'\x04' + _DATE.pack(value.year, value.month, value.day)
+    if isinstance(value, datetime.timedelta):
+        negative = value < datetime.timedelta(0)
+        value = abs(value)
+        hours, rest = divmod(value.seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        return FIELD_TYPE.TIME, False, b'\x0c' + _TIME.pack(
+            int(negative), value.days, hours, minutes, seconds
+        ) + _UINT32.pack(value.microseconds)
+    if isinstance(value, datetime.time):
+        return FIELD_TYPE.TIME, False, b'\x0c' + _TIME.pack(
+            0, 0, value.hour, value.minute, value.second
+        ) + _UINT32.pack(value.microsecond)
+    if not isinstance(value, str):
+        value = str(value)
+    return FIELD_TYPE.VAR_STRING, False, _lenenc_bytes(value.encode(encoding))
+
+
+def _encode_params(params: Sequence, encoding: str) -> bytes:
+    """COM_STMT_EXECUTE 的参数部分：NULL 位图、类型列表、参数值"""
+    null_bitmap = bytearray((len(params) + 7) // 8)
+    types = bytearray()
+    values = []
+    for index, value in enumerate(params):
+        if value is None:
+            null_bitmap[index >> 3] |= 1 << (index & 7)
+            types += bytes((FIELD_TYPE.NULL, 0))
+            continue
+        field_type, unsigned, data = _encode_param(value, encoding)
+        types += bytes((field_type, 0x80 if unsigned else 0))
+        values.append(data)
+    # new_params_bound_flag = 1：每次执行都发送参数类型
+    return bytes(null_bitmap) + b'\x01' + bytes(types) + b''.join(values)
+
+
+def _read_lenenc(data: bytes, pos: int) -> tuple:
+    first = data[pos]
+    if first < 251:
+        return first, pos + 1
+    if first == 252:
+        return _UINT16.unpack_from(data, pos + 1)[0], pos + 3
+    if first == 253:
+        return int.from_bytes(data[pos + 1:pos + 4], 'little'), pos + 4
+    return _UINT64.unpack_from(data, pos + 1)[0], pos + 9
+
+
+def _fixed_decoder(fmt: struct.Struct) -> Callable:
+    unpack_from = fmt.unpack_from
+    size = fmt.size
+    
+    def decode(data, pos):
+        return unpack_from(data, pos)[0], pos + size
+    return decode
+
+
+def _decode_float(data, pos):
+    # FLOAT 为单精度，按 7 位有效数字取值，与文本协议返回的数值一致
+    return float('%.7g' % _FLOAT.unpack_from(data, pos)[0]), pos + 4
+
+
+def _string_decoder(convert: Optional[Callable]) -> Callable:
+    def decode(data, pos):
+        length, pos = _read_lenenc(data, pos)
+        end = pos + length
+        value = data[pos:end]
+        return (convert(value) if convert is not None else value), end
+    return decode
+
+
+def _decode_date(data, pos):
+    length = data[pos]
+    pos += 1
+    if length == 0:
+        return '0000-00-00', pos
+    year, month, day = _DATE.unpack_from(data, pos)
+    try:
+        return datetime.date(year, month, day), pos + length
+    except ValueError:
+        return f"{year:04d}-{month:02d}-{day:02d}", pos + length
+
+
+def _decode_datetime(data, pos):
+    length = data[pos]
+    pos += 1
+    if length == 0:
+        return '0000-00-00 00:00:00', pos
+    year, month, day = _DATE.unpack_from(data, pos)
+    hour = minute = second = microsecond = 0
+    if length >= 7:
+        hour, minute, second = data[pos + 4], data[pos + 5], data[pos + 6]
+    if length >= 11:
+        microsecond = _UINT32.unpack_from(data, pos + 7)[0]
+    try:
+        return datetime.datetime(year, month, day, hour, minute, second, microsecond), pos + length
+    except ValueError:
+        # 零日期等无法表示的值按文本返回，与 pymysql 文本协议的处理一致
+        return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}", pos + length
+
+
+def _decode_time(data, pos):
+    length = data[pos]
+    pos += 1
+    if length == 0:
+        return datetime.timedelta(0), pos
+    negative, days, hours, minutes, seconds = _TIME.unpack_from(data, pos)
+    microseconds = _UINT32.unpack_from(data, pos + 8)[0] if length >= 12 else 0
+    value = datetime.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds, microseconds=microseconds)
+    return (-value if negative else value), pos + length
+
+
+def _column_decoder(field: FieldDescriptorPacket, encoding: str) -> Callable:
+    """按列类型选择二进制值的解码函数"""
+    field_type = field.type_code
+    if field_type in _INT_TYPES:
+        signed, unsigned = _INT_TYPES[field_type]
+        return _fixed_decoder(unsigned if field.flags & FLAG.UNSIGNED else signed)
+    if field_type == FIELD_TYPE.DOUBLE:
+        return _fixed_decoder(_DOUBLE)
+    if field_type == FIELD_TYPE.FLOAT:
+        return _decode_float
+    if field_type == FIELD_TYPE.DATE:
+        return _decode_date
+    if field_type in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return _decode_datetime
+    if field_type == FIELD_TYPE.TIME:
+        return _decode_time
+    if field_type in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+        return _string_decoder(lambda value: Decimal(value.decode('ascii')))
+    if field_type in _TEXT_TYPES and field.charsetnr == _BINARY_CHARSET:
+        return _string_decoder(None)
+    return _string_decoder(lambda value: value.decode(encoding))
+
+
+def _row_decoder(fields: List[FieldDescriptorPacket], encoding: str) -> Callable[[bytes], tuple]:
+    """二进制协议的行解码：0x00 包头、NULL 位图（偏移 2 位）、非 NULL 列的值"""
+    decoders = [_column_decoder(field, encoding) for field in fields]
+    null_length = (len(fields) + 9) // 8
+    
+    def decode(data: bytes) -> tuple:
+        pos = 1 + null_length
+        row = []
+        for index, decoder in enumerate(decoders):
+            bit = index + 2
+            if data[1 + (bit >> 3)] & (1 << (bit & 7)):
+                row.append(None)
+            else:
+                value, pos = decoder(data, pos)
+                row.append(value)
+        return tuple(row)
+    return decode
+
+
+def _is_eof(data: bytes) -> bool:
+    return data[0] == 0xfe and len(data) < 9
+
+
+def _read_result(conn: pymysql.Connection) -> PreparedResult:
+    """读取一个执行结果：OK 包或二进制结果集"""
+    packet = conn._read_packet()
+    if packet.is_ok_packet():
+        ok = OKPacketWrapper(packet)
+        conn.server_status = ok.server_status
+        return PreparedResult([], [], ok.affected_rows, ok.insert_id)
+    
+    column_count = packet.read_length_encoded_integer()
+    fields = [conn._read_packet(FieldDescriptorPacket) for _ in range(column_count)]
+    conn._read_packet()  # 列定义结束的 EOF 包
+    decode = _row_decoder(fields, conn.encoding)
+    rows = []
+    while True:
+        data = conn._read_packet().get_all_data()
+        if _is_eof(data):
+            conn.server_status = _UINT16.unpack_from(data, 3)[0]
+            break
+        rows.append(decode(data))
+    return PreparedResult([field.name for field in fields], rows, len(rows), 0)
+
+
+def prepare(conn: pymysql.Connection, sql: str) -> PreparedStatement:
+    """在服务端预处理语句，参数占位符为 ?"""
+    conn._execute_command(COMMAND.COM_STMT_PREPARE, sql)
+    data = conn._read_packet().get_all_data()
+    statement_id, column_count, param_count = _PREPARE_OK.unpack_from(data, 1)
+    # 参数与列的定义各以一个 EOF 包结束，执行时结果集会重新带上列定义，这里不保留
+    for count in (param_count, column_count):
+        if count:
+            for _ in range(count + 1):
+                conn._read_packet()
+    return PreparedStatement(sql, statement_id, param_count, column_count)
+
+
+def execute_statement(conn: pymysql.Connection, statement: PreparedStatement,
+                      params: Sequence = ()) -> PreparedResult:
+    """执行预处理语句；有多个结果（如 CALL）时返回第一个结果集，其余结果读取后丢弃"""
+    if len(params) != statement.param_count:
+        raise pymysql.err.ProgrammingError(
+            f"参数数量不匹配: 语句需要 {statement.param_count} 个参数，实际为 {len(params)} 个"
+        )
+    payload = _EXECUTE_HEADER.pack(statement.statement_id, 0, 1)
+    if params:
+        payload += _encode_params(params, conn.encoding)
+    conn._execute_command(COMMAND.COM_STMT_EXECUTE, payload)
+    
+    result = _read_result(conn)
+    while conn.server_status & SERVER_STATUS.SERVER_MORE_RESULTS_EXISTS:
+        extra = _read_result(conn)
+        if not result.columns and extra.columns:
+            result = extra
+    return result
+
+
+def close_statement(conn: pymysql.Connection, statement: PreparedStatement):
+    """释放服务端句柄（COM_STMT_CLOSE 没有响应）"""
+    conn._execute_command(COMMAND.COM_STMT_CLOSE, _UINT32.pack(statement.statement_id))
+
+
+class StatementCache:
+    """单个连接上的预处理语句句柄缓存，超出容量时关闭最久未用的句柄
+    
+    缓存不持有连接，调用时传入句柄所属的连接。连接同一时间只被一个线程使用（由连接池保证），
+    缓存本身不加锁。
+    """
+    
+    def __init__(self, capacity: int = DEFAULT_STATEMENT_CACHE_SIZE):
+        self.capacity = capacity
+        self._statements: "OrderedDict[str, PreparedStatement]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._statements)
+    
+    def get(self, conn: pymysql.Connection, sql: str) -> PreparedStatement:
+        """取得语句句柄，未缓存时预处理并加入缓存"""
+        statement = self._statements.get(sql)
+        if statement is not None:
+            self._statements.move_to_end(sql)
+            self.hits += 1
+            return statement
+        self.misses += 1
+        statement = prepare(conn, sql)
+        self._statements[sql] = statement
+        while len(self._statements) > self.capacity:
+            _, evicted = self._statements.popitem(last=False)
+            close_statement(conn, evicted)
+        return statement
+    
+    def execute(self, conn: pymysql.Connection, sql: str, params: Sequence = ()) -> PreparedResult:
+        """执行语句，句柄在服务端已失效时重新预处理一次"""
+        statement = self.get(conn, sql)
+        try:
+            return execute_statement(conn, statement, params)
+        except pymysql.err.MySQLError as e:
+            if not e.args or e.args[0] != ER.UNKNOWN_STMT_HANDLER:
+                raise
+        self._statements.pop(sql, None)
+        return execute_statement(conn, self.get(conn, sql), params)
+    
+    def clear(self, conn: pymysql.Connection):
+        """关闭全部句柄"""
+        statements, self._statements = self._statements, OrderedDict()
+        if not conn.open:
+            return
+        for statement in statements.values():
+            close_statement(conn, statement)
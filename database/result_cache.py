@@ -0,0 +1,443 @@
+"""
+只读查询结果缓存
+
+按 (会话, 默认库, 去注释归一空白后的语句, 参数) 缓存 SELECT 结果，内存占用超出预算时按 LRU 淘汰，
+可选择把淘汰的结果写入磁盘目录，命中时再读回内存。同一会话执行 DML/DDL 时，
+按语句中的表名（以执行时的默认库补全库名）使该会话各默认库下引用这些表的缓存失效；
+无法确定影响范围的语句以及 COMMIT / ROLLBACK 使整个会话的缓存失效。
+其他客户端的修改以及通过视图、触发器间接影响的表无法感知，可用 ttl 限制缓存有效期。
+"""
+import atexit
+import os
+import pickle
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Set
+
+from core.history_dao import canonical_sql, normalize_sql
+from database.sql_script import KIND_DDL, KIND_QUERY, classify, first_keyword
+
+
+# 默认内存预算与磁盘预算（字节）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+# 估算结果大小时抽样的行数
+_SAMPLE_ROWS = 100
+
+# 依赖全部表：任何写操作都会使其失效
+ANY_TABLE = ('*', '*')
+
+# 可缓存的语句类型（SHOW 等结果随服务端状态变化，不缓存）
+_CACHEABLE_KEYWORDS = ('SELECT', 'WITH', 'TABLE', 'VALUES')
+
+# 结果随时间、连接或会话状态变化的语句
+_VOLATILE_PATTERN = re.compile(
+    r"\b(?:rand|now|sysdate|curdate|curtime|current_(?:date|time|timestamp|user)|utc_(?:date|time|timestamp)|"
+    r"unix_timestamp|uuid|uuid_short|last_insert_id|found_rows|row_count|connection_id|sleep|get_lock|"
+    r"release_lock|is_free_lock|benchmark|database|schema|user)\s*\(|@|"
+    r"\bfor update\b|\bfor share\b|\block in share mode\b|\binto (?:outfile|dumpfile)\b|\binto @"
+)
+
+# 语句中的函数调用（规范化后函数名与左括号之间没有空白）
+_CALL_PATTERN = re.compile(r"(`(?:[^`]|``)+`|[\w$]+)\(")
+
+# 后面可以直接跟左括号、但不是函数调用的关键字
+_NOT_FUNCTION = {
+    'select', 'from', 'join', 'where', 'on', 'using', 'and', 'or', 'not', 'xor', 'in', 'exists', 'any', 'some',
+    'all', 'as', 'by', 'having', 'union', 'except', 'intersect', 'distinct', 'when', 'then', 'else', 'case',
+    'like', 'between', 'is', 'div', 'over', 'window', 'partition', 'lateral', 'values', 'index', 'key',
+    'against', 'interval', 'row', 'limit', 'offset',
+}
+
+# 结果只由参数决定的内置函数；其他函数（含用户自定义函数，可能有副作用）的查询不缓存
+_DETERMINISTIC_FUNCTIONS = {
+    # 聚合与窗口函数
+    'count', 'sum', 'avg', 'min', 'max', 'group_concat', 'std', 'stddev', 'stddev_pop', 'stddev_samp',
+    'var_pop', 'var_samp', 'variance', 'bit_and', 'bit_or', 'bit_xor', 'json_arrayagg', 'json_objectagg',
+    'row_number', 'rank', 'dense_rank', 'percent_rank', 'cume_dist', 'ntile', 'lag', 'lead',
+    'first_value', 'last_value', 'nth_value',
+    # 字符串
+    'concat', 'concat_ws', 'substring', 'substr', 'substring_index', 'mid', 'left', 'right', 'length',
+    'char_length', 'character_length', 'octet_length', 'bit_length', 'lower', 'upper', 'lcase', 'ucase',
+    'trim', 'ltrim', 'rtrim', 'replace', 'reverse', 'lpad', 'rpad', 'instr', 'locate', 'position', 'repeat',
+    'space', 'format', 'hex', 'unhex', 'md5', 'sha', 'sha1', 'sha2', 'crc32', 'ascii', 'ord', 'char',
+    'field', 'find_in_set', 'elt', 'insert', 'quote', 'soundex', 'strcmp', 'regexp_like', 'regexp_replace',
+    'regexp_substr', 'regexp_instr', 'to_base64', 'from_base64', 'match',
+    # 数值
+    'abs', 'ceil', 'ceiling', 'floor', 'round', 'truncate', 'mod', 'pow', 'power', 'sqrt', 'exp', 'ln',
+    'log', 'log2', 'log10', 'sign', 'pi', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2', 'cot',
+    'degrees', 'radians', 'conv', 'bin', 'oct', 'greatest', 'least', 'bit_count',
+    # 流程控制与类型转换
+    'if', 'ifnull', 'nullif', 'coalesce', 'isnull', 'cast', 'convert',
+    # 日期（只对参数计算）
+    'date', 'time', 'year', 'month', 'day', 'dayofmonth', 'dayofweek', 'dayofyear', 'hour', 'minute',
+    'second', 'microsecond', 'week', 'weekday', 'weekofyear', 'yearweek', 'quarter', 'monthname', 'dayname',
+    'date_format', 'time_format', 'str_to_date', 'date_add', 'date_sub', 'adddate', 'subdate', 'addtime',
+    'subtime', 'datediff', 'timediff', 'timestampdiff', 'timestampadd', 'from_days', 'to_days', 'last_day',
+    'makedate', 'maketime', 'extract',
+    # JSON
+    'json_extract', 'json_unquote', 'json_object', 'json_array', 'json_contains', 'json_contains_path',
+    'json_length', 'json_keys', 'json_valid', 'json_type', 'json_depth', 'json_quote', 'json_search',
+    'json_set', 'json_insert', 'json_replace', 'json_remove', 'json_merge_patch', 'json_merge_preserve',
+    'json_pretty', 'json_overlaps', 'json_value', 'member',
+}
+
+# 系统库的表随 DDL 与服务端状态变化
+_SYSTEM_SCHEMAS = {'information_schema', 'performance_schema', 'mysql', 'sys'}
+
+_NAME = r"(?:`(?:[^`]|``)+`|[\w$]+)"
+_QUALIFIED = re.compile(rf"({_NAME})(?:\s*\.\s*({_NAME}))?")
+_READ_PATTERN = re.compile(r"\b(?:from|join|update)\s+")
+_ALIAS_PATTERN = re.compile(r"\s+(?:as\s+)?([\w$]+)")
+_INSERT_PATTERN = re.compile(
+    r"^(?:insert|replace)\s+(?:(?:low_priority|delayed|high_priority|ignore)\s+)*(?:into\s+)?"
+)
+_LOAD_PATTERN = re.compile(r"\binto table\s+")
+_DDL_PATTERN = re.compile(
+    r"^(?:(?:create|alter|drop|rename)\s+(?:(?:temporary|online|offline|ignore)\s+)*tables?|truncate(?:\s+table)?)\s+"
+    r"(?:if (?:not )?exists\s+)?"
+)
+_INDEX_PATTERN = re.compile(r"^(?:create|drop)\s+(?:(?:unique|fulltext|spatial)\s+)?index\s+[\w$`]+\s+on\s+")
+
+# 表名之后不是别名的关键字
+_NOT_ALIAS = {
+    'where', 'join', 'on', 'using', 'group', 'order', 'limit', 'left', 'right', 'inner', 'outer', 'cross',
+    'natural', 'straight_join', 'union', 'having', 'window', 'for', 'lock', 'into', 'set', 'partition',
+    'use', 'ignore', 'force', 'values', 'value', 'select', 'to', 'except', 'intersect',
+}
+
+
+def _unquote(name: str) -> str:
+    if name.startswith('`'):
+        name = name[1:-1].replace('``', '`')
+    return name.lower()
+
+
+def _parse_tables(text: str, pos: int, tables: Set[tuple], database: Optional[str],
+                  multiple: bool = True) -> int:
+    """从 pos 处解析逗号分隔的表名（可带库名与别名），以 (库名, 表名) 加入 tables
+    
+    未写库名的表使用默认库 database，没有默认库时库名为 None（与任意库的同名表匹配）。
+    """
+    while True:
+        match = _QUALIFIED.match(text, pos)
+        if match is None:
+            return pos
+        if match.group(2):
+            schema, table = _unquote(match.group(1)), match.group(2)
+        else:
+            schema, table = database.lower() if database else None, match.group(1)
+        if schema in _SYSTEM_SCHEMAS:
+            tables.add(ANY_TABLE)
+        tables.add((schema, _unquote(table)))
+        pos = match.end()
+        alias = _ALIAS_PATTERN.match(text, pos)
+        if alias is not None and alias.group(1) not in _NOT_ALIAS:
+            pos = alias.end()
+        if not multiple or not text.startswith(',', pos):
+            return pos
+        pos += 1
+        while pos < len(text) and text[pos] == ' ':
+            pos += 1
+
+
+def referenced_tables(sql: str, database: Optional[str] = None) -> Set[tuple]:
+    """查询读取的表，(库名, 表名) 均为小写，库名见 _parse_tables；读取系统库时包含 ANY_TABLE"""
+    text = normalize_sql(sql)
+    tables: Set[tuple] = set()
+    for match in _READ_PATTERN.finditer(text):
+        _parse_tables(text, match.end(), tables, database)
+    return tables
+
+
+def written_tables(sql: str, database: Optional[str] = None) -> Optional[Set[tuple]]:
+    """写语句影响的表，格式同 referenced_tables；无法确定时返回 None"""
+    text = normalize_sql(sql)
+    tables: Set[tuple] = set()
+    keyword = first_keyword(sql)
+    if keyword in ('INSERT', 'REPLACE'):
+        match = _INSERT_PATTERN.match(text)
+        if match is not None:
+            _parse_tables(text, match.end(), tables, database, multiple=False)
+    elif keyword in ('UPDATE', 'DELETE'):
+        # 多表 UPDATE/DELETE 把涉及的表全部算作被修改
+        tables = referenced_tables(sql, database)
+        tables.discard(ANY_TABLE)
+    elif keyword == 'LOAD':
+        match = _LOAD_PATTERN.search(text)
+        if match is not None:
+            _parse_tables(text, match.end(), tables, database, multiple=False)
+    elif keyword in ('CREATE', 'ALTER', 'DROP', 'TRUNCATE', 'RENAME'):
+        match = _DDL_PATTERN.match(text) or _INDEX_PATTERN.match(text)
+        if match is not None:
+            pos = _parse_tables(text, match.end(), tables, database)
+            # RENAME TABLE a TO b, c TO d
+            while text.startswith(' to ', pos):
+                pos = _parse_tables(text, pos + 4, tables, database, multiple=False)
+                if text.startswith(', ', pos):
+                    pos = _parse_tables(text, pos + 2, tables, database, multiple=False)
+    return tables or None
+
+
+def _overlaps(written: Set[tuple], read: Set[tuple]) -> bool:
+    """被修改的表与读取的表是否可能相同，库名未知（None）时按表名匹配"""
+    for schema, table in written:
+        for read_schema, read_table in read:
+            if table == read_table and (schema is None or read_schema is None or schema == read_schema):
+                return True
+    return False
+
+
+def estimate_size(rows: Sequence) -> int:
+    """按抽样估算结果集占用的内存（字节）"""
+    if not rows:
+        return sys.getsizeof(rows)
+    step = max(1, len(rows) // _SAMPLE_ROWS)
+    sample = rows[::step][:_SAMPLE_ROWS]
+    per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample) / len(sample)
+    return int(per_row * len(rows)) + sys.getsizeof(rows)
+
+
+class CachedResult(NamedTuple):
+    """缓存的查询结果"""
+    columns: List[str]
+    rows: Sequence[tuple]
+    elapsed: float  # 原查询耗时（秒）
+    created: float
+
+
+class _Entry:
+    __slots__ = ('session', 'tables', 'columns', 'rows', 'path', 'elapsed', 'created', 'size')
+    
+    def __init__(self, session, tables, columns, rows, elapsed, size):
+        self.session = session
+        self.tables = tables
+        self.columns = columns
+        self.rows = rows
+        self.path = None  # 写入磁盘后为文件路径，rows 置为 None
+        self.elapsed = elapsed
+        self.created = time.time()
+        self.size = size
+
+
+class ResultCache:
+    """查询结果缓存，可被多个会话共用，线程安全
+    
+    spill_dir 不为空时，超出内存预算被淘汰的结果写入该目录（总量受 max_disk_bytes 限制）。
+    """
+    
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, spill_dir: Optional[str] = None,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes if spill_dir else 0
+        self.ttl = ttl
+        self._memory: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._disk: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0  # 命中节省的时间（秒）
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.RLock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+    
+    @staticmethod
+    def is_cacheable(sql: str) -> bool:
+        """只读且结果确定的查询才缓存：只调用 _DETERMINISTIC_FUNCTIONS 中的函数"""
+        if first_keyword(sql) not in _CACHEABLE_KEYWORDS or classify(sql) != KIND_QUERY:
+            return False
+        text = normalize_sql(sql)
+        if _VOLATILE_PATTERN.search(text) is not None:
+            return False
+        for match in _CALL_PATTERN.finditer(text):
+            name = match.group(1)
+            if name not in _NOT_FUNCTION and name not in _DETERMINISTIC_FUNCTIONS:
+                return False
+        return True
+    
+    def fits(self, size: int) -> bool:
+        """该大小的结果是否可以缓存"""
+        return size <= max(self.max_bytes, self.max_disk_bytes)
+    
+    @staticmethod
+    def _key(session: str, database: Optional[str], sql: str, params) -> tuple:
+        return (session, database, canonical_sql(sql), repr(params) if params else None)
+    
+    def get(self, session: str, sql: str, params: Optional[Sequence] = None,
+            database: Optional[str] = None) -> Optional[CachedResult]:
+        """查找缓存，database 为执行时的默认库；未命中返回 None"""
+        start = time.perf_counter()
+        key = self._key(session, database, sql, params)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._disk.get(key)
+            if entry is None or (self.ttl is not None and time.time() - entry.created > self.ttl):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            if entry.path is not None:
+                try:
+                    with open(entry.path, 'rb') as f:
+                        rows = pickle.load(f)
+                except (OSError, pickle.PickleError, EOFError):
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                if entry.size > self.max_bytes:
+                    # 超过内存预算的结果留在磁盘上，避免读回时挤掉全部内存缓存
+                    self._disk.move_to_end(key)
+                    self.hits += 1
+                    self.saved += max(entry.elapsed - (time.perf_counter() - start), 0.0)
+                    return CachedResult(entry.columns, rows, entry.elapsed, entry.created)
+                # 读回内存
+                self._remove(key)
+                entry.rows, entry.path = rows, None
+                self._store(key, entry)
+            else:
+                self._memory.move_to_end(key)
+            self.hits += 1
+            self.saved += max(entry.elapsed - (time.perf_counter() - start), 0.0)
+            return CachedResult(entry.columns, entry.rows, entry.elapsed, entry.created)
+    
+    def put(self, session: str, sql: str, params: Optional[Sequence], columns: List[str], rows: Sequence[tuple],
+            elapsed: float, size: Optional[int] = None, database: Optional[str] = None) -> bool:
+        """缓存查询结果，不可缓存或超出预算时返回 False"""
+        if not self.is_cacheable(sql):
+            return False
+        size = estimate_size(rows) if size is None else size
+        if not self.fits(size):
+            return False
+        key = self._key(session, database, sql, params)
+        entry = _Entry(session, referenced_tables(sql, database), list(columns), rows, elapsed, size)
+        with self._lock:
+            self._remove(key)
+            self._store(key, entry)
+        return True
+    
+    def _store(self, key: tuple, entry: _Entry):
+        """放入内存，超出预算时按 LRU 淘汰（调用方需持有锁）
+        
+        比整个内存预算还大的结果直接写入磁盘，不淘汰已有的内存缓存。
+        """
+        if entry.size > self.max_bytes:
+            self._spill(key, entry)
+            return
+        self._memory[key] = entry
+        self.memory_bytes += entry.size
+        while self.memory_bytes > self.max_bytes and self._memory:
+            old_key, old = self._memory.popitem(last=False)
+            self.memory_bytes -= old.size
+            self.evictions += 1
+            self._spill(old_key, old)
+    
+    def _spill(self, key: tuple, entry: _Entry):
+        """写入磁盘，未启用或超出磁盘预算时直接丢弃"""
+        if not self.max_disk_bytes or entry.size > self.max_disk_bytes:
+            return
+        path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.pickle")
+        try:
+            with open(path, 'wb') as f:
+                pickle.dump(entry.rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            return
+        entry.rows, entry.path = None, path
+        self._disk[key] = entry
+        self.disk_bytes += entry.size
+        while self.disk_bytes > self.max_disk_bytes and self._disk:
+            old_key = next(iter(self._disk))
+            self._remove(old_key)
+    
+    def _remove(self, key: tuple):
+        """删除一条缓存（调用方需持有锁）"""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry.size
+            return
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self.disk_bytes -= entry.size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    
+    def invalidate(self, session: str, sql: str, database: Optional[str] = None) -> int:
+        """会话以 database 为默认库执行了 sql 之后，使可能受影响的缓存失效，返回失效数量
+        
+        查询、USE 与 BEGIN / SAVEPOINT 等不影响缓存；能确定表名的写语句只影响引用这些表的缓存，
+        COMMIT / ROLLBACK（事务中的结果可能已被缓存）与其他语句（SET、CALL、DROP DATABASE 等）
+        使整个会话的缓存失效。
+        """
+        kind = classify(sql)
+        keyword = first_keyword(sql)
+        if kind == KIND_QUERY or keyword in ('USE', 'BEGIN', 'START', 'SAVEPOINT', 'RELEASE'):
+            return 0
+        tables = written_tables(sql, database)
+        if kind == KIND_DDL and tables is not None:
+            # DDL 会改变系统库中的信息
+            tables.add(ANY_TABLE)
+        with self._lock:
+            keys = [
+                key for key, entry in list(self._memory.items()) + list(self._disk.items())
+                if entry.session == session and (
+                    tables is None or ANY_TABLE in entry.tables or _overlaps(tables, entry.tables)
+                )
+            ]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+    
+    def clear(self, session: Optional[str] = None):
+        """清空缓存，指定 session 时只清空该会话"""
+        with self._lock:
+            keys = [
+                key for key, entry in list(self._memory.items()) + list(self._disk.items())
+                if session is None or entry.session == session
+            ]
+            for key in keys:
+                self._remove(key)
+    
+    def close(self):
+        """清空缓存并删除磁盘目录"""
+        self.clear()
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+    
+    def __len__(self):
+        return len(self._memory) + len(self._disk)
+    
+    def summary(self) -> str:
+        """简短统计，用于状态栏"""
+        text = (f"缓存命中 {self.hits} 次，节省 {self.saved:.2f} 秒，"
+                f"内存 {self.memory_bytes / 1048576:.1f} MB")
+        if self.max_disk_bytes:
+            text += f"，磁盘 {self.disk_bytes / 1048576:.1f} MB"
+        return text
+
+
+_shared_cache: Optional[ResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache() -> ResultCache:
+    """各窗口共用的结果缓存，淘汰的结果写入临时目录，进程退出时删除"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache(spill_dir=tempfile.mkdtemp(prefix="dbvigil-cache-"))
+            atexit.register(_shared_cache.close)
+        return _shared_cache
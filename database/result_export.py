@@ -0,0 +1,262 @@
+"""
+查询结果流式导出（CSV / JSON Lines / Parquet）
+
+读取线程从非缓冲游标按块取数，经有界队列交给写入端；写入跟不上时队列写满，
+读取线程阻塞、不再从套接字取数，由 TCP 流控把压力传回服务端，内存占用保持恒定。
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from database.mysql_dao import MysqlDao, DEFAULT_FETCH_SIZE
+
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+COMPRESSIONS = ('gzip', 'zstd')
+
+# 读取端与写入端之间最多缓存的数据块数
+DEFAULT_QUEUE_SIZE = 8
+
+_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+_COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# 读取线程结束标记
+_END = object()
+
+
+def detect_format(path: str) -> tuple:
+    """根据文件扩展名判断 (格式, 压缩方式)，如 result.csv.gz -> ('csv', 'gzip')"""
+    root, ext = os.path.splitext(path.lower())
+    compression = _COMPRESSION_EXTENSIONS.get(ext)
+    if compression:
+        root, ext = os.path.splitext(root)
+    fmt = _EXTENSIONS.get(ext)
+    if fmt is None:
+        raise ValueError(f"无法识别导出格式: {path}")
+    return fmt, compression
+
+
+def to_text(value):
+    """将驱动返回的非基本类型值转换为文本（二进制优先按 UTF-8 解码，否则转十六进制）"""
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            return '0x' + value.hex()
+    return str(value)
+
+
+def open_output(path: str, compression: Optional[str] = None):
+    """打开二进制输出流，按需套上 gzip / zstd 压缩"""
+    if compression is None:
+        return open(path, 'wb')
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 压缩需要安装 zstandard: pip install zstandard")
+        raw = open(path, 'wb')
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    raise ValueError(f"不支持的压缩方式: {compression}")
+
+
+class CsvResultWriter:
+    """CSV 写入器，首行为列名，NULL 写为空字符串
+    
+    csv 模块会自行对非字符串值调用 str()，只有二进制列需要转换；
+    二进制列按每列第一个非 NULL 值判断，其余列原样交给 writerows。
+    """
+    
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.stream = io.TextIOWrapper(open_output(path, compression), encoding='utf-8', newline='')
+        self.writer = csv.writer(self.stream)
+        self.pending_columns: List[int] = []
+        self.binary_columns: List[int] = []
+    
+    def write_header(self, columns: List[str]):
+        self.writer.writerow(columns)
+        self.pending_columns = list(range(len(columns)))
+    
+    def write_rows(self, rows: list):
+        if self.pending_columns:
+            self._detect_binary_columns(rows)
+        if self.binary_columns:
+            rows = [self._convert(row) for row in rows]
+        self.writer.writerows(rows)
+    
+    def _detect_binary_columns(self, rows: list):
+        for row in rows:
+            for index in list(self.pending_columns):
+                value = row[index]
+                if value is not None:
+                    self.pending_columns.remove(index)
+                    if isinstance(value, (bytes, bytearray)):
+                        self.binary_columns.append(index)
+            if not self.pending_columns:
+                break
+    
+    def _convert(self, row) -> list:
+        row = list(row)
+        for index in self.binary_columns:
+            if row[index] is not None:
+                row[index] = to_text(row[index])
+        return row
+    
+    def close(self):
+        self.stream.close()
+
+
+class JsonLinesResultWriter:
+    """JSON Lines 写入器，每行一个以列名为键的对象"""
+    
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.stream = io.TextIOWrapper(open_output(path, compression), encoding='utf-8')
+        self.encoder = json.JSONEncoder(ensure_ascii=False, default=to_text)
+        self.columns: List[str] = []
+    
+    def write_header(self, columns: List[str]):
+        self.columns = columns
+    
+    def write_rows(self, rows: list):
+        columns = self.columns
+        encode = self.encoder.encode
+        self.stream.write(''.join(encode(dict(zip(columns, row))) + '\n' for row in rows))
+    
+    def close(self):
+        self.stream.close()
+
+
+class ParquetResultWriter:
+    """Parquet 写入器（需要 pyarrow），每个数据块写为一个行组，列统一按字符串存储"""
+    
+    def __init__(self, path: str, compression: Optional[str] = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet 导出需要安装 pyarrow: pip install pyarrow")
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.compression = compression or 'snappy'
+        self.columns: List[str] = []
+        self.schema = None
+        self.writer = None
+    
+    def write_header(self, columns: List[str]):
+        self.columns = columns
+        self.schema = self.pyarrow.schema([(name, self.pyarrow.string()) for name in columns])
+        self.writer = self.parquet.ParquetWriter(self.path, self.schema, compression=self.compression)
+    
+    def write_rows(self, rows: list):
+        arrays = [
+            self.pyarrow.array(
+                [None if value is None else str(to_text(value)) for value in column],
+                type=self.pyarrow.string()
+            )
+            for column in zip(*rows)
+        ]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(arrays, schema=self.schema))
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+_WRITERS = {
+    'csv': CsvResultWriter,
+    'jsonl': JsonLinesResultWriter,
+    'parquet': ParquetResultWriter,
+}
+
+
+def export_query(mysql_dao: MysqlDao, sql: str, path: str, fmt: Optional[str] = None,
+                 compression: Optional[str] = None, fetch_size: int = DEFAULT_FETCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, progress_callback: Optional[Callable[[int], None]] = None,
+                 cancel_event: Optional[threading.Event] = None) -> int:
+    """流式导出查询结果到文件，返回导出行数
+    
+    fmt 与 compression 为空时按文件扩展名判断。cancel_event 被设置后停止读取，
+    已写入的部分保留在文件中。失败时抛出异常，不完整的文件会被删除。
+    """
+    if fmt is None:
+        fmt, detected = detect_format(path)
+        compression = compression or detected
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    
+    cancel_event = cancel_event or threading.Event()
+    chunks = queue.Queue(maxsize=queue_size)
+    # 先创建写入器，缺少可选依赖时不必发起查询
+    writer = _WRITERS[fmt](path, compression)
+    try:
+        stream = mysql_dao.stream_sql(sql, fetch_size)
+        if not stream.columns:
+            stream.close()
+            raise ValueError("该语句没有返回结果集")
+    except BaseException:
+        writer.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    
+    def put(item):
+        # 写入端出错退出后不再阻塞
+        while not cancel_event.is_set():
+            try:
+                chunks.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def read():
+        try:
+            for rows in stream.chunks():
+                if not put(rows):
+                    break
+            put(_END)
+        except Exception as e:
+            put(e)
+        finally:
+            stream.close()
+    
+    reader = threading.Thread(target=read, name="result-export-reader", daemon=True)
+    count = 0
+    try:
+        reader.start()
+        writer.write_header(stream.columns)
+        while True:
+            try:
+                item = chunks.get(timeout=0.2)
+            except queue.Empty:
+                if not reader.is_alive() and chunks.empty():
+                    break
+                continue
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            writer.write_rows(item)
+            count += len(item)
+            if progress_callback:
+                progress_callback(count)
+    except BaseException:
+        cancel_event.set()
+        writer.close()
+        reader.join()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    writer.close()
+    reader.join()
+    return count
@@ -0,0 +1,325 @@
+"""
+SQL 脚本处理：语句拆分、语句分类与批量执行
+
+拆分规则与 mysql 命令行客户端一致：识别单/双/反引号字符串（含反斜杠转义与重复引号）、
+-- / # / /* */ 注释，以及行首的 DELIMITER 命令。
+"""
+import re
+import threading
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from pymysql.constants import SERVER_STATUS
+
+
+# 语句类型
+KIND_QUERY = 'query'            # 返回结果集：SELECT / SHOW / EXPLAIN / DESC / WITH ...
+KIND_DML = 'dml'                # INSERT / UPDATE / DELETE / REPLACE / LOAD
+KIND_DDL = 'ddl'                # CREATE / ALTER / DROP / TRUNCATE / RENAME
+KIND_TRANSACTION = 'transaction'  # BEGIN / START TRANSACTION / COMMIT / ROLLBACK / SAVEPOINT
+KIND_OTHER = 'other'            # SET / USE / GRANT 等
+
+_KEYWORD_KINDS = {
+    'SELECT': KIND_QUERY, 'SHOW': KIND_QUERY, 'EXPLAIN': KIND_QUERY, 'DESC': KIND_QUERY,
+    'DESCRIBE': KIND_QUERY, 'WITH': KIND_QUERY, 'TABLE': KIND_QUERY, 'VALUES': KIND_QUERY,
+    'HELP': KIND_QUERY, 'CHECK': KIND_QUERY, 'CHECKSUM': KIND_QUERY, 'ANALYZE': KIND_QUERY,
+    'OPTIMIZE': KIND_QUERY, 'REPAIR': KIND_QUERY,
+    'INSERT': KIND_DML, 'UPDATE': KIND_DML, 'DELETE': KIND_DML, 'REPLACE': KIND_DML,
+    'LOAD': KIND_DML, 'CALL': KIND_DML, 'DO': KIND_DML,
+    'CREATE': KIND_DDL, 'ALTER': KIND_DDL, 'DROP': KIND_DDL, 'TRUNCATE': KIND_DDL, 'RENAME': KIND_DDL,
+    'BEGIN': KIND_TRANSACTION, 'START': KIND_TRANSACTION, 'COMMIT': KIND_TRANSACTION,
+    'ROLLBACK': KIND_TRANSACTION, 'SAVEPOINT': KIND_TRANSACTION, 'RELEASE': KIND_TRANSACTION,
+    'XA': KIND_TRANSACTION,
+}
+
+# 除 DDL 与事务控制语句外，会隐式提交当前事务的语句
+_IMPLICIT_COMMIT_KEYWORDS = {'LOCK', 'UNLOCK', 'GRANT', 'REVOKE', 'FLUSH', 'RESET', 'CACHE', 'INSTALL', 'UNINSTALL'}
+
+# 事务回滚时非事务表（如 MyISAM）的修改无法撤销的警告码
+_WARN_NONTRANSACTIONAL_NOT_ROLLED_BACK = 1196
+
+# 语句开头的空白、注释与左括号（如 (SELECT ...) UNION ...）
+_LEADING_PATTERN = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|#[^\n]*(?:\n|$)|/\*(?!!).*?\*/|\()*', re.S)
+_KEYWORD_PATTERN = re.compile(r'/\*!\d*\s*|[A-Za-z_]+')
+# 公用表表达式之后紧跟的修改语句
+_CTE_DML_PATTERN = re.compile(r'\)\s*(?:UPDATE|DELETE|INSERT)\b', re.I)
+
+_STRING_PATTERNS = {
+    "'": re.compile(r"'(?:[^'\\]|\\.|'')*(?:'|$)", re.S),
+    '"': re.compile(r'"(?:[^"\\]|\\.|"")*(?:"|$)', re.S),
+    '`': re.compile(r'`(?:[^`]|``)*(?:`|$)', re.S),
+}
+_DELIMITER_COMMAND = re.compile(r'DELIMITER[ \t]+(\S+)[^\n]*(?:\n|$)', re.I)
+
+
+class Statement(NamedTuple):
+    """拆分出的一条语句"""
+    sql: str
+    line: int  # 语句起始行号（从 1 开始）
+    kind: str
+
+
+class StatementResult(NamedTuple):
+    """单条语句的执行结果"""
+    index: int
+    line: int
+    kind: str
+    elapsed: float  # 秒
+    rowcount: int
+    error: Optional[str] = None
+
+
+class ScriptResult(NamedTuple):
+    """脚本执行结果"""
+    results: List[StatementResult]
+    elapsed: float
+    
+    @property
+    def failed(self) -> List[StatementResult]:
+        return [result for result in self.results if result.error is not None]
+
+
+def first_keyword(sql: str) -> str:
+    """语句的第一个关键字（大写），跳过注释与左括号；/*!40101 SET ...*/ 这类可执行注释取其内部关键字"""
+    pos = _LEADING_PATTERN.match(sql).end()
+    while True:
+        match = _KEYWORD_PATTERN.match(sql, pos)
+        if match is None:
+            return ''
+        if match.group().startswith('/*!'):
+            pos = match.end()
+            continue
+        return match.group().upper()
+
+
+def classify(sql: str) -> str:
+    """判断语句类型，见 KIND_* 常量"""
+    keyword = first_keyword(sql)
+    if keyword == 'WITH' and _CTE_DML_PATTERN.search(sql):
+        # WITH ... UPDATE / DELETE
+        return KIND_DML
+    return _KEYWORD_KINDS.get(keyword, KIND_OTHER)
+
+
+def commits_implicitly(statement: Statement) -> bool:
+    """语句执行时是否隐式提交（或自行控制）事务，不能与其他语句放在同一事务中回滚"""
+    return (statement.kind in (KIND_DDL, KIND_TRANSACTION)
+            or first_keyword(statement.sql) in _IMPLICIT_COMMIT_KEYWORDS)
+
+
+def returns_rows(sql: str) -> bool:
+    """语句是否可能返回结果集"""
+    return classify(sql) == KIND_QUERY
+
+
+def _special_pattern(delimiter: str):
+    """扫描时需要关注的位置：字符串、注释、分隔符、行首 DELIMITER 命令"""
+    return re.compile(r"""['"`#]|--(?=[ \t\r\n]|$)|/\*|""" + re.escape(delimiter) + r'|^[ \t]*(?=DELIMITER[ \t])',
+                      re.M | re.I)
+
+
+def split_statements(text: str, delimiter: str = ';') -> Iterator[Statement]:
+    """将脚本拆分为语句，只含注释或空白的片段会被忽略"""
+    special = _special_pattern(delimiter)
+    start = pos = 0
+    line = 1
+    counted = 0
+    length = len(text)
+    
+    def emit(end: int):
+        nonlocal line, counted
+        chunk = text[start:end]
+        sql = chunk.strip()
+        if not sql or not first_keyword(sql):
+            return None
+        first = start + len(chunk) - len(chunk.lstrip())
+        line += text.count('\n', counted, first)
+        counted = first
+        return Statement(sql, line, classify(sql))
+    
+    while pos < length:
+        match = special.search(text, pos)
+        if match is None:
+            break
+        token = match.group()
+        at = match.start()
+        if token in _STRING_PATTERNS:
+            pos = _STRING_PATTERNS[token].match(text, at).end()
+        elif token == '#' or token == '--':
+            newline = text.find('\n', at)
+            pos = length if newline < 0 else newline + 1
+        elif token == '/*':
+            end = text.find('*/', at + 2)
+            pos = length if end < 0 else end + 2
+        elif token == delimiter:
+            statement = emit(at)
+            if statement:
+                yield statement
+            start = pos = match.end()
+        else:
+            # 行首 DELIMITER，只在语句开头有效
+            command = _DELIMITER_COMMAND.match(text, match.end())
+            if command and not text[start:at].strip():
+                delimiter = command.group(1)
+                special = _special_pattern(delimiter)
+                start = pos = command.end()
+            else:
+                pos = match.end() + len('DELIMITER')
+    
+    statement = emit(length)
+    if statement:
+        yield statement
+
+
+def _consume_results(cursor, count: int, start: float, timings: list, rowcounts: list):
+    """读取多语句批次的全部结果；每条语句的耗时为其结果到达的间隔"""
+    for index in range(count):
+        if index > 0:
+            if not cursor.nextset():
+                break
+        now = time.perf_counter()
+        timings.append(now - start)
+        rowcounts.append(cursor.rowcount)
+        start = now
+
+
+def run_script(mysql_dao, text: str, batch_size: int = 500, max_batch_bytes: int = 1 << 20,
+               use_transaction: bool = True, stop_on_error: bool = True,
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               cancel_event: Optional[threading.Event] = None) -> ScriptResult:
+    """执行 SQL 脚本
+    
+    语句按批次拼接后借助 CLIENT.MULTI_STATEMENTS 一次发送，每批一个网络往返。
+    use_transaction 为真时每批放在一个事务中，出错时回滚整批；若不在出错时停止，
+    会跳过出错语句并重新执行该批中已回滚的其余语句。DDL 等会隐式提交的语句单独成批、
+    不放入事务，脚本自行 BEGIN / LOCK TABLES 之后到 COMMIT / UNLOCK TABLES 之前也不开启事务；
+    回滚时若有非事务表的修改无法撤销，该批先前的语句不再重新执行，按失败报告。
+    脚本在控制台连接上执行，与单条执行的语句共享会话状态；连接上已有未结束的事务或表锁时不开启事务，
+    以免提交用户的事务或释放表锁。
+    progress_callback(已完成语句数, 总语句数)；cancel_event 被设置后在当前批次结束时停止。
+    """
+    statements = list(split_statements(text))
+    total = len(statements)
+    results: List[Optional[StatementResult]] = [None] * total
+    skipped = set()
+    completed = 0
+    script_start = time.perf_counter()
+    
+    # 控制台连接启用了多语句模式
+    conn = mysql_dao.acquire_console()
+    try:
+        cursor = conn.cursor()
+        pos = 0
+        while pos < total:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            # 组成一批：条数与字节数均不超过上限
+            batch = []
+            size = 0
+            index = pos
+            # 隐式提交的语句单独成批，不放入事务
+            isolated = False
+            while index < total and len(batch) < batch_size:
+                if index not in skipped:
+                    if use_transaction and commits_implicitly(statements[index]):
+                        if not batch:
+                            batch.append(index)
+                            index += 1
+                            isolated = True
+                        break
+                    length = len(statements[index].sql) + 2
+                    if batch and size + length > max_batch_bytes:
+                        break
+                    batch.append(index)
+                    size += length
+                index += 1
+            end = index
+            if not batch:
+                pos = end
+                continue
+            
+            timings: List[float] = []
+            rowcounts: List[int] = []
+            error = None
+            # 脚本或之前执行的语句开启了事务或锁表时不开启事务（START TRANSACTION 会释放表锁）
+            user_controlled = (mysql_dao.console_tables_locked
+                               or conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+            transactional = use_transaction and not isolated and not user_controlled
+            # 出错回滚后，整批修改是否都已撤销
+            rolled_back = transactional
+            if transactional:
+                conn.begin()
+            start = time.perf_counter()
+            try:
+                # 换行后再加分隔符，避免语句末尾的行注释吞掉分号
+                cursor.execute('\n;\n'.join(statements[i].sql for i in batch))
+                _consume_results(cursor, len(batch), start, timings, rowcounts)
+                if transactional:
+                    conn.commit()
+            except Exception as e:
+                error = str(e)
+                if transactional:
+                    try:
+                        conn.rollback()
+                        cursor.execute("SHOW WARNINGS")
+                        if any(row[1] == _WARN_NONTRANSACTIONAL_NOT_ROLLED_BACK for row in cursor.fetchall()):
+                            rolled_back = False
+                    except Exception:
+                        rolled_back = False
+            
+            # LOCK TABLES 等会隐式提交，不会被回滚
+            for i in batch[:len(timings)]:
+                mysql_dao.track_console(conn, statements[i].sql)
+            
+            if error is None:
+                for i, elapsed, rowcount in zip(batch, timings, rowcounts):
+                    statement = statements[i]
+                    results[i] = StatementResult(i, statement.line, statement.kind, elapsed, rowcount)
+                completed += len(batch)
+                pos = end
+            else:
+                # 已返回结果的语句数即为出错语句在批次中的位置
+                failed = batch[len(timings)]
+                statement = statements[failed]
+                results[failed] = StatementResult(
+                    failed, statement.line, statement.kind, time.perf_counter() - start, 0, error
+                )
+                skipped.add(failed)
+                completed += 1
+                if rolled_back:
+                    # 整批已回滚，先前成功的语句在下一轮重新执行
+                    for i in batch[:len(timings)]:
+                        results[i] = None
+                elif transactional:
+                    # 部分修改无法回滚，重新执行可能重复生效，按失败报告
+                    for i, elapsed in zip(batch, timings):
+                        statement = statements[i]
+                        results[i] = StatementResult(
+                            i, statement.line, statement.kind, elapsed, 0,
+                            "所在批次已回滚，但非事务表的修改无法撤销，未重新执行"
+                        )
+                        skipped.add(i)
+                    completed += len(timings)
+                    pos = failed + 1
+                else:
+                    for i, elapsed, rowcount in zip(batch, timings, rowcounts):
+                        statement = statements[i]
+                        results[i] = StatementResult(i, statement.line, statement.kind, elapsed, rowcount)
+                    completed += len(timings)
+                    pos = failed + 1
+                if stop_on_error:
+                    break
+                # 连接因错误断开时重新建立
+                if not conn.open:
+                    closed, conn = conn, None
+                    mysql_dao.release_console(closed)
+                    conn = mysql_dao.acquire_console()
+                cursor = conn.cursor()
+            
+            if progress_callback:
+                progress_callback(completed, total)
+    finally:
+        if conn is not None:
+            mysql_dao.release_console(conn)
+    
+    return ScriptResult([result for result in results if result is not None], time.perf_counter() - script_start)
@@ -0,0 +1,209 @@
+"""
+表数据分页浏览
+
+按主键（或全部列非空的唯一索引）做键集分页：下一页使用 WHERE key > 上一页最后一行的键，
+上一页反向排序后再倒转，跳转直接按键定位，任意位置的一页都只需一次索引范围扫描，
+不会像 LIMIT n OFFSET m 那样随页码增大而变慢。没有可用键的表退化为 OFFSET 分页。
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from core.metadata_dao import MetadataDao
+from database.mysql_dao import MysqlDao
+
+
+# 默认每页行数
+DEFAULT_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    """一页数据"""
+    columns: List[str]
+    rows: list
+    first_key: Optional[tuple]  # 首行的键，OFFSET 分页时为 None
+    last_key: Optional[tuple]
+    offset: Optional[int]  # OFFSET 分页时的起始行号，键集分页时为 None
+    has_previous: bool
+    has_next: bool
+    elapsed: float  # 秒
+
+
+def choose_key(metadata_dao: MetadataDao, schema: str, table: str) -> List[str]:
+    """分页使用的键列：主键，否则为列最少的、全部列非空的唯一索引；都没有时返回空列表"""
+    nullable = {column.name.lower(): column.nullable for column in metadata_dao.list_columns(schema, table)}
+    candidates = [
+        index for index in metadata_dao.list_indexes(schema, table)
+        if index.unique and index.columns and all(
+            column and not nullable.get(column.lower(), True) for column in index.columns
+        )
+    ]
+    for index in candidates:
+        if index.name == 'PRIMARY':
+            return list(index.columns)
+    if candidates:
+        return list(min(candidates, key=lambda index: len(index.columns)).columns)
+    return []
+
+
+def quote_identifier(name: str) -> str:
+    return '`' + name.replace('`', '``') + '`'
+
+
+def _compare(keys: Sequence[str], values: Sequence, op: str) -> Tuple[str, list]:
+    """(k1, k2, ...) op (v1, v2, ...) 的展开形式，op 为 > < >= <=
+    
+    MySQL 对行构造器比较不一定能使用索引范围，这里展开为 OR 条件，
+    并在前面加上首列的范围条件，保证走索引。
+    """
+    quoted = [quote_identifier(key) for key in keys]
+    if len(keys) == 1:
+        return f"{quoted[0]} {op} %s", [values[0]]
+    strict = op[0]
+    terms = []
+    params = [values[0]]
+    for i in range(len(keys)):
+        condition = [f"{column} = %s" for column in quoted[:i]]
+        condition.append(f"{quoted[i]} {op if i == len(keys) - 1 else strict} %s")
+        terms.append("(" + " AND ".join(condition) + ")")
+        params.extend(values[:i + 1])
+    return f"{quoted[0]} {strict}= %s AND ({' OR '.join(terms)})", params
+
+
+class KeysetPager:
+    """单个表的分页器
+    
+    返回下一页之后会在后台预取再下一页，连续向后翻页时通常直接使用预取结果。
+    """
+    
+    def __init__(self, mysql_dao: MysqlDao, schema: str, table: str, key_columns: Sequence[str],
+                 page_size: int = DEFAULT_PAGE_SIZE, prefetch: bool = True):
+        self.mysql_dao = mysql_dao
+        self.table_name = f"{quote_identifier(schema)}.{quote_identifier(table)}"
+        self.key_columns = list(key_columns)
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="table-prefetch") if prefetch else None
+        # (预取所依据的位置, Future)
+        self._prefetched: Optional[Tuple[tuple, Future]] = None
+        self._key_index: Optional[List[int]] = None
+    
+    @property
+    def keyset(self) -> bool:
+        """是否为键集分页"""
+        return bool(self.key_columns)
+    
+    def _query(self, where: str = "", params: Sequence = (), descending: bool = False,
+               offset: Optional[int] = None) -> Tuple[List[str], list, float]:
+        """多取一行用于判断是否还有数据"""
+        sql = f"SELECT * FROM {self.table_name}"
+        if where:
+            sql += f" WHERE {where}"
+        if self.key_columns:
+            direction = " DESC" if descending else ""
+            sql += " ORDER BY " + ", ".join(quote_identifier(key) + direction for key in self.key_columns)
+        sql += f" LIMIT {self.page_size + 1}"
+        if offset:
+            sql += f" OFFSET {offset}"
+        start = time.perf_counter()
+        with self.mysql_dao.pool.connection() as conn:
+            _, rows, columns = self.mysql_dao.execute_on(conn, sql, list(params) or None)
+        return columns, list(rows), time.perf_counter() - start
+    
+    def _key(self, columns: List[str], row: tuple) -> tuple:
+        if self._key_index is None:
+            lowered = [column.lower() for column in columns]
+            self._key_index = [lowered.index(key.lower()) for key in self.key_columns]
+        return tuple(row[i] for i in self._key_index)
+    
+    def _page(self, columns: List[str], rows: list, elapsed: float, forward: bool, has_other_side: bool,
+              offset: Optional[int] = None) -> Page:
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if not forward:
+            rows.reverse()
+        first_key = last_key = None
+        if self.key_columns and rows:
+            first_key, last_key = self._key(columns, rows[0]), self._key(columns, rows[-1])
+        has_previous, has_next = (has_other_side, more) if forward else (more, has_other_side)
+        return Page(columns, rows, first_key, last_key, offset, has_previous, has_next, elapsed)
+    
+    def _fetch_after(self, page: Page) -> Page:
+        if not self.key_columns:
+            offset = page.offset + self.page_size
+            columns, rows, elapsed = self._query(offset=offset)
+            return self._page(columns, rows, elapsed, True, True, offset)
+        where, params = _compare(self.key_columns, page.last_key, '>')
+        columns, rows, elapsed = self._query(where, params)
+        return self._page(columns, rows, elapsed, True, True)
+    
+    def _prefetch(self, page: Page) -> Page:
+        """后台预取 page 的下一页，返回 page 本身"""
+        if self._executor is None or not page.has_next:
+            return page
+        position = page.last_key if self.key_columns else (page.offset,)
+        if self._prefetched is not None and self._prefetched[0] == position:
+            return page
+        self._prefetched = (position, self._executor.submit(self._fetch_after, page))
+        return page
+    
+    def first_page(self) -> Page:
+        """第一页"""
+        offset = None if self.key_columns else 0
+        columns, rows, elapsed = self._query(offset=offset)
+        return self._prefetch(self._page(columns, rows, elapsed, True, False, offset))
+    
+    def next_page(self, page: Page) -> Page:
+        """page 的下一页，已预取时直接返回预取结果"""
+        position = page.last_key if self.key_columns else (page.offset,)
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is not None and prefetched[0] == position:
+            try:
+                result = prefetched[1].result()
+            except Exception:
+                # 预取失败（如连接中断）时重新查询，错误由本次查询抛出
+                return self._prefetch(self._fetch_after(page))
+            return self._prefetch(result)
+        return self._prefetch(self._fetch_after(page))
+    
+    def previous_page(self, page: Page) -> Page:
+        """page 的上一页"""
+        if not self.key_columns:
+            offset = max(page.offset - self.page_size, 0)
+            columns, rows, elapsed = self._query(offset=offset)
+            return self._prefetch(self._page(columns, rows, elapsed, True, offset > 0, offset))
+        where, params = _compare(self.key_columns, page.first_key, '<')
+        columns, rows, elapsed = self._query(where, params, descending=True)
+        if len(rows) < self.page_size:
+            # 已到开头，不足一页时改为返回完整的第一页
+            return self.first_page()
+        return self._prefetch(self._page(columns, rows, elapsed, False, True))
+    
+    def last_page(self) -> Page:
+        """最后一页"""
+        if not self.key_columns:
+            raise ValueError("表没有主键或非空唯一索引，无法直接定位最后一页")
+        columns, rows, elapsed = self._query(descending=True)
+        return self._page(columns, rows, elapsed, False, False)
+    
+    def seek(self, values: Sequence) -> Page:
+        """从键大于等于 values 的第一行开始的一页；values 可以只给出前几个键列的值"""
+        if not self.key_columns:
+            raise ValueError("表没有主键或非空唯一索引，无法按键跳转")
+        if not values or len(values) > len(self.key_columns):
+            raise ValueError(f"请提供 1 到 {len(self.key_columns)} 个键值")
+        where, params = _compare(self.key_columns[:len(values)], list(values), '>=')
+        columns, rows, elapsed = self._query(where, params)
+        # 是否有上一页未知，按有处理，向前翻到开头时返回第一页
+        return self._prefetch(self._page(columns, rows, elapsed, True, True))
+    
+    def discard_prefetch(self):
+        """丢弃预取结果，修改 page_size 后调用"""
+        prefetched, self._prefetched = self._prefetched, None
+        if prefetched is not None:
+            prefetched[1].cancel()
+    
+    def close(self):
+        """停止预取"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,5 @@
 from .base import *
-from core.entities import DatabaseSession
+from core.entities import DatabaseSession, to_int
 from datetime import datetime
 
 
@@ -100,6 +100,10 @@ class AddSessionDialog(QDialog):
         self.timeout_edit = QLineEdit("60")
         layout.addRow("超时(秒):", self.timeout_edit)
         
+        # 压缩协议，链路带宽低时可减少传输量
+        self.compress_check = QCheckBox("启用压缩协议（适用于低带宽链路）")
+        layout.addRow("", self.compress_check)
+        
         # 备忘
         self.memo_edit = QTextEdit()
         self.memo_edit.setMaximumHeight(150)
@@ -219,25 +223,26 @@ class AddSessionDialog(QDialog):
         # 常规标签
         self.db_type_combo.setCurrentText(self.session.database_type)
         self.ip_edit.setText(self.session.ip_address)
-        self.port_edit.setText(self.session.port)
+        self.port_edit.setText(str(self.session.port))
         self.username_edit.setText(self.session.username)
         self.password_edit.setText(self.session.password)
         self.database_edit.setText(self.session.database)
-        self.timeout_edit.setText(self.session.timeout)
+        self.timeout_edit.setText(str(self.session.timeout))
+        self.compress_check.setChecked(self.session.compress)
         self.memo_edit.setPlainText(self.session.memo)
         
         # HTTP标签
-        if self.session.is_http != "false":
+        if self.session.is_http:
             self.use_http_check.setChecked(True)
             self.url_edit.setText(self.session.url)
             self.key_edit.setText(self.session.encryption_key)
             self.headers_edit.setPlainText(self.session.http_headers)
         
-        if self.session.is_proxy != "false":
+        if self.session.is_proxy:
             self.use_proxy_check.setChecked(True)
             self.proxy_type_combo.setCurrentText(self.session.proxy_type)
             self.proxy_address_edit.setText(self.session.proxy_address)
-            self.proxy_port_edit.setText(self.session.proxy_port)
+            self.proxy_port_edit.setText(str(self.session.proxy_port) if self.session.proxy_port else "")
             self.proxy_username_edit.setText(self.session.proxy_username)
             self.proxy_password_edit.setText(self.session.proxy_password)
     
@@ -253,17 +258,11 @@ class AddSessionDialog(QDialog):
         
         try:
             if session.database_type == "Mysql":
-                import pymysql
-                conn = pymysql.connect(
-                    host=session.ip_address,
-                    port=int(session.port),
-                    user=session.username,
-                    password=session.password,
-                    database=session.database,
-                    connect_timeout=int(session.timeout)
-                )
+                from database.mysql_dao import MysqlDao
+                conn = MysqlDao(session).connect()
+                compressed = conn.compressed
                 conn.close()
-                self.status_label.setText("✓ 连接成功")
+                self.status_label.setText("✓ 连接成功（已启用压缩）" if compressed else "✓ 连接成功")
                 self.status_label.setStyleSheet("color: green;")
             else:
                 self.status_label.setText("该数据库类型暂不支持测试")
@@ -289,25 +288,32 @@ class AddSessionDialog(QDialog):
             QMessageBox.warning(self, "提示", "用户名不能为空")
             return None
         
+        for edit, name in ((self.port_edit, "端口"), (self.timeout_edit, "超时"), (self.proxy_port_edit, "代理端口")):
+            text = edit.text().strip()
+            if text and not text.isdigit():
+                QMessageBox.warning(self, "提示", f"{name}必须为数字")
+                return None
+        
         # 创建会话对象
         session = DatabaseSession(
             database_type=self.db_type_combo.currentText(),
             ip_address=self.ip_edit.text().strip(),
-            port=self.port_edit.text().strip(),
+            port=to_int(self.port_edit.text().strip()),
             username=self.username_edit.text().strip(),
             password=self.password_edit.text(),
             database=self.database_edit.text().strip(),
-            timeout=self.timeout_edit.text().strip(),
+            timeout=to_int(self.timeout_edit.text().strip(), 60),
             memo=self.memo_edit.toPlainText().strip(),
-            is_http="true" if self.use_http_check.isChecked() else "false",
+            is_http=self.use_http_check.isChecked(),
             url=self.url_edit.text().strip(),
             encryption_key=self.key_edit.text().strip(),
-            is_proxy="true" if self.use_proxy_check.isChecked() else "false",
+            is_proxy=self.use_proxy_check.isChecked(),
             proxy_type=self.proxy_type_combo.currentText(),
             proxy_address=self.proxy_address_edit.text().strip(),
-            proxy_port=self.proxy_port_edit.text().strip(),
+            proxy_port=to_int(self.proxy_port_edit.text().strip()),
             proxy_username=self.proxy_username_edit.text().strip(),
-            proxy_password=self.proxy_password_edit.text()
+            proxy_password=self.proxy_password_edit.text(),
+            compress=self.compress_check.isChecked()
         )
         
         return session
@@ -0,0 +1,63 @@
+"""
+asyncio 与 Qt 的桥接：事件循环运行在一个后台线程中，协程结果经信号回到 GUI 线程
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Coroutine, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+
+class AsyncLoop(QObject):
+    """应用内共享的 asyncio 事件循环
+
+    所有窗口的异步查询都提交到同一个事件循环，同时进行的查询只是协程，
+    不会各自占用一个 QThread。
+    """
+
+    # (回调, 已完成的 Future)
+    _finished = Signal(object, object)
+
+    _instance: Optional["AsyncLoop"] = None
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="asyncio-loop", daemon=True)
+        self.thread.start()
+        self._finished.connect(self._dispatch)
+
+    @classmethod
+    def instance(cls) -> "AsyncLoop":
+        """获取共享实例，首次调用须在 GUI 线程中"""
+        if cls._instance is None:
+            cls._instance = AsyncLoop()
+        return cls._instance
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine, callback: Optional[Callable] = None) -> Future:
+        """提交协程，完成后在 GUI 线程中调用 callback(result, error)
+
+        返回的 Future 可用 cancel() 取消协程。
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback is not None:
+            future.add_done_callback(lambda f: self._finished.emit(callback, f))
+        return future
+
+    def _dispatch(self, callback: Callable, future: Future):
+        if future.cancelled():
+            callback(None, asyncio.CancelledError())
+        elif future.exception() is not None:
+            callback(None, future.exception())
+        else:
+            callback(future.result(), None)
+
+    def stop(self):
+        """停止事件循环"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
@@ -17,6 +17,8 @@ from PySide6.QtWidgets import (
     QCheckBox,
     QGroupBox,
     QTabWidget,
+    QFileDialog,
+    QProgressDialog,
 )
 from PySide6.QtCore import Qt, QAbstractTableModel
 from PySide6.QtGui import QAction
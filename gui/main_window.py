@@ -1,9 +1,54 @@
+import importlib
+
 from .base import *
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QAction
-from gui.add_session_dialog import AddSessionDialog
+from PySide6.QtCore import QTimer, QThread, Signal
+from PySide6.QtGui import QAction
+from gui.session_table_model import SessionTableModel
 from core.manager_dao import ManagerDao
 from core.entities import DatabaseSession
 
+# 各数据库类型对应的窗口 (模块, 类名)，首次打开时才导入，数据库驱动随之加载
+DATABASE_WINDOWS = {
+    "Mysql": ("gui.mysql_window", "MysqlWindow"),
+}
+
+
+class SessionStoreLoader(QThread):
+    """会话库加载线程，结构迁移与全文索引构建可能较慢，不阻塞主窗口绘制"""
+
+    loaded_signal = Signal(object)
+    failed_signal = Signal(str)
+
+    def run(self):
+        try:
+            self.loaded_signal.emit(ManagerDao())
+        except Exception as e:
+            self.failed_signal.emit(str(e))
+
+
+class SessionTransferThread(QThread):
+    """会话批量导入/导出线程"""
+
+    progress_signal = Signal(int)
+    finished_signal = Signal(bool, str)
+
+    def __init__(self, manager_dao: ManagerDao, path: str, is_import: bool):
+        super().__init__()
+        self.manager_dao = manager_dao
+        self.path = path
+        self.is_import = is_import
+
+    def run(self):
+        try:
+            if self.is_import:
+                count = self.manager_dao.import_databases(self.path, progress_callback=self.progress_signal.emit)
+                self.finished_signal.emit(True, f"导入 {count} 个会话")
+            else:
+                count = self.manager_dao.export_databases(self.path, progress_callback=self.progress_signal.emit)
+                self.finished_signal.emit(True, f"导出 {count} 个会话")
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -11,8 +56,10 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("DBVigil - 数据库管理工具")
         self.setGeometry(100, 100, 900, 650)
 
-        # 初始化数据访问对象
-        self.manager_dao = ManagerDao()
+        # 数据访问对象在后台线程中打开，加载完成前为 None
+        self.manager_dao = None
+        self.model = None
+        self.metrics_dialog = None
 
         # 创建中心部件
         central_widget = QWidget(self)
@@ -23,6 +70,17 @@ class MainWindow(QMainWindow):
         # 创建菜单栏
         self.create_menu_bar()
 
+        # 创建搜索框，输入停顿后再过滤，避免每个按键都查询
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("搜索备忘 / IP / 数据库名...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.refresh_table)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        main_layout.addWidget(self.search_edit)
+
         # 创建表格视图
         self.table = QTableView(self)
         self.table.setSelectionBehavior(QTableView.SelectRows)
@@ -30,9 +88,6 @@ class MainWindow(QMainWindow):
         self.table.setAlternatingRowColors(True)
         self.table.doubleClicked.connect(self.open_database_action)
 
-        # 设置表格模型
-        self.setup_table_model()
-
         # 设置右键菜单
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
@@ -40,7 +95,7 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.table)
 
         # 创建状态栏
-        self.status_label = QLabel("暂无信息")
+        self.status_label = QLabel("正在加载会话库...")
         self.status_label.setStyleSheet("padding: 3px;")
 
         self.author_label = QLabel("By: DBVigil Team")
@@ -59,8 +114,14 @@ class MainWindow(QMainWindow):
 
         self.setCentralWidget(central_widget)
 
-        # 加载数据
-        self.refresh_table()
+        # 后台加载会话库，完成后再设置表格模型；由 start_loading() 启动，调用方可先连接加载信号
+        self.store_loader = SessionStoreLoader(self)
+        self.store_loader.loaded_signal.connect(self.on_store_loaded)
+        self.store_loader.failed_signal.connect(self.on_store_failed)
+
+    def start_loading(self):
+        """开始在后台加载会话库"""
+        self.store_loader.start()
 
     def create_menu_bar(self):
         """创建菜单栏"""
@@ -74,10 +135,27 @@ class MainWindow(QMainWindow):
 
         file_menu.addSeparator()
 
+        import_action = QAction("导入会话", self)
+        import_action.triggered.connect(self.import_sessions_action)
+        file_menu.addAction(import_action)
+
+        export_action = QAction("导出会话", self)
+        export_action.triggered.connect(self.export_sessions_action)
+        file_menu.addAction(export_action)
+
+        file_menu.addSeparator()
+
         close_action = QAction("关闭", self)
         close_action.triggered.connect(self.close)
         file_menu.addAction(close_action)
 
+        # 工具菜单
+        tool_menu = menubar.addMenu("工具")
+
+        metrics_action = QAction("性能指标", self)
+        metrics_action.triggered.connect(self.show_metrics)
+        tool_menu.addAction(metrics_action)
+
         # 帮助菜单
         help_menu = menubar.addMenu("帮助")
 
@@ -88,10 +166,28 @@ class MainWindow(QMainWindow):
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
 
+    def on_store_loaded(self, manager_dao: ManagerDao):
+        """会话库加载完成回调"""
+        self.manager_dao = manager_dao
+        self.setup_table_model()
+        self.refresh_table()
+
+    def on_store_failed(self, message: str):
+        """会话库加载失败回调"""
+        self.status_label.setText("会话库加载失败")
+        QMessageBox.critical(self, "错误", f"会话库加载失败: {message}")
+
+    def check_store_ready(self) -> bool:
+        """会话库是否已加载，未加载时给出提示"""
+        if self.manager_dao is None:
+            QMessageBox.information(self, "提示", "会话库正在加载，请稍候")
+            return False
+        return True
+
     def setup_table_model(self):
         """设置表格模型"""
-        self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels(["ID", "IP", "数据库类型", "连接类型", "备忘", "添加时间"])
+        self.model = SessionTableModel(self.manager_dao, parent=self)
+        self.model.total_changed.connect(self.update_total_label)
         self.table.setModel(self.model)
 
         # 设置列宽
@@ -104,26 +200,16 @@ class MainWindow(QMainWindow):
 
     def refresh_table(self):
         """刷新表格数据"""
-        self.model.removeRows(0, self.model.rowCount())
-
-        sessions = self.manager_dao.list_databases()
-        for session in sessions:
-            row = [
-                QStandardItem(str(session.id)),
-                QStandardItem(session.ip_address),
-                QStandardItem(session.database_type),
-                QStandardItem(session.connect_type),
-                QStandardItem(session.memo),
-                QStandardItem(session.add_time),
-            ]
-
-            # 设置居中对齐
-            for item in row:
-                item.setTextAlignment(Qt.AlignCenter)
-
-            self.model.appendRow(row)
+        if self.model is None:
+            return
+        self.model.reload(self.search_edit.text().strip())
 
-        self.status_label.setText(f"共 {len(sessions)} 个会话")
+    def update_total_label(self, total: int):
+        """更新会话总数显示"""
+        if self.model.keyword:
+            self.status_label.setText(f"匹配 {total} 个会话")
+        else:
+            self.status_label.setText(f"共 {total} 个会话")
 
     def show_context_menu(self, pos):
         """显示右键菜单"""
@@ -162,15 +248,15 @@ class MainWindow(QMainWindow):
 
         # 获取选中行的ID
         row = index.row()
-        session_id = int(self.model.item(row, 0).text())
+        session_id = self.model.session_id(row)
         session = self.manager_dao.find_data_by_id(session_id)
 
         if session:
             # 根据数据库类型打开对应窗口
-            if session.database_type == "Mysql":
-                from gui.mysql_window import MysqlWindow
-
-                self.db_window = MysqlWindow(session)
+            if session.database_type in DATABASE_WINDOWS:
+                module_name, class_name = DATABASE_WINDOWS[session.database_type]
+                window_class = getattr(importlib.import_module(module_name), class_name)
+                self.db_window = window_class(session, self.manager_dao)
                 self.db_window.show()
             elif session.database_type == "Mssql":
                 QMessageBox.information(self, "提示", "MSSQL 功能暂未实现")
@@ -181,12 +267,15 @@ class MainWindow(QMainWindow):
 
     def add_database_action(self):
         """添加数据库会话"""
+        if not self.check_store_ready():
+            return
+        from gui.add_session_dialog import AddSessionDialog
+
         dialog = AddSessionDialog(self)
         if dialog.exec() == QDialog.Accepted:
             session = dialog.get_session_data()
             if session:
                 self.manager_dao.add_database(session)
-                self.refresh_table()
                 self.status_label.setText("添加会话成功")
 
     def edit_database_action(self):
@@ -198,17 +287,18 @@ class MainWindow(QMainWindow):
 
         # 获取选中行的ID
         row = index.row()
-        session_id = int(self.model.item(row, 0).text())
+        session_id = self.model.session_id(row)
         session = self.manager_dao.find_data_by_id(session_id)
 
         if session:
+            from gui.add_session_dialog import AddSessionDialog
+
             dialog = AddSessionDialog(self, session)
             if dialog.exec() == QDialog.Accepted:
                 updated_session = dialog.get_session_data()
                 if updated_session:
                     updated_session.id = session_id
                     self.manager_dao.update_database(updated_session)
-                    self.refresh_table()
                     self.status_label.setText("更新会话成功")
 
     def delete_database_action(self):
@@ -222,11 +312,57 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.Yes:
             row = index.row()
-            session_id = int(self.model.item(row, 0).text())
+            session_id = self.model.session_id(row)
             self.manager_dao.delete_database(session_id)
-            self.refresh_table()
             self.status_label.setText("删除会话成功")
 
+    def import_sessions_action(self):
+        """批量导入会话"""
+        if not self.check_store_ready():
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "导入会话", "", "会话文件 (*.jsonl *.csv)")
+        if path:
+            self.start_session_transfer(path, True)
+
+    def export_sessions_action(self):
+        """批量导出会话"""
+        if not self.check_store_ready():
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出会话", "sessions.jsonl", "JSON Lines (*.jsonl);;CSV (*.csv)")
+        if path:
+            self.start_session_transfer(path, False)
+
+    def start_session_transfer(self, path: str, is_import: bool):
+        """在后台线程中执行导入/导出"""
+        title = "导入会话" if is_import else "导出会话"
+        self.transfer_progress = QProgressDialog(f"正在{title}...", None, 0, 0, self)
+        self.transfer_progress.setWindowTitle(title)
+        self.transfer_progress.setMinimumDuration(300)
+
+        self.transfer_thread = SessionTransferThread(self.manager_dao, path, is_import)
+        self.transfer_thread.progress_signal.connect(
+            lambda count: self.transfer_progress.setLabelText(f"正在{title}... 已处理 {count} 条")
+        )
+        self.transfer_thread.finished_signal.connect(self.on_session_transfer_finished)
+        self.transfer_thread.start()
+
+    def on_session_transfer_finished(self, success: bool, message: str):
+        """导入/导出完成回调"""
+        self.transfer_progress.close()
+        if success:
+            self.status_label.setText(message)
+        else:
+            QMessageBox.warning(self, "提示", f"操作失败: {message}")
+
+    def show_metrics(self):
+        """显示性能指标面板"""
+        if self.metrics_dialog is None:
+            from gui.metrics_dialog import MetricsDialog
+
+            self.metrics_dialog = MetricsDialog(self)
+        self.metrics_dialog.show()
+        self.metrics_dialog.raise_()
+
     def show_about(self):
         """显示关于对话框"""
         QMessageBox.about(
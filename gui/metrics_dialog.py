@@ -0,0 +1,105 @@
+from .base import *
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QHeaderView, QTableWidget, QTableWidgetItem
+from core.metrics import metrics
+
+# 表格列：(标题, 指标名, 格式化函数)
+COLUMNS = [
+    ("会话", None, None),
+    ("操作", None, None),
+    ("次数", "count", str),
+    ("错误", "errors", str),
+    ("行数", "rows", str),
+    ("字节", "bytes", lambda value: f"{value / 1024:.1f} KB"),
+    ("次/秒", "ops_per_sec", lambda value: f"{value:.2f}"),
+    ("平均 ms", "mean", lambda value: f"{value * 1000:.2f}"),
+    ("P50 ms", "p50", lambda value: f"{value * 1000:.2f}"),
+    ("P95 ms", "p95", lambda value: f"{value * 1000:.2f}"),
+    ("P99 ms", "p99", lambda value: f"{value * 1000:.2f}"),
+    ("最大 ms", "max", lambda value: f"{value * 1000:.2f}"),
+]
+
+# 刷新间隔（毫秒）
+REFRESH_INTERVAL = 1000
+
+
+class MetricsDialog(QDialog):
+    """各会话操作耗时与吞吐量的实时面板"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("性能指标")
+        self.resize(1000, 400)
+
+        layout = QVBoxLayout(self)
+
+        toolbar = QHBoxLayout()
+        self.enabled_check = QCheckBox("启用统计")
+        self.enabled_check.setChecked(metrics.enabled)
+        self.enabled_check.toggled.connect(self.set_enabled)
+        toolbar.addWidget(self.enabled_check)
+        toolbar.addStretch()
+        reset_button = QPushButton("清空")
+        reset_button.clicked.connect(self.reset)
+        toolbar.addWidget(reset_button)
+        export_button = QPushButton("导出 JSON")
+        export_button.clicked.connect(self.export_json)
+        toolbar.addWidget(export_button)
+        layout.addLayout(toolbar)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _, _ in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+        self.refresh()
+
+    def set_enabled(self, enabled: bool):
+        metrics.enabled = enabled
+        self.refresh()
+
+    def refresh(self):
+        """按当前统计重绘表格"""
+        rows = [
+            (session, operation, values)
+            for session, operations in metrics.snapshot().items()
+            for operation, values in operations.items()
+        ]
+        self.table.setRowCount(len(rows))
+        for row, (session, operation, values) in enumerate(rows):
+            self.table.setItem(row, 0, QTableWidgetItem(session))
+            self.table.setItem(row, 1, QTableWidgetItem(operation))
+            for column, (_, name, fmt) in enumerate(COLUMNS[2:], 2):
+                item = QTableWidgetItem(fmt(values[name]))
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.status_label.setText("统计中" if metrics.enabled else "统计未启用")
+
+    def reset(self):
+        metrics.reset()
+        self.refresh()
+
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出性能指标", "metrics.json", "JSON 文件 (*.json)")
+        if not path:
+            return
+        try:
+            metrics.export_json(path)
+            self.status_label.setText(f"已导出到 {path}")
+        except OSError as e:
+            QMessageBox.warning(self, "提示", f"导出失败: {str(e)}")
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
+
+    def showEvent(self, event):
+        self.timer.start(REFRESH_INTERVAL)
+        super().showEvent(event)
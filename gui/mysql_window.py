@@ -1,8 +1,23 @@
 from gui.base import *
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QThread, QTimer, Signal
+from PySide6.QtWidgets import QHeaderView, QTableWidget, QTableWidgetItem, QTreeWidget, QTreeWidgetItem
 from core.entities import DatabaseSession
-from database.mysql_dao import MysqlDao
+from core.history_dao import QueryHistoryDao, QueryHistoryRecorder
+from core.manager_dao import ManagerDao
+from core.metadata_dao import MetadataDao
+from database.mysql_bulk_loader import MysqlBulkLoader
+from database.mysql_dao import MysqlDao, SERVER_INFO_TTL
+from database.async_mysql_dao import AsyncMysqlDao
+from database.mysql_metadata import MysqlMetadataLoader
+from database.result_cache import estimate_size, shared_cache
+from database.result_export import export_query
+from database.sql_script import first_keyword, split_statements, run_script
+from gui.async_bridge import AsyncLoop
+from gui.result_table_model import ResultTableModel
+import asyncio
 import threading
+import time
+from typing import Optional
 
 
 class ConnectionThread(QThread):
@@ -10,15 +25,20 @@ class ConnectionThread(QThread):
     log_signal = Signal(str)
     connected_signal = Signal(bool)
     
-    def __init__(self, mysql_dao: MysqlDao):
+    def __init__(self, mysql_dao: MysqlDao, manager_dao: Optional[ManagerDao] = None, probe: bool = True):
         super().__init__()
         self.mysql_dao = mysql_dao
+        self.manager_dao = manager_dao
+        self.probe = probe
     
     def run(self):
         try:
             self.log_signal.emit("正在连接...")
             self.mysql_dao.get_connection()
-            self.mysql_dao.get_info()
+            if self.probe:
+                info = self.mysql_dao.get_info()
+                if info is not None and self.manager_dao is not None and self.mysql_dao.session.id:
+                    self.manager_dao.save_server_info(self.mysql_dao.session.id, info)
             self.connected_signal.emit(True)
         except Exception as e:
             self.log_signal.emit(f"连接失败: {str(e)}")
@@ -45,19 +65,123 @@ class CommandThread(QThread):
             self.result_signal.emit(f"执行失败: {str(e)}")
 
 
+class ResultExportThread(QThread):
+    """查询结果导出线程"""
+    progress_signal = Signal(int)
+    finished_signal = Signal(bool, str)
+    
+    def __init__(self, mysql_dao: MysqlDao, sql: str, path: str):
+        super().__init__()
+        self.mysql_dao = mysql_dao
+        self.sql = sql
+        self.path = path
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        """停止导出，已写入的部分保留"""
+        self.cancel_event.set()
+    
+    def run(self):
+        start = time.perf_counter()
+        try:
+            count = export_query(
+                self.mysql_dao, self.sql, self.path,
+                progress_callback=self.progress_signal.emit, cancel_event=self.cancel_event
+            )
+            suffix = "（已停止）" if self.cancel_event.is_set() else ""
+            self.finished_signal.emit(True, f"导出 {count} 行{suffix}到 {self.path}，耗时 {time.perf_counter() - start:.3f} 秒")
+        except Exception as e:
+            self.finished_signal.emit(False, f"导出失败: {str(e)}")
+
+
+class BulkLoadThread(QThread):
+    """数据文件批量导入线程"""
+    # (已导入行数, 行/秒)
+    progress_signal = Signal(int, float)
+    finished_signal = Signal(bool, str)
+    
+    def __init__(self, mysql_dao: MysqlDao, schema: str, table: str, path: str):
+        super().__init__()
+        self.cancel_event = threading.Event()
+        # 不使用 LOAD DATA LOCAL：会话可能连接到不可信的服务端
+        self.loader = MysqlBulkLoader(
+            mysql_dao, table, schema, method='insert',
+            progress_callback=self.progress_signal.emit, cancel_event=self.cancel_event
+        )
+        self.path = path
+    
+    def cancel(self):
+        """停止导入，已写入的部分保留"""
+        self.cancel_event.set()
+    
+    def run(self):
+        try:
+            result = self.loader.load(self.path)
+            suffix = "（已停止）" if self.cancel_event.is_set() else ""
+            self.finished_signal.emit(True, f"{result.summary()}{suffix}")
+        except Exception as e:
+            self.finished_signal.emit(False, f"导入失败: {str(e)}")
+
+
+class MetadataRefreshThread(QThread):
+    """表结构缓存刷新线程"""
+    # (重新加载的库, 错误信息)
+    finished_signal = Signal(list, str)
+    
+    def __init__(self, loader: MysqlMetadataLoader, force: bool = False):
+        super().__init__()
+        self.loader = loader
+        self.force = force
+    
+    def run(self):
+        try:
+            self.finished_signal.emit(self.loader.refresh(self.force), "")
+        except Exception as e:
+            self.finished_signal.emit([], str(e))
+
+
 class MysqlWindow(QMainWindow):
     """MySQL操作窗口"""
+    # 日志可能来自工作线程，经信号转到 GUI 线程写入
+    log_signal = Signal(str)
+    # SQL查询结果由事件循环线程分块发出
+    sql_columns_signal = Signal(list)
+    sql_rows_signal = Signal(list)
+    sql_progress_signal = Signal(str)
+    # 查询历史由后台线程写入后发出
+    history_changed_signal = Signal()
     
-    def __init__(self, session: DatabaseSession):
+    def __init__(self, session: DatabaseSession, manager_dao: Optional[ManagerDao] = None):
         super().__init__()
         self.session = session
+        self.manager_dao = manager_dao
+        self.log_signal.connect(self.append_log)
         self.mysql_dao = MysqlDao(session)
-        self.mysql_dao.set_log_callback(self.append_log)
+        self.mysql_dao.set_log_callback(self.log_signal.emit)
+        self.async_dao = AsyncMysqlDao(self.mysql_dao)
         
         self.setWindowTitle(f"MySQL - {session.ip_address}:{session.port}")
         self.setGeometry(100, 100, 1000, 700)
         
+        self.sql_task = None
+        self.export_thread = None
+        self.load_thread = None
+        # 表结构缓存按会话存放在会话库中，未保存的会话不缓存
+        self.metadata_dao = MetadataDao(manager_dao, session.id) if manager_dao is not None and session.id else None
+        self.metadata_thread = None
+        # 查询历史同样按会话存放，执行记录由后台线程写入
+        self.history_dao = None
+        self.history_recorder = None
+        if self.metadata_dao is not None:
+            self.history_dao = QueryHistoryDao(manager_dao)
+            self.history_recorder = QueryHistoryRecorder(self.history_dao, on_recorded=self.history_changed_signal.emit)
+            self.mysql_dao.history_recorder = self.history_recorder
         self.setup_ui()
+        self.populate_schema_tree()
+        self.sql_columns_signal.connect(self.result_model.set_columns)
+        self.sql_rows_signal.connect(self.on_sql_rows)
+        self.sql_progress_signal.connect(self.sql_status_label.setText)
+        self.history_changed_signal.connect(self.on_history_changed)
         
         # 在后台线程中连接
         self.connect_to_database()
@@ -135,6 +259,135 @@ class MysqlWindow(QMainWindow):
         
         self.tab_widget.addTab(command_tab, "命令执行")
         
+        # SQL执行标签页
+        sql_tab = QWidget()
+        sql_layout = QVBoxLayout(sql_tab)
+        
+        self.sql_edit = QTextEdit()
+        self.sql_edit.setAcceptRichText(False)
+        self.sql_edit.setPlaceholderText("输入SQL语句，选中部分文本时只执行选中内容...")
+        self.sql_edit.setMaximumHeight(150)
+        sql_layout.addWidget(self.sql_edit)
+        
+        sql_button_layout = QHBoxLayout()
+        self.sql_status_label = QLabel("")
+        sql_button_layout.addWidget(self.sql_status_label)
+        sql_button_layout.addStretch()
+        
+        # 结果缓存（可选），重复执行相同的只读查询时直接使用缓存结果
+        self.sql_cache_label = QLabel("")
+        sql_button_layout.addWidget(self.sql_cache_label)
+        
+        self.sql_cache_check = QCheckBox("结果缓存")
+        self.sql_cache_check.setToolTip("缓存只读查询的结果，本会话执行写语句时自动失效")
+        self.sql_cache_check.toggled.connect(self.set_result_cache)
+        sql_button_layout.addWidget(self.sql_cache_check)
+        
+        self.sql_cache_clear_btn = QPushButton("清空缓存")
+        self.sql_cache_clear_btn.setEnabled(False)
+        self.sql_cache_clear_btn.clicked.connect(self.clear_result_cache)
+        sql_button_layout.addWidget(self.sql_cache_clear_btn)
+        
+        self.sql_exec_btn = QPushButton("执行")
+        self.sql_exec_btn.clicked.connect(self.execute_sql)
+        sql_button_layout.addWidget(self.sql_exec_btn)
+        
+        self.sql_export_btn = QPushButton("导出结果")
+        self.sql_export_btn.clicked.connect(self.export_sql_result)
+        sql_button_layout.addWidget(self.sql_export_btn)
+        
+        self.sql_stop_btn = QPushButton("停止")
+        self.sql_stop_btn.setEnabled(False)
+        self.sql_stop_btn.clicked.connect(self.stop_sql)
+        sql_button_layout.addWidget(self.sql_stop_btn)
+        
+        sql_layout.addLayout(sql_button_layout)
+        
+        # 结果表格，固定行高避免视图为计算行高遍历全部数据
+        self.result_model = ResultTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
+        self.result_table.setAlternatingRowColors(True)
+        self.result_table.setWordWrap(False)
+        self.result_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.result_table.verticalHeader().setDefaultSectionSize(self.result_table.fontMetrics().height() + 6)
+        self.result_table.horizontalHeader().setDefaultSectionSize(150)
+        sql_layout.addWidget(self.result_table)
+        
+        self.tab_widget.addTab(sql_tab, "SQL执行")
+        
+        # 库表结构标签页，节点展开时才从本地缓存读取子节点
+        schema_tab = QWidget()
+        schema_layout = QVBoxLayout(schema_tab)
+        
+        schema_button_layout = QHBoxLayout()
+        self.schema_status_label = QLabel("")
+        schema_button_layout.addWidget(self.schema_status_label)
+        schema_button_layout.addStretch()
+        
+        self.schema_refresh_btn = QPushButton("刷新")
+        self.schema_refresh_btn.clicked.connect(lambda: self.refresh_metadata())
+        schema_button_layout.addWidget(self.schema_refresh_btn)
+        
+        self.schema_reload_btn = QPushButton("全部重新加载")
+        self.schema_reload_btn.clicked.connect(lambda: self.refresh_metadata(force=True))
+        schema_button_layout.addWidget(self.schema_reload_btn)
+        
+        schema_layout.addLayout(schema_button_layout)
+        
+        self.schema_tree = QTreeWidget()
+        self.schema_tree.setHeaderLabels(["名称", "类型", "说明"])
+        self.schema_tree.setUniformRowHeights(True)
+        self.schema_tree.header().setDefaultSectionSize(250)
+        self.schema_tree.itemExpanded.connect(self.on_schema_item_expanded)
+        self.schema_tree.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.schema_tree.customContextMenuRequested.connect(self.show_schema_context_menu)
+        schema_layout.addWidget(self.schema_tree)
+        
+        self.tab_widget.addTab(schema_tab, "库表结构")
+        
+        # 查询历史标签页
+        history_tab = QWidget()
+        history_layout = QVBoxLayout(history_tab)
+        
+        history_bar_layout = QHBoxLayout()
+        self.history_search_edit = QLineEdit()
+        self.history_search_edit.setPlaceholderText("搜索历史SQL...")
+        history_bar_layout.addWidget(self.history_search_edit)
+        
+        self.history_sort_combo = QComboBox()
+        for label, column in (("最近执行", "last_run"), ("执行次数", "exec_count"), ("最近耗时", "last_duration"),
+                              ("累计耗时", "total_duration"), ("错误次数", "error_count")):
+            self.history_sort_combo.addItem(label, column)
+        self.history_sort_combo.currentIndexChanged.connect(self.load_history)
+        history_bar_layout.addWidget(self.history_sort_combo)
+        
+        self.history_clear_btn = QPushButton("清空")
+        self.history_clear_btn.clicked.connect(self.clear_history)
+        history_bar_layout.addWidget(self.history_clear_btn)
+        history_layout.addLayout(history_bar_layout)
+        
+        # 输入停顿后再搜索
+        self.history_search_timer = QTimer(self)
+        self.history_search_timer.setSingleShot(True)
+        self.history_search_timer.setInterval(300)
+        self.history_search_timer.timeout.connect(self.load_history)
+        self.history_search_edit.textChanged.connect(self.history_search_timer.start)
+        
+        self.history_table = QTableWidget(0, 7)
+        self.history_table.setHorizontalHeaderLabels(["最近执行", "次数", "最近耗时(ms)", "平均耗时(ms)", "行数", "错误", "SQL"])
+        self.history_table.horizontalHeader().setStretchLastSection(True)
+        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.history_table.setWordWrap(False)
+        self.history_table.cellDoubleClicked.connect(self.on_history_activated)
+        history_layout.addWidget(self.history_table)
+        
+        self.history_tab = history_tab
+        self.tab_widget.addTab(history_tab, "历史记录")
+        history_tab.setEnabled(self.history_dao is not None)
+        self.tab_widget.currentChanged.connect(lambda _: self.on_history_changed())
+        
         main_layout.addWidget(self.tab_widget)
         
         # 日志输出区域
@@ -153,15 +406,31 @@ class MysqlWindow(QMainWindow):
     
     def connect_to_database(self):
         """连接到数据库"""
-        self.conn_thread = ConnectionThread(self.mysql_dao)
+        self.conn_thread = ConnectionThread(self.mysql_dao, self.manager_dao, self.load_cached_server_info())
         self.conn_thread.log_signal.connect(self.append_log)
         self.conn_thread.connected_signal.connect(self.on_connected)
         self.conn_thread.start()
     
+    def load_cached_server_info(self) -> bool:
+        """先用本地缓存的服务端信息显示，返回是否需要重新探测"""
+        if self.manager_dao is None or not self.session.id:
+            return True
+        try:
+            cached = self.manager_dao.get_server_info(self.session.id)
+        except Exception as e:
+            self.append_log(f"读取缓存失败: {str(e)}")
+            return True
+        if cached is None:
+            return True
+        info, probed_at = cached
+        self.mysql_dao.apply_server_info(info, cached=True)
+        return time.time() - probed_at > SERVER_INFO_TTL
+    
     def on_connected(self, success: bool):
         """连接完成回调"""
         if success:
             self.append_log("数据库连接成功，可以开始操作")
+            self.refresh_metadata()
         else:
             self.append_log("数据库连接失败")
     
@@ -199,6 +468,360 @@ class MysqlWindow(QMainWindow):
         """命令执行结果回调"""
         self.command_output.append(result)
     
+    def current_sql(self) -> str:
+        """获取待执行的SQL，选中部分文本时只取选中内容"""
+        cursor = self.sql_edit.textCursor()
+        sql = (cursor.selectedText() if cursor.hasSelection() else self.sql_edit.toPlainText()).strip()
+        # 选中文本中的换行为 U+2029 段落分隔符
+        return sql.replace("\u2029", "\n")
+    
+    def set_sql_running(self, running: bool):
+        """执行或导出期间禁用执行按钮"""
+        self.sql_exec_btn.setEnabled(not running)
+        self.sql_export_btn.setEnabled(not running)
+        self.sql_stop_btn.setEnabled(running)
+    
+    def execute_sql(self):
+        """执行SQL语句，结果在后台流式读取并逐块追加到表格"""
+        sql = self.current_sql()
+        if not sql:
+            QMessageBox.warning(self, "提示", "请输入SQL语句")
+            return
+        
+        self.result_model.clear()
+        self.sql_status_label.setText("正在执行...")
+        self.set_sql_running(True)
+        
+        statements = list(split_statements(sql))
+        if len(statements) > 1:
+            # 多条语句按脚本批量执行
+            self.append_log(f"执行SQL脚本: 共 {len(statements)} 条语句")
+            self.sql_task = AsyncLoop.instance().submit(self.run_sql_script(sql), self.on_sql_done)
+            return
+        
+        self.append_log(f"执行SQL: {sql}")
+        self.sql_task = AsyncLoop.instance().submit(self.run_sql(sql), self.on_sql_done)
+    
+    async def run_sql(self, sql: str) -> str:
+        """在事件循环中通过控制台连接流式执行SQL，停止时服务端查询会被 KILL QUERY 中断"""
+        start = time.perf_counter()
+        cache = self.mysql_dao.result_cache
+        hit = self.mysql_dao.cached_result(sql)
+        if hit is not None:
+            self.sql_columns_signal.emit(hit.columns)
+            self.sql_rows_signal.emit(list(hit.rows))
+            elapsed = time.perf_counter() - start
+            self.mysql_dao.record_history(sql, elapsed, len(hit.rows))
+            return f"返回 {len(hit.rows)} 行（命中缓存，节省 {max(hit.elapsed - elapsed, 0):.3f} 秒）"
+        # 边读边收集结果用于缓存，超出缓存容量后放弃
+        collected = [] if cache is not None and cache.is_cacheable(sql) else None
+        collected_size = 0
+        wire_start = self.mysql_dao.wire_stats()
+        try:
+            async with await self.async_dao.open_stream(sql, console=True) as stream:
+                if stream.columns:
+                    self.sql_columns_signal.emit(stream.columns)
+                    async for rows in stream.chunks():
+                        self.sql_rows_signal.emit(rows)
+                        if collected is not None:
+                            collected.extend(rows)
+                            collected_size += estimate_size(rows)
+                            if not cache.fits(collected_size):
+                                collected = None
+                    message = f"返回 {stream.rowcount} 行"
+                else:
+                    message = f"影响行数: {stream.rowcount}"
+        except Exception as e:
+            self.mysql_dao.invalidate_cache(sql)
+            self.mysql_dao.record_history(sql, time.perf_counter() - start, error=str(e))
+            raise
+        elapsed = time.perf_counter() - start
+        if stream.columns and collected is not None:
+            self.mysql_dao.cache_result(sql, None, stream.columns, collected, elapsed, collected_size)
+        elif not stream.columns:
+            self.mysql_dao.invalidate_cache(sql)
+        self.mysql_dao.record_history(sql, elapsed, stream.rowcount)
+        wire = self.mysql_dao.wire_stats() - wire_start
+        return f"{message}，耗时 {elapsed:.3f} 秒（{wire.summary()}）"
+    
+    async def run_sql_script(self, text: str) -> str:
+        """在线程池中执行SQL脚本，停止时在当前批次结束后退出"""
+        cancel_event = threading.Event()
+        
+        def progress(done: int, total: int):
+            self.sql_progress_signal.emit(f"已执行 {done}/{total} 条语句...")
+        
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.async_dao.executor,
+            lambda: run_script(self.mysql_dao, text, progress_callback=progress, cancel_event=cancel_event)
+        )
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+        
+        statements = list(split_statements(text))
+        if any(first_keyword(statement.sql) == 'USE' for statement in statements):
+            # 脚本中切换过默认库，无法确定各语句执行时的默认库
+            self.mysql_dao.clear_cache()
+        else:
+            for statement in statements:
+                self.mysql_dao.invalidate_cache(statement.sql)
+        for statement_result in result.results:
+            self.mysql_dao.record_history(statements[statement_result.index].sql, statement_result.elapsed,
+                                          statement_result.rowcount, statement_result.error)
+        for failed in result.failed:
+            self.log_signal.emit(f"第 {failed.line} 行语句执行失败: {failed.error}")
+        # 耗时最长的几条语句
+        for slow in sorted(result.results, key=lambda r: r.elapsed, reverse=True)[:5]:
+            if slow.error is None:
+                self.log_signal.emit(f"第 {slow.line} 行 ({slow.kind}) 耗时 {slow.elapsed:.3f} 秒，影响行数 {slow.rowcount}")
+        succeeded = len(result.results) - len(result.failed)
+        return f"脚本执行完成: 成功 {succeeded} 条，失败 {len(result.failed)} 条，耗时 {result.elapsed:.3f} 秒"
+    
+    def on_sql_done(self, message: str, error: Exception):
+        """SQL执行协程结束回调"""
+        self.sql_task = None
+        if isinstance(error, asyncio.CancelledError):
+            self.on_sql_finished(False, "查询已停止")
+        elif error is not None:
+            self.on_sql_finished(False, f"执行失败: {str(error)}")
+        else:
+            self.on_sql_finished(True, message)
+    
+    def set_result_cache(self, enabled: bool):
+        """启用或停用结果缓存，各窗口共用同一缓存"""
+        self.mysql_dao.result_cache = shared_cache() if enabled else None
+        self.sql_cache_clear_btn.setEnabled(enabled)
+        self.update_cache_label()
+    
+    def clear_result_cache(self):
+        """清空本会话的缓存结果"""
+        self.mysql_dao.clear_cache()
+        self.update_cache_label()
+    
+    def update_cache_label(self):
+        """显示缓存命中次数与节省的时间"""
+        cache = self.mysql_dao.result_cache
+        self.sql_cache_label.setText(cache.summary() if cache is not None else "")
+    
+    def on_sql_rows(self, rows: list):
+        """追加一块查询结果"""
+        self.result_model.append_rows(rows)
+        self.sql_status_label.setText(f"已读取 {self.result_model.rowCount()} 行...")
+    
+    def export_sql_result(self):
+        """将查询结果直接从服务端流式导出到文件，不经过结果表格"""
+        sql = self.current_sql()
+        if not sql:
+            QMessageBox.warning(self, "提示", "请输入SQL语句")
+            return
+        
+        path, _ = QFileDialog.getSaveFileName(
+            self, "导出结果", "result.csv",
+            "CSV (*.csv *.csv.gz *.csv.zst);;JSON Lines (*.jsonl *.jsonl.gz *.jsonl.zst);;Parquet (*.parquet)"
+        )
+        if not path:
+            return
+        
+        self.sql_status_label.setText("正在导出...")
+        self.set_sql_running(True)
+        self.append_log(f"导出SQL结果: {sql}")
+        
+        self.export_thread = ResultExportThread(self.mysql_dao, sql, path)
+        self.export_thread.progress_signal.connect(lambda count: self.sql_status_label.setText(f"已导出 {count} 行..."))
+        self.export_thread.finished_signal.connect(self.on_sql_finished)
+        self.export_thread.start()
+    
+    def stop_sql(self):
+        """停止读取查询结果或导出"""
+        if self.sql_task is not None:
+            self.sql_task.cancel()
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.cancel()
+        self.sql_stop_btn.setEnabled(False)
+    
+    def on_sql_finished(self, success: bool, message: str):
+        """SQL执行或导出完成回调"""
+        self.sql_status_label.setText(message)
+        self.update_cache_label()
+        self.set_sql_running(False)
+        self.append_log(message)
+    
+    def refresh_metadata(self, force: bool = False):
+        """在后台刷新表结构缓存，只重新加载有变化的库"""
+        if self.metadata_dao is None:
+            self.schema_status_label.setText("未保存的会话不缓存表结构")
+            return
+        if self.metadata_thread is not None and self.metadata_thread.isRunning():
+            return
+        self.schema_refresh_btn.setEnabled(False)
+        self.schema_reload_btn.setEnabled(False)
+        self.schema_status_label.setText("正在刷新表结构...")
+        self.metadata_thread = MetadataRefreshThread(MysqlMetadataLoader(self.mysql_dao, self.metadata_dao), force)
+        self.metadata_thread.finished_signal.connect(self.on_metadata_refreshed)
+        self.metadata_thread.start()
+    
+    def on_metadata_refreshed(self, changed: list, error: str):
+        """表结构缓存刷新完成回调"""
+        self.schema_refresh_btn.setEnabled(True)
+        self.schema_reload_btn.setEnabled(True)
+        if error:
+            self.schema_status_label.setText("表结构刷新失败")
+            self.append_log(f"表结构刷新失败: {error}")
+            return
+        if changed or self.schema_tree.topLevelItemCount() != len(self.metadata_dao.schema_signatures()):
+            self.populate_schema_tree()
+        self.schema_status_label.setText(f"共 {self.schema_tree.topLevelItemCount()} 个库")
+    
+    def populate_schema_tree(self):
+        """按本地缓存重建库节点，保留已展开的库"""
+        if self.metadata_dao is None:
+            return
+        expanded = {
+            item.text(0) for item in
+            (self.schema_tree.topLevelItem(i) for i in range(self.schema_tree.topLevelItemCount()))
+            if item.isExpanded()
+        }
+        self.schema_tree.clear()
+        items = []
+        for schema in self.metadata_dao.list_schemas():
+            item = QTreeWidgetItem([schema, "库", ""])
+            item.setData(0, Qt.UserRole, ("schema", schema))
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            items.append(item)
+        self.schema_tree.addTopLevelItems(items)
+        for item in items:
+            if item.text(0) in expanded:
+                item.setExpanded(True)
+    
+    def on_schema_item_expanded(self, item: QTreeWidgetItem):
+        """首次展开时从本地缓存加载子节点"""
+        node = item.data(0, Qt.UserRole)
+        if not node or item.childCount():
+            return
+        children = []
+        if node[0] == "schema":
+            for table in self.metadata_dao.list_tables(node[1]):
+                table_type = "视图" if table.table_type == "VIEW" else (table.engine or "表")
+                description = f"约 {table.table_rows} 行" if table.table_type != "VIEW" else ""
+                if table.comment:
+                    description = f"{description}  {table.comment}".strip()
+                child = QTreeWidgetItem([table.name, table_type, description])
+                child.setData(0, Qt.UserRole, ("table", node[1], table.name))
+                child.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+                children.append(child)
+        elif node[0] == "table":
+            _, schema, table = node
+            for column in self.metadata_dao.list_columns(schema, table):
+                flags = [column.column_key, "" if column.nullable else "NOT NULL", column.extra, column.comment]
+                if column.default is not None:
+                    flags.insert(2, f"DEFAULT {column.default}")
+                children.append(QTreeWidgetItem([column.name, column.column_type, " ".join(f for f in flags if f)]))
+            for index in self.metadata_dao.list_indexes(schema, table):
+                index_type = "主键" if index.name == "PRIMARY" else ("唯一索引" if index.unique else "索引")
+                children.append(QTreeWidgetItem([index.name, index_type, ", ".join(index.columns)]))
+        if children:
+            item.addChildren(children)
+        else:
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+    
+    def show_schema_context_menu(self, pos):
+        """库表结构右键菜单"""
+        item = self.schema_tree.itemAt(pos)
+        node = item.data(0, Qt.UserRole) if item is not None else None
+        if not node or node[0] != "table":
+            return
+        menu = QMenu(self)
+        browse_action = QAction("浏览数据", self)
+        browse_action.triggered.connect(lambda: self.browse_table(node[1], node[2]))
+        menu.addAction(browse_action)
+        load_action = QAction("导入数据...", self)
+        load_action.setEnabled(self.load_thread is None or not self.load_thread.isRunning())
+        load_action.triggered.connect(lambda: self.load_table_data(node[1], node[2]))
+        menu.addAction(load_action)
+        menu.exec(self.schema_tree.viewport().mapToGlobal(pos))
+    
+    def browse_table(self, schema: str, table: str):
+        """打开表数据分页浏览窗口"""
+        from gui.table_data_dialog import TableDataDialog
+        dialog = TableDataDialog(self.mysql_dao, self.metadata_dao, schema, table, self)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        dialog.show()
+    
+    def load_table_data(self, schema: str, table: str):
+        """从 CSV / JSON Lines 文件批量导入数据到表，列名取自文件"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, f"导入数据到 {schema}.{table}", "",
+            "数据文件 (*.csv *.csv.gz *.csv.zst *.jsonl *.jsonl.gz *.jsonl.zst *.ndjson)"
+        )
+        if not path:
+            return
+        self.append_log(f"导入数据: {path} -> {schema}.{table}")
+        self.schema_status_label.setText("正在导入...")
+        self.load_thread = BulkLoadThread(self.mysql_dao, schema, table, path)
+        self.load_thread.progress_signal.connect(
+            lambda count, rate: self.schema_status_label.setText(f"已导入 {count} 行，{rate:.0f} 行/秒...")
+        )
+        self.load_thread.finished_signal.connect(self.on_load_finished)
+        self.load_thread.start()
+    
+    def on_load_finished(self, success: bool, message: str):
+        """批量导入完成回调"""
+        self.schema_status_label.setText(message)
+        self.update_cache_label()
+        self.append_log(message)
+        if not success:
+            QMessageBox.warning(self, "提示", message)
+    
+    def on_history_changed(self):
+        """查询历史有新记录，历史标签页可见时重新加载"""
+        if self.tab_widget.currentWidget() is self.history_tab:
+            self.load_history()
+    
+    def load_history(self):
+        """按搜索条件加载查询历史"""
+        if self.history_dao is None:
+            return
+        entries = self.history_dao.search(
+            self.session.id, self.history_search_edit.text().strip(),
+            order_by=self.history_sort_combo.currentData()
+        )
+        self.history_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            values = (
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.last_run)),
+                str(entry.exec_count),
+                f"{entry.last_duration * 1000:.1f}",
+                f"{entry.mean_duration * 1000:.1f}",
+                str(entry.last_rows),
+                entry.last_error or (str(entry.error_count) if entry.error_count else ""),
+                " ".join(entry.sql.split()),
+            )
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column == 0:
+                    item.setData(Qt.UserRole, entry.sql)
+                self.history_table.setItem(row, column, item)
+    
+    def on_history_activated(self, row: int, column: int):
+        """双击历史记录，将语句填入SQL编辑框"""
+        sql = self.history_table.item(row, 0).data(Qt.UserRole)
+        self.sql_edit.setPlainText(sql)
+        self.tab_widget.setCurrentIndex(self.tab_widget.indexOf(self.sql_edit.parentWidget()))
+    
+    def clear_history(self):
+        """清空本会话的查询历史"""
+        if self.history_dao is None:
+            return
+        reply = QMessageBox.question(self, "确认", "确定清空本会话的查询历史吗？")
+        if reply == QMessageBox.Yes:
+            self.history_recorder.flush(5)
+            self.history_dao.clear(self.session.id)
+            self.load_history()
+    
     def udf_privilege_escalation(self):
         """UDF提权"""
         reply = QMessageBox.question(
@@ -221,11 +844,11 @@ class MysqlWindow(QMainWindow):
         try:
             result = self.mysql_dao.udf_privilege_escalation()
             if result:
-                self.append_log("UDF 提权成功")
+                self.log_signal.emit("UDF 提权成功")
             else:
-                self.append_log("UDF 提权失败或不支持")
+                self.log_signal.emit("UDF 提权失败或不支持")
         except Exception as e:
-            self.append_log(f"UDF 提权异常: {str(e)}")
+            self.log_signal.emit(f"UDF 提权异常: {str(e)}")
     
     def clean_traces(self):
         """清理痕迹"""
@@ -247,11 +870,25 @@ class MysqlWindow(QMainWindow):
         """执行清理痕迹"""
         try:
             self.mysql_dao.clean_traces()
-            self.append_log("痕迹清理完成")
+            self.log_signal.emit("痕迹清理完成")
         except Exception as e:
-            self.append_log(f"清理痕迹失败: {str(e)}")
+            self.log_signal.emit(f"清理痕迹失败: {str(e)}")
     
     def closeEvent(self, event):
         """窗口关闭事件"""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.cancel()
+            self.export_thread.wait()
+        if self.load_thread is not None and self.load_thread.isRunning():
+            self.load_thread.cancel()
+            self.load_thread.wait()
+        # 终止仍在执行的查询，之后关闭连接池
+        if self.sql_task is not None:
+            self.sql_task.cancel()
+        if self.metadata_thread is not None and self.metadata_thread.isRunning():
+            self.metadata_thread.wait()
+        AsyncLoop.instance().submit(self.async_dao.aclose())
         self.mysql_dao.close_connection()
+        if self.history_recorder is not None:
+            self.history_recorder.close()
         event.accept()
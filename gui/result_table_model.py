@@ -0,0 +1,82 @@
+"""
+SQL 查询结果表格模型，由后台查询线程分块追加数据
+"""
+from typing import List
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class ResultTableModel(QAbstractTableModel):
+    """查询结果表格模型
+
+    行数据直接保存驱动返回的元组，不做复制，也不为每个单元格创建 QStandardItem；
+    单元格文本在视图绘制时才生成，因此只有可见区域产生显示开销。
+    """
+
+    # 单元格最多显示的字符数，完整内容见工具提示
+    MAX_DISPLAY_LENGTH = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.columns: List[str] = []
+        self.rows: List[tuple] = []
+
+    def clear(self):
+        """清空结果"""
+        self.beginResetModel()
+        self.columns = []
+        self.rows = []
+        self.endResetModel()
+
+    def set_columns(self, columns: List[str]):
+        """设置列名，清空已有行"""
+        self.beginResetModel()
+        self.columns = list(columns)
+        self.rows = []
+        self.endResetModel()
+
+    def append_rows(self, rows: list):
+        """追加一块数据"""
+        if not rows:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        text = self.format_value(self.rows[index.row()][index.column()])
+        if role == Qt.DisplayRole and len(text) > self.MAX_DISPLAY_LENGTH:
+            return text[: self.MAX_DISPLAY_LENGTH] + "..."
+        return text
+
+    @staticmethod
+    def format_value(value) -> str:
+        """单元格显示文本"""
+        if value is None:
+            return "NULL"
+        if isinstance(value, (bytes, bytearray)):
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                return "0x" + value.hex()
+        return str(value)
@@ -0,0 +1,205 @@
+"""
+会话列表表格模型，按页从 ManagerDao 懒加载
+"""
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+from core.entities import DatabaseSession
+from core.manager_dao import ManagerDao, CHANGE_INSERTED, CHANGE_UPDATED, CHANGE_DELETED, CHANGE_RESET
+
+
+class SessionTableModel(QAbstractTableModel):
+    """会话表格模型
+
+    只保存已加载行的 ID（紧凑的 int64 数组），行内容放在有上限的 LRU 缓存中，
+    滚动到未缓存的区域时按块回查 ManagerDao。
+    ManagerDao 的变更事件会被就地应用到对应行，无需整体刷新。
+    """
+
+    HEADERS = ["ID", "IP", "数据库类型", "连接类型", "备忘", "添加时间"]
+
+    # 会话库变更，可能在工作线程中发出，经信号转到 GUI 线程处理
+    session_changed = Signal(str, int)
+    # 总数变化
+    total_changed = Signal(int)
+
+    def __init__(self, manager_dao: ManagerDao, page_size: int = 200, cache_size: int = 2000, parent=None):
+        super().__init__(parent)
+        self.manager_dao = manager_dao
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.keyword: Optional[str] = None
+        self.total = 0
+        self._ids = array("q")
+        self._cache = OrderedDict()
+        self._last_session: Optional[DatabaseSession] = None
+        self._exhausted = False
+
+        self.session_changed.connect(self.apply_change)
+        self.manager_dao.add_change_listener(self.session_changed.emit)
+
+    def reload(self, keyword: Optional[str] = None):
+        """按关键字重新加载，只统计总数，行数据由视图按需拉取"""
+        self.beginResetModel()
+        self.keyword = keyword or None
+        self._ids = array("q")
+        self._cache.clear()
+        self._last_session = None
+        self.total = self.manager_dao.count_databases(keyword=self.keyword)
+        self._exhausted = self.total == 0
+        self.endResetModel()
+        self.total_changed.emit(self.total)
+
+    def apply_change(self, change: str, session_id: int):
+        """就地应用单条会话变更
+
+        行按ID升序排列，用二分查找定位，代价与总行数无关。
+        """
+        if change == CHANGE_RESET:
+            self.reload(self.keyword)
+            return
+
+        row = bisect_left(self._ids, session_id)
+        loaded = row < len(self._ids) and self._ids[row] == session_id
+
+        if change == CHANGE_DELETED:
+            if loaded:
+                self._remove_row(row)
+                self.total -= 1
+            else:
+                # 未加载的行无法判断是否命中过滤条件，重新统计
+                self.total = self.manager_dao.count_databases(keyword=self.keyword)
+            self.total_changed.emit(self.total)
+            return
+
+        # 已加载区间内（或已全部加载）时，不在列表中的行修改前一定不命中过滤条件
+        in_window = self._exhausted or row < len(self._ids)
+        if change == CHANGE_UPDATED and not in_window:
+            # 无法判断修改前是否命中过滤条件，重新统计
+            total = self.manager_dao.count_databases(keyword=self.keyword)
+            if total != self.total:
+                self.total = total
+                self.total_changed.emit(self.total)
+            return
+
+        matches = self.manager_dao.count_databases(keyword=self.keyword, session_id=session_id) > 0
+
+        if change == CHANGE_UPDATED and loaded:
+            if matches:
+                session = self.manager_dao.find_data_by_id(session_id)
+                if session:
+                    self._put(session)
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+            else:
+                self._remove_row(row)
+                self.total -= 1
+                self.total_changed.emit(self.total)
+            return
+
+        if matches:
+            self.total += 1
+            if in_window:
+                session = self.manager_dao.find_data_by_id(session_id)
+                if session:
+                    self.beginInsertRows(QModelIndex(), row, row)
+                    self._ids.insert(row, session_id)
+                    self._put(session)
+                    if self._last_session is None or session_id > self._last_session.id:
+                        self._last_session = session
+                    self.endInsertRows()
+            self.total_changed.emit(self.total)
+
+    def _remove_row(self, row: int):
+        """移除一行"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        session_id = self._ids.pop(row)
+        self._cache.pop(session_id, None)
+        self.endRemoveRows()
+
+    def session_id(self, row: int) -> int:
+        """获取指定行的会话ID"""
+        return self._ids[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+
+        row = index.row()
+        values = self._cache.get(self._ids[row])
+        if values is None:
+            self._load_block(row)
+            values = self._cache.get(self._ids[row])
+            if values is None:
+                return None
+        else:
+            self._cache.move_to_end(self._ids[row])
+        return values[index.column()]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+
+        sessions = self.manager_dao.query_databases(
+            limit=self.page_size, keyword=self.keyword, after=self._last_session
+        )
+        if len(sessions) < self.page_size:
+            self._exhausted = True
+        if not sessions:
+            return
+
+        start = len(self._ids)
+        self.beginInsertRows(QModelIndex(), start, start + len(sessions) - 1)
+        for session in sessions:
+            self._ids.append(session.id)
+            self._put(session)
+        self._last_session = sessions[-1]
+        self.endInsertRows()
+
+    def _load_block(self, row: int):
+        """加载 row 所在的整块数据到缓存"""
+        start = row - row % self.page_size
+        block = self._ids[start:start + self.page_size].tolist()
+        for session in self.manager_dao.find_data_by_ids(block):
+            self._put(session)
+
+    def _put(self, session: DatabaseSession):
+        """写入行缓存，超出上限时淘汰最久未访问的行"""
+        self._cache[session.id] = (
+            str(session.id),
+            session.ip_address,
+            session.database_type,
+            session.connect_type,
+            session.memo,
+            session.add_time,
+        )
+        self._cache.move_to_end(session.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
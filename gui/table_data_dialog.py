@@ -0,0 +1,168 @@
+from .base import *
+from core.metadata_dao import MetadataDao
+from database.mysql_dao import MysqlDao
+from database.table_browser import DEFAULT_PAGE_SIZE, KeysetPager, Page, choose_key
+from gui.async_bridge import AsyncLoop
+from gui.result_table_model import ResultTableModel
+import asyncio
+from typing import Optional
+
+# 可选的每页行数
+PAGE_SIZES = [100, 200, 500, 1000]
+
+
+class TableDataDialog(QDialog):
+    """按主键分页浏览表数据"""
+
+    def __init__(self, mysql_dao: MysqlDao, metadata_dao: MetadataDao, schema: str, table: str, parent=None):
+        super().__init__(parent)
+        self.mysql_dao = mysql_dao
+        self.setWindowTitle(f"浏览数据 - {schema}.{table}")
+        self.resize(1000, 600)
+
+        key_columns = choose_key(metadata_dao, schema, table)
+        self.pager = KeysetPager(mysql_dao, schema, table, key_columns)
+        self.page: Optional[Page] = None
+        self.page_number = 1
+        self.task = None
+        self.loading = False
+
+        layout = QVBoxLayout(self)
+
+        toolbar = QHBoxLayout()
+        self.first_button = QPushButton("首页")
+        self.first_button.clicked.connect(lambda: self.load(self.pager.first_page, 1))
+        toolbar.addWidget(self.first_button)
+        self.previous_button = QPushButton("上一页")
+        self.previous_button.clicked.connect(self.previous_page)
+        toolbar.addWidget(self.previous_button)
+        self.next_button = QPushButton("下一页")
+        self.next_button.clicked.connect(self.next_page)
+        toolbar.addWidget(self.next_button)
+        self.last_button = QPushButton("末页")
+        self.last_button.clicked.connect(lambda: self.load(self.pager.last_page, None))
+        toolbar.addWidget(self.last_button)
+
+        toolbar.addWidget(QLabel("每页:"))
+        self.page_size_combo = QComboBox()
+        for size in PAGE_SIZES:
+            self.page_size_combo.addItem(str(size), size)
+        self.page_size_combo.setCurrentIndex(PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+        self.page_size_combo.currentIndexChanged.connect(self.change_page_size)
+        toolbar.addWidget(self.page_size_combo)
+
+        toolbar.addStretch()
+        self.seek_edit = QLineEdit()
+        self.seek_edit.setPlaceholderText(
+            f"跳转到 {', '.join(key_columns)}（多列用逗号分隔，可只填前几列）" if key_columns else "无可用键"
+        )
+        self.seek_edit.setMinimumWidth(300)
+        self.seek_edit.returnPressed.connect(self.seek)
+        toolbar.addWidget(self.seek_edit)
+        self.seek_button = QPushButton("跳转")
+        self.seek_button.clicked.connect(self.seek)
+        toolbar.addWidget(self.seek_button)
+        layout.addLayout(toolbar)
+
+        self.model = ResultTableModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setEditTriggers(QTableView.NoEditTriggers)
+        layout.addWidget(self.table_view)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        if not key_columns:
+            self.seek_edit.setEnabled(False)
+            self.seek_button.setEnabled(False)
+            self.last_button.setEnabled(False)
+        self.load(self.pager.first_page, 1)
+
+    def load(self, fetch, page_number: Optional[int], *args):
+        """在后台线程中执行 fetch(*args) 取一页，page_number 为 None 表示页码未知"""
+        if self.loading:
+            return
+        # 很快完成时回调可能在 submit 返回前就已执行，因此用 loading 而不是 task 判断
+        self.loading = True
+        self.set_busy(True)
+        self.status_label.setText("加载中...")
+        self.task = AsyncLoop.instance().submit(
+            asyncio.to_thread(fetch, *args), lambda page, error: self.on_loaded(page, error, page_number)
+        )
+
+    def on_loaded(self, page: Optional[Page], error: Optional[BaseException], page_number: Optional[int]):
+        self.loading = False
+        self.set_busy(False)
+        if error is not None:
+            self.status_label.setText(f"加载失败: {str(error)}")
+            self.update_buttons()
+            return
+        if self.pager.keyset and not page.has_previous:
+            page_number = 1
+        self.page = page
+        self.page_number = page_number
+        self.model.set_columns(page.columns)
+        self.model.append_rows(page.rows)
+        self.update_buttons()
+        if self.pager.keyset:
+            position = f"第 {page_number} 页" if page_number is not None else ""
+            if page.rows:
+                position = f"{position}  键 {self.format_key(page.first_key)} ~ {self.format_key(page.last_key)}".strip()
+            mode = f"按 {', '.join(self.pager.key_columns)} 分页"
+        else:
+            position = f"第 {page.offset + 1} ~ {page.offset + len(page.rows)} 行"
+            mode = "表没有主键或非空唯一索引，使用 OFFSET 分页，靠后的页会较慢"
+        self.status_label.setText(f"{position}  {len(page.rows)} 行  耗时 {page.elapsed * 1000:.1f} ms  ({mode})")
+
+    @staticmethod
+    def format_key(key: tuple) -> str:
+        return ", ".join(str(value) for value in key)
+
+    def set_busy(self, busy: bool):
+        for widget in (self.first_button, self.previous_button, self.next_button, self.last_button,
+                       self.page_size_combo, self.seek_button):
+            widget.setEnabled(not busy)
+        if not busy and not self.pager.keyset:
+            self.last_button.setEnabled(False)
+            self.seek_button.setEnabled(False)
+
+    def update_buttons(self):
+        page = self.page
+        self.previous_button.setEnabled(page is not None and page.has_previous and bool(page.rows))
+        self.next_button.setEnabled(page is not None and page.has_next)
+
+    def next_page(self):
+        if self.page is not None:
+            number = self.page_number + 1 if self.page_number is not None else None
+            self.load(self.pager.next_page, number, self.page)
+
+    def previous_page(self):
+        if self.page is not None:
+            number = self.page_number - 1 if self.page_number is not None else None
+            self.load(self.pager.previous_page, number, self.page)
+
+    def seek(self):
+        text = self.seek_edit.text().strip()
+        if not text or not self.pager.keyset:
+            return
+        values = [value.strip() for value in text.split(",")]
+        if len(values) > len(self.pager.key_columns):
+            QMessageBox.warning(self, "提示", f"最多 {len(self.pager.key_columns)} 个键值")
+            return
+        self.load(self.pager.seek, None, values)
+
+    def change_page_size(self):
+        """修改每页行数后从当前页首行重新加载"""
+        self.pager.page_size = self.page_size_combo.currentData()
+        self.pager.discard_prefetch()
+        if self.page is not None and self.page.first_key is not None:
+            self.load(self.pager.seek, None, list(self.page.first_key))
+        else:
+            self.load(self.pager.first_page, 1)
+
+    def closeEvent(self, event):
+        if self.loading:
+            self.task.cancel()
+        self.pager.close()
+        super().closeEvent(event)
@@ -1,10 +1,60 @@
 import sys
-from PySide6.QtWidgets import QApplication
-from gui.main_window import MainWindow
+# 位于顶层而不是 core 包中，避免 core/__init__ 的导入发生在开始记录之前
+from startup_profiler import StartupProfiler
+
+
+def profile_startup(window, profiler: StartupProfiler):
+    """记录首次绘制与会话库加载完成的时间点，两者都完成后输出报告"""
+    from PySide6.QtCore import QObject, QEvent
+
+    pending = {"首次绘制", "会话库加载完成"}
+
+    def done(phase: str):
+        if phase not in pending:
+            return
+        pending.discard(phase)
+        profiler.mark(phase)
+        if not pending:
+            profiler.uninstall()
+            print(profiler.report(), file=sys.stderr)
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                obj.removeEventFilter(self)
+                done("首次绘制")
+            return False
+
+    window.paint_filter = FirstPaintFilter(window)
+    window.installEventFilter(window.paint_filter)
+    window.store_loader.loaded_signal.connect(lambda _: done("会话库加载完成"))
+    window.store_loader.failed_signal.connect(lambda _: done("会话库加载完成"))
+
 
 def main():
+    profiler = None
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profiler = StartupProfiler()
+        profiler.install()
+
+    # Qt 与主窗口在此处才导入，以便启动分析覆盖其导入耗时
+    from PySide6.QtWidgets import QApplication
+    if profiler:
+        profiler.mark("导入 Qt")
     app = QApplication(sys.argv)
+    if profiler:
+        profiler.mark("创建 QApplication")
+
+    from gui.main_window import MainWindow
+    if profiler:
+        profiler.mark("导入主窗口")
     window = MainWindow()
+    if profiler:
+        profiler.mark("创建主窗口")
+        profile_startup(window, profiler)
+    # 启动分析连接好加载完成信号之后再开始加载会话库
+    window.start_loading()
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,119 @@
+"""
+启动耗时分析，统计各模块导入耗时与各初始化阶段耗时
+"""
+import sys
+import threading
+import time
+from importlib.abc import Loader, MetaPathFinder
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimingLoader(Loader):
+    """包装原加载器，记录模块执行耗时"""
+
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.profiler._enter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler._leave(module.__name__)
+
+    def __getattr__(self, name):
+        # get_resource_reader、is_package 等其他接口直接转发
+        return getattr(self.loader, name)
+
+
+class _TimingFinder(MetaPathFinder):
+    """位于 sys.meta_path 首位，为找到的模块替换计时加载器"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimingLoader(spec.loader, self.profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """启动耗时分析器
+
+    install() 之后导入的模块会被记录累计耗时（含子模块）与自身耗时，
+    mark() 记录初始化阶段，report() 输出两部分的汇总。
+    只统计主线程的导入，后台线程的导入计入其所在阶段。
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports: List[Tuple[str, float, float]] = []  # (模块, 自身耗时, 累计耗时)
+        self.phases: List[Tuple[str, float]] = []
+        self._stack: List[List[float]] = []  # [开始时间, 子模块耗时]
+        self._finder: Optional[_TimingFinder] = None
+        self._thread_id = threading.get_ident()
+
+    def install(self):
+        """开始记录模块导入"""
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        """停止记录模块导入"""
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def _enter(self):
+        if threading.get_ident() == self._thread_id:
+            self._stack.append([time.perf_counter(), 0.0])
+
+    def _leave(self, name: str):
+        if threading.get_ident() != self._thread_id or not self._stack:
+            return
+        started, children = self._stack.pop()
+        total = time.perf_counter() - started
+        self.imports.append((name, total - children, total))
+        if self._stack:
+            self._stack[-1][1] += total
+
+    def mark(self, phase: str):
+        """记录一个初始化阶段完成的时间点"""
+        self.phases.append((phase, time.perf_counter()))
+
+    def report(self, top: int = 15) -> str:
+        """生成耗时报告"""
+        lines = ["启动耗时分析", "", "初始化阶段:"]
+        previous = self.start
+        for phase, at in self.phases:
+            lines.append(f"  {phase:<24} {(at - previous) * 1000:>9.1f} ms  (累计 {(at - self.start) * 1000:.1f} ms)")
+            previous = at
+
+        packages: Dict[str, float] = {}
+        for name, own, _ in self.imports:
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + own
+
+        lines.append("")
+        lines.append(f"模块导入（按顶层包汇总自身耗时，共 {len(self.imports)} 个模块）:")
+        for package, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"  {package:<40} {own * 1000:>9.1f} ms")
+
+        lines.append("")
+        lines.append("模块导入（按累计耗时，含子模块）:")
+        for name, own, total in sorted(self.imports, key=lambda item: item[2], reverse=True)[:top]:
+            lines.append(f"  {name:<40} {total * 1000:>9.1f} ms  (自身 {own * 1000:.1f} ms)")
+        return "\n".join(lines)